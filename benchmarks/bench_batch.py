@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from ffmpeg_encoder.core.batch import BatchRunner, output_path_for
+from ffmpeg_encoder.core.ffmpeg_cmd import VideoSettings
+from ffmpeg_encoder.core.gpu import GpuSlots
+from ffmpeg_encoder.core.queue import JobStatus, QueueItem
+
+
+FAKE_JOBS = 200
+
+
+class _NullRunner:
+	"""Runner that only creates the output, isolating scheduling and pipeline overhead."""
+
+	def __init__(self, on_log) -> None:
+		self.on_log = on_log
+
+	def run(self, cmd) -> int:
+		# The pipeline renames the output into place, so it has to exist
+		open(cmd[-1], "wb").close()
+		return 0
+
+	def terminate(self) -> None:
+		pass
+
+
+def _items(sources, settings, output_dir, duration=None):
+	return [
+		QueueItem(
+			source_path=src,
+			output_path=output_path_for(src, settings, str(output_dir)),
+			settings=settings,
+			duration=duration,
+		)
+		for src in sources
+	]
+
+
+def bench_batch_scheduling_overhead(benchmark, source_paths, tmp_path):
+	settings = VideoSettings()
+	sources = source_paths[:10_000]
+
+	def run():
+		runner = BatchRunner(concurrency=4, runner_factory=lambda item, on_log: _NullRunner(on_log))
+		return runner.run(_items(sources, settings, tmp_path, duration=60.0))
+
+	items = benchmark.pedantic(run, rounds=3, iterations=1)
+	assert all(item.status == JobStatus.DONE for item in items)
+
+
+def bench_batch_gpu_slots(benchmark, source_paths, tmp_path):
+	"""Mixed CPU/NVENC batch: scheduling cost of the per-GPU session slots, and their limit."""
+	cpu, gpu = VideoSettings(), VideoSettings(video_codec="h264_nvenc")
+	sources = source_paths[:2_000]
+	peak = {"gpu": 0}
+
+	def run():
+		slots = GpuSlots(sessions_per_device=3, devices=2)
+		runner = BatchRunner(concurrency=4, runner_factory=lambda item, on_log: _NullRunner(on_log), gpu_slots=slots)
+		original = slots.acquire
+
+		def acquire(item):
+			original(item)
+			peak["gpu"] = max(peak["gpu"], sum(slots.busy()))
+
+		slots.acquire = acquire
+		items = _items(sources[::2], cpu, tmp_path / "cpu", duration=60.0) + _items(sources[1::2], gpu, tmp_path / "gpu", duration=60.0)
+		return runner.run(items)
+
+	(tmp_path / "cpu").mkdir()
+	(tmp_path / "gpu").mkdir()
+	items = benchmark.pedantic(run, rounds=3, iterations=1)
+	assert all(item.status == JobStatus.DONE for item in items)
+	assert peak["gpu"] <= 6
+
+
+def bench_batch_fake_ffmpeg(benchmark, fake_ffmpeg, source_paths, tmp_path):
+	"""End-to-end throughput through the asyncio runner with a process per job."""
+	settings = VideoSettings()
+	sources = source_paths[:FAKE_JOBS]
+
+	def run():
+		runner = BatchRunner(concurrency=8)
+		try:
+			return runner.run(_items(sources, settings, tmp_path))
+		finally:
+			runner.runner.stop()
+
+	items = benchmark.pedantic(run, rounds=3, iterations=1)
+	assert all(item.status == JobStatus.DONE for item in items)
+	if benchmark.stats is not None:
+		# None under --benchmark-disable
+		benchmark.extra_info["jobs_per_second"] = FAKE_JOBS / benchmark.stats.stats.mean
+
+
+def bench_batch_synthetic_clips(benchmark, synthetic_clips, tmp_path):
+	"""Real encodes of lavfi clips, so the runner is measured next to actual ffmpeg work."""
+	settings = VideoSettings(extra_params="-preset ultrafast")
+
+	def run():
+		runner = BatchRunner(concurrency=2)
+		try:
+			return runner.run(_items(synthetic_clips, settings, tmp_path))
+		finally:
+			runner.runner.stop()
+
+	items = benchmark.pedantic(run, rounds=2, iterations=1)
+	assert all(item.status == JobStatus.DONE for item in items)
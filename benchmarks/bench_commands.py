@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import pytest
+
+from ffmpeg_encoder.core.batch import output_path_for
+from ffmpeg_encoder.core.ffmpeg_cmd import VideoSettings, build_ffmpeg_commands
+from ffmpeg_encoder.core.matrix import expand_settings, iter_jobs
+
+
+SETTINGS = {
+	"x264_crf": VideoSettings(),
+	"x265_two_pass": VideoSettings(video_codec="libx265", crf=None, bitrate="4M", two_pass=True),
+	"nvenc_two_pass": VideoSettings(video_codec="h264_nvenc", gpu_enable=True, crf=None, bitrate="8M", two_pass=True),
+	"vp9_webm": VideoSettings(container="webm", video_codec="libvpx-vp9", audio_codec="libopus", audio_bitrate="96k"),
+}
+
+
+@pytest.mark.parametrize("name", list(SETTINGS))
+def bench_build_commands_100k(benchmark, source_paths, name):
+	s = SETTINGS[name]
+	jobs = [(src, output_path_for(src, s, "/out")) for src in source_paths]
+
+	def build():
+		for src, out in jobs:
+			build_ffmpeg_commands(src, out, s)
+
+	benchmark.pedantic(build, rounds=3, iterations=1)
+
+
+def bench_output_paths_100k(benchmark, source_paths):
+	s = SETTINGS["x264_crf"]
+	benchmark.pedantic(lambda: [output_path_for(src, s, "/out") for src in source_paths], rounds=3, iterations=1)
+
+
+def bench_sweep_matrix_10k(benchmark, source_paths):
+	"""6-rendition sweep over 10k files, including argv de-duplication."""
+	files = source_paths[:10_000]
+	sweep = {"crf": [18, 20, 23], "video_codec": ["libx264", "libx265"]}
+
+	def expand():
+		return sum(1 for _ in iter_jobs(files, expand_settings(VideoSettings(), sweep)))
+
+	count = benchmark.pedantic(expand, rounds=3, iterations=1)
+	assert count == 60_000
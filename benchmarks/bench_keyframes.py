@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from array import array
+
+import pytest
+
+from ffmpeg_encoder.core.keyframes import KeyframeIndex, read_index, save_index
+
+
+# Two hours with a keyframe every 2 s and a scene cut about every 40 s
+DURATION = 7200.0
+QUERIES = 100_000
+
+
+@pytest.fixture(scope="module")
+def index() -> KeyframeIndex:
+	return KeyframeIndex(
+		keyframes=array("d", (i * 2.0 for i in range(int(DURATION / 2)))),
+		scenes=array("d", (i * 41.3 + 7.0 for i in range(int(DURATION / 41.3)))),
+		scene_threshold=0.4,
+	)
+
+
+def bench_keyframe_lookup_100k(benchmark, index):
+	times = [i * DURATION / QUERIES for i in range(QUERIES)]
+	benchmark.pedantic(lambda: [index.keyframe_at_or_before(t) for t in times], rounds=3, iterations=1)
+
+
+def bench_chunk_boundaries(benchmark, index):
+	benchmark.pedantic(lambda: index.chunk_boundaries(30.0, DURATION), rounds=5, iterations=1)
+
+
+def bench_index_cache_roundtrip(benchmark, index, tmp_path):
+	source = tmp_path / "source.mov"
+	source.write_bytes(b"\0" * 1024)
+
+	def roundtrip():
+		save_index(str(source), index, index_dir=tmp_path / "index")
+		return read_index(str(source), index_dir=tmp_path / "index")
+
+	assert benchmark.pedantic(roundtrip, rounds=5, iterations=1).keyframes == index.keyframes
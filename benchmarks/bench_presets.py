@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from ffmpeg_encoder.core.presets import Preset, PresetCatalog, PresetStore
+
+
+PRESET_COUNT = 500
+_CODECS = ["libx264", "libx265", "h264_nvenc", "libvpx-vp9"]
+
+
+@pytest.fixture(scope="module")
+def preset_store(tmp_path_factory) -> PresetStore:
+	store = PresetStore(tmp_path_factory.mktemp("presets"))
+	for i in range(PRESET_COUNT):
+		store.save(Preset(
+			name=f"preset_{i:04d}",
+			video_codec=_CODECS[i % len(_CODECS)],
+			crf=18 + i % 10,
+			tags=["web" if i % 2 else "archive", f"team{i % 5}"],
+			description=f"Rendition {i} for delivery",
+		))
+	return store
+
+
+def bench_store_list_and_load_all(benchmark, preset_store):
+	benchmark(lambda: [preset_store.load(name) for name in preset_store.list_presets()])
+
+
+def bench_catalog_cold_load(benchmark, preset_store):
+	def load():
+		catalog = PresetCatalog(preset_store)
+		return len(catalog)
+
+	assert benchmark(load) == PRESET_COUNT
+
+
+def bench_catalog_refresh_unchanged(benchmark, preset_store):
+	catalog = PresetCatalog(preset_store)
+	len(catalog)
+	benchmark(catalog.refresh)
+
+
+def bench_catalog_search(benchmark, preset_store):
+	catalog = PresetCatalog(preset_store)
+	len(catalog)
+	benchmark(lambda: catalog.search("delivery 12", ["web"]))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import random
+
+import pytest
+
+from ffmpeg_encoder.core.queue import JobQueue, JobStatus, QueueItem
+
+
+SIZES = [10_000, 100_000]
+# Status updates per round; QueuePanel looks items up by path.
+STATUS_UPDATES = 200
+
+
+@pytest.mark.parametrize("size", SIZES)
+def bench_job_queue_insert(benchmark, source_paths, size):
+	paths = source_paths[:size]
+
+	def insert():
+		queue = JobQueue()
+		for path in paths:
+			queue.add(QueueItem(source_path=path))
+		return queue
+
+	benchmark.pedantic(insert, rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def bench_job_queue_status_updates(benchmark, source_paths, size):
+	queue = JobQueue()
+	for path in source_paths[:size]:
+		queue.add(QueueItem(source_path=path))
+	by_id = {item.job_id: item for item in queue.items}
+	ids = list(by_id)
+
+	def update():
+		for job_id in ids:
+			item = by_id[job_id]
+			item.status = JobStatus.RUNNING
+			item.progress = 0.5
+			item.status = JobStatus.DONE
+
+	benchmark.pedantic(update, rounds=3, iterations=1)
+
+
+@pytest.fixture(scope="module")
+def qapp():
+	os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+	widgets = pytest.importorskip("PySide6.QtWidgets")
+	return widgets.QApplication.instance() or widgets.QApplication([])
+
+
+@pytest.mark.parametrize("size", SIZES)
+def bench_queue_panel_insert(benchmark, qapp, source_paths, size):
+	from ffmpeg_encoder.ui.queue_panel import QueuePanel
+
+	paths = source_paths[:size]
+	panel = QueuePanel()
+
+	def insert():
+		panel.clear()
+		for path in paths:
+			panel._add_file_to_queue(path)
+
+	benchmark.pedantic(insert, rounds=1, iterations=1)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def bench_queue_panel_status_updates(benchmark, qapp, source_paths, size):
+	from ffmpeg_encoder.ui.queue_panel import QueuePanel
+
+	panel = QueuePanel()
+	for path in source_paths[:size]:
+		panel._add_file_to_queue(path)
+	targets = random.Random(0).sample(source_paths[:size], STATUS_UPDATES)
+
+	def update():
+		for path in targets:
+			panel.set_item_status(path, "Encoding")
+
+	benchmark.pedantic(update, rounds=3, iterations=1)
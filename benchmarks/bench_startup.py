@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import pytest
+
+from ffmpeg_encoder.utils.startup import measure_imports
+
+
+@pytest.mark.parametrize("module", ["ffmpeg_encoder.cli", "ffmpeg_encoder.ui.main_window"])
+def bench_import_time(benchmark, module):
+	if module.startswith("ffmpeg_encoder.ui"):
+		pytest.importorskip("PySide6")
+	timings = benchmark.pedantic(measure_imports, args=(module,), rounds=3, iterations=1)
+	benchmark.extra_info["cumulative_import_s"] = timings[module][1]
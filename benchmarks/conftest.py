@@ -0,0 +1,91 @@
+"""Shared fixtures: a fake ffmpeg/ffprobe on PATH and synthetic lavfi clips."""
+from __future__ import annotations
+
+import os
+import shutil
+import stat
+import subprocess
+from pathlib import Path
+from typing import List
+
+import pytest
+
+
+# Stats lines the fake ffmpeg prints per run, like a short real encode.
+FAKE_STATS_LINES = 50
+
+_FAKE_FFMPEG = """#!/bin/sh
+i=0
+while [ $i -lt {lines} ]; do
+	printf 'frame=%d fps=250 q=23.0 size=1024KiB time=00:00:%02d.00 bitrate=800.0kbits/s speed=10.0x\\r' $((i * 25)) $((i % 60)) >&2
+	i=$((i + 1))
+done
+printf '\\nvideo:1024KiB audio:64KiB subtitle:0KiB other streams:0KiB\\n' >&2
+for last; do :; done
+case "$last" in
+	-|/dev/null|NUL) ;;
+	*) printf 'fake' > "$last" ;;
+esac
+"""
+
+_FAKE_FFPROBE = """#!/bin/sh
+printf '%s' '{{"format": {{"duration": "60.0", "size": "7500000", "bit_rate": "1000000"}}, "streams": [{{"codec_type": "video", "codec_name": "h264", "profile": "High", "pix_fmt": "yuv420p", "width": 1920, "height": 1080}}, {{"codec_type": "audio", "codec_name": "aac", "bit_rate": "128000"}}]}}'
+"""
+
+
+def _write_script(path: Path, text: str) -> None:
+	path.write_text(text, encoding="utf-8")
+	path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+@pytest.fixture(scope="session")
+def real_ffmpeg() -> str:
+	path = shutil.which("ffmpeg")
+	if path is None:
+		pytest.skip("ffmpeg is not on PATH")
+	return path
+
+
+@pytest.fixture(scope="session")
+def fake_bin(tmp_path_factory) -> Path:
+	"""Directory holding fake ffmpeg/ffprobe that only print progress and touch the output."""
+	if os.name == "nt":
+		pytest.skip("the fake ffmpeg is a POSIX shell script")
+	folder = tmp_path_factory.mktemp("fakebin")
+	_write_script(folder / "ffmpeg", _FAKE_FFMPEG.format(lines=FAKE_STATS_LINES))
+	_write_script(folder / "ffprobe", _FAKE_FFPROBE.format())
+	return folder
+
+
+@pytest.fixture
+def fake_ffmpeg(fake_bin, monkeypatch) -> Path:
+	"""Put the fake binaries first on PATH for one benchmark."""
+	monkeypatch.setenv("PATH", str(fake_bin) + os.pathsep + os.environ.get("PATH", ""))
+	return fake_bin
+
+
+@pytest.fixture(scope="session")
+def synthetic_clips(real_ffmpeg, tmp_path_factory) -> List[str]:
+	"""Short 320x240 clips with audio, generated from lavfi testsrc and sine."""
+	folder = tmp_path_factory.mktemp("clips")
+	clips = []
+	for i in range(4):
+		path = folder / f"testsrc_{i}.mp4"
+		subprocess.run(
+			[
+				real_ffmpeg, "-hide_banner", "-v", "error", "-y",
+				"-f", "lavfi", "-i", f"testsrc=duration=2:size=320x240:rate=25",
+				"-f", "lavfi", "-i", f"sine=frequency={440 + 110 * i}:duration=2",
+				"-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+				"-c:a", "aac", "-shortest", str(path),
+			],
+			check=True,
+		)
+		clips.append(str(path))
+	return clips
+
+
+@pytest.fixture(scope="session")
+def source_paths() -> List[str]:
+	"""100k plausible source paths spread over nested folders."""
+	return [f"/media/project_{i // 1000:03d}/shot_{i:06d}.mov" for i in range(100_000)]
@@ -8,6 +8,7 @@ hiddenimports = collect_submodules('pydantic')
 hiddenimports.extend([
     'ffmpeg_encoder',
     'ffmpeg_encoder.app',
+    'ffmpeg_encoder.cli',
     'ffmpeg_encoder.ui',
     'ffmpeg_encoder.ui.main_window',
     'ffmpeg_encoder.ui.queue_panel',
@@ -24,6 +25,7 @@ hiddenimports.extend([
     'ffmpeg_encoder.core.runner',
     'ffmpeg_encoder.utils',
     'ffmpeg_encoder.utils.env',
+    'ffmpeg_encoder.utils.instance',
     'ffmpeg_encoder.utils.logger',
     'ffmpeg_encoder.utils.ffmpeg_check',
     'ffmpeg_encoder.integrations',
@@ -1,33 +1,66 @@
+import logging
 import sys
-import platform
-from pathlib import Path
+import time
+from typing import List, Optional
+
+_START = time.perf_counter()
+
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 from .ui.main_window import MainWindow
 from .utils.env import ensure_ffmpeg_available
-from .utils.ffmpeg_check import check_ffmpeg_installation
+from .utils.events import configure_event_log, event
 
+logger = logging.getLogger(__name__)
 
-def main() -> None:
+
+def main(paths: Optional[List[str]] = None, preset: Optional[str] = None, priority: int = 0, lock=None) -> None:
+	"""Run the desktop app; with the `InstanceLock` held, also serve commands from later launches."""
+	configure_event_log()
 	app = QApplication(sys.argv)
 	app.setApplicationName("FFmpeg Encoder")
 	app.setOrganizationName("FFmpegEncoder")
 	app.setApplicationVersion("0.0.1")
 
-	# Check FFmpeg installation and show info
+	# Only a PATH lookup here; encoder discovery runs after the window is shown
 	try:
 		ensure_ffmpeg_available()
-		ffmpeg_info = check_ffmpeg_installation()
-		print(f"FFmpeg version: {ffmpeg_info.get('version', 'Unknown')}")
-		print(f"Available GPU encoders: {ffmpeg_info.get('gpu_encoders', [])}")
 	except Exception as e:
-		print(f"FFmpeg check failed: {e}")
+		logger.warning("FFmpeg check failed: %s", e)
 		# Continue anyway, let the UI handle the error
 
 	window = MainWindow()
 	window.resize(1280, 720)
 	window.show()
+	window.enqueue_paths(paths or [], preset, priority)
+
+	server = None
+	if lock is not None:
+		from .utils.instance import CommandServer
+
+		server = CommandServer(window.handle_remote_command)
+		try:
+			server.start()
+		except OSError as e:
+			logger.warning("Command channel not available: %s", e)
+			server = None
+
+	def _on_first_paint() -> None:
+		startup_ms = (time.perf_counter() - _START) * 1000
+		event("app_started", startup_ms=round(startup_ms, 1))
+		window.settings_panel.start_capability_probe()
+
+	window.settings_panel.capabilities_ready.connect(
+		lambda info: event("capabilities_ready", version=info.get("version", "Unknown"), gpu_encoders=info.get("gpu_encoders", []))
+	)
+	QTimer.singleShot(0, _on_first_paint)
 
-	sys.exit(app.exec())
+	code = app.exec()
+	if server is not None:
+		server.stop()
+	if lock is not None:
+		lock.release()
+	sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from .core.batch import BatchEvent, BatchRunner, output_path_for
+from .core.cost_model import CostModel
+from .core.disk import DiskBudget
+from .core.gpu import DEFAULT_NVENC_SESSIONS, GpuSlots
+from .core.output_plan import OutputPlanner
+from .core.staging import Stager
+from .core.watch import DEFAULT_POLL_SECONDS, DEFAULT_SETTLE_SECONDS, FolderWatcher, WatchFolder, load_watch_config
+from .core.ffmpeg_cmd import VideoSettings
+from .core.queue import JobStatus, QueueItem
+from .core.retry import RetryPolicy
+from .core.scan import read_manifest, scan_folder
+
+_stdout_lock = threading.Lock()
+
+
+def _print_event(event: BatchEvent, verbose: bool) -> None:
+	"""Write one event as a JSON line; workers call this concurrently."""
+	if event.kind == "job_log" and not verbose:
+		return
+	record = {"event": event.kind}
+	if event.job_id:
+		record["job"] = event.job_id
+	record.update(event.data)
+	line = json.dumps(record, ensure_ascii=False) + "\n"
+	with _stdout_lock:
+		sys.stdout.write(line)
+		sys.stdout.flush()
+
+
+def _load_settings(args: argparse.Namespace, preset_name: Optional[str] = None) -> VideoSettings:
+	name = preset_name or args.preset
+	if args.preset_file and not preset_name:
+		from .core.presets import PresetStore
+		return PresetStore().import_preset(args.preset_file).to_video_settings()
+	if name:
+		from .core.presets import PresetStore
+		store = PresetStore(Path(args.preset_dir)) if args.preset_dir else PresetStore()
+		return store.resolve(name).to_video_settings()
+	return VideoSettings()
+
+
+def _build_items(args: argparse.Namespace) -> List[QueueItem]:
+	source = Path(args.source)
+	if source.is_dir():
+		entries = [{"source": path} for path in scan_folder(str(source), recursive=args.recursive)]
+	else:
+		entries = read_manifest(str(source))
+
+	default_settings = _load_settings(args)
+	settings_by_preset = {}
+	planner = OutputPlanner(args.if_exists.capitalize())
+	items: List[QueueItem] = []
+	for entry in entries:
+		preset = entry.get("preset")
+		if preset:
+			if preset not in settings_by_preset:
+				settings_by_preset[preset] = _load_settings(args, preset)
+			settings = settings_by_preset[preset]
+		else:
+			settings = default_settings
+		output = planner.reserve(entry.get("output") or output_path_for(entry["source"], settings, args.output_dir, args.pattern))
+		if output is None:
+			_print_event(BatchEvent("job_skipped", data={"source": entry["source"], "reason": "output exists"}), False)
+			continue
+		items.append(QueueItem(
+			source_path=entry["source"], output_path=output, settings=settings, priority=int(entry.get("priority") or 0)
+		))
+	return items
+
+
+def _make_batch(args: argparse.Namespace) -> Tuple[BatchRunner, Callable[[], None]]:
+	"""BatchRunner for the encode options `batch` and `watch` share, and a function that shuts it down."""
+	cost_model = CostModel.for_host() if args.order == "longest" else None
+	metrics_server = None
+	runner = None
+	if args.metrics_port:
+		from .core.async_runner import AsyncFFmpegRunner
+		from .core.telemetry import MetricsRegistry, serve_metrics
+
+		registry = MetricsRegistry()
+		runner = AsyncFFmpegRunner(metrics=registry)
+		metrics_server = serve_metrics(registry, args.metrics_port)
+	stager = None
+	if args.scratch:
+		stager = Stager(args.scratch, int(args.scratch_size * 1024 ** 3), args.prefetch, stage_all=args.stage_all)
+	batch = BatchRunner(
+		runner=runner,
+		concurrency=args.concurrency,
+		on_event=lambda event: _print_event(event, args.verbose),
+		cost_model=cost_model,
+		disk_budget=None if args.no_space_check else DiskBudget(args.writers_per_device),
+		stager=stager,
+		retry=RetryPolicy(max_attempts=args.retries + 1, base_delay=args.retry_delay, gpu_fallback=args.gpu_fallback),
+		gpu_slots=GpuSlots(args.nvenc_sessions) if args.nvenc_sessions else None,
+	)
+
+	def close() -> None:
+		if batch.runner is not None:
+			batch.runner.stop()
+		if stager is not None:
+			stager.close()
+		if metrics_server is not None:
+			metrics_server.shutdown()
+		if cost_model is not None:
+			try:
+				cost_model.save()
+			except OSError:
+				pass
+
+	return batch, close
+
+
+def _cmd_batch(args: argparse.Namespace) -> int:
+	items = _build_items(args)
+	if not items:
+		_print_event(BatchEvent("batch_finished", data={"total": 0, "done": 0, "failed": 0, "seconds": 0}), args.verbose)
+		return 0
+	if args.output_dir:
+		Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+	batch, close = _make_batch(args)
+
+	def interrupt(signum, frame) -> None:
+		# First Ctrl-C cancels the batch and cleans up; a second one aborts at once
+		signal.signal(signal.SIGINT, previous)
+		threading.Thread(target=batch.cancel, daemon=True).start()
+
+	previous = signal.signal(signal.SIGINT, interrupt)
+	try:
+		batch.run(items)
+	finally:
+		signal.signal(signal.SIGINT, previous)
+		close()
+	return 0 if all(item.status == JobStatus.DONE for item in items) else 1
+
+
+def _cmd_watch(args: argparse.Namespace) -> int:
+	folders = load_watch_config(args.config) if args.config else []
+	folders += [WatchFolder(os.path.abspath(path), recursive=args.recursive) for path in args.folders]
+	if not folders:
+		print("Nothing to watch: pass folders or --config", file=sys.stderr)
+		return 2
+	for folder in folders:
+		# Outputs default to a sub folder, which is never picked up as input
+		folder.output_dir = os.path.abspath(folder.output_dir or args.output_dir or os.path.join(folder.path, "encoded"))
+	output_dirs = tuple(os.path.normcase(folder.output_dir) + os.sep for folder in folders)
+
+	default_settings = _load_settings(args)
+	settings_by_preset = {}
+	planner = OutputPlanner(args.if_exists.capitalize())
+	batch, close = _make_batch(args)
+
+	def ignore(path: str) -> bool:
+		return os.path.normcase(path).startswith(output_dirs)
+
+	def enqueue(path: str, folder: WatchFolder) -> None:
+		settings = default_settings
+		if folder.preset:
+			if folder.preset not in settings_by_preset:
+				settings_by_preset[folder.preset] = _load_settings(args, folder.preset)
+			settings = settings_by_preset[folder.preset]
+		output = planner.reserve(output_path_for(path, settings, folder.output_dir, args.pattern))
+		if output is None:
+			_print_event(BatchEvent("job_skipped", data={"source": path, "reason": "output exists"}), False)
+			return
+		Path(folder.output_dir).mkdir(parents=True, exist_ok=True)
+		batch.submit([QueueItem(source_path=path, output_path=output, settings=settings, priority=folder.priority)])
+
+	watcher = FolderWatcher(
+		folders, enqueue, settle=args.settle, poll_interval=args.poll_interval, existing=not args.new_only, ignore=ignore
+	)
+
+	def shutdown() -> None:
+		watcher.stop()
+		batch.close()
+		batch.cancel()
+
+	def interrupt(signum, frame) -> None:
+		# First Ctrl-C (or SIGTERM) stops watching and cancels running jobs; a second Ctrl-C aborts at once
+		signal.signal(signal.SIGINT, previous)
+		threading.Thread(target=shutdown, daemon=True).start()
+
+	previous = signal.signal(signal.SIGINT, interrupt)
+	previous_term = signal.signal(signal.SIGTERM, interrupt)
+	_print_event(BatchEvent("watch_started", data={"folders": [folder.path for folder in folders]}), False)
+	watcher.start()
+	try:
+		items = batch.run([], keep_open=True)
+	finally:
+		signal.signal(signal.SIGINT, previous)
+		signal.signal(signal.SIGTERM, previous_term)
+		close()
+	return 0 if all(item.status != JobStatus.FAILED for item in items) else 1
+
+
+def _cmd_bench(args: argparse.Namespace) -> int:
+	from .core.encoder_bench import run_benchmarks, save_results
+
+	def show(result) -> None:
+		cpu = f"{result.cpu_percent:.0f}%" if result.cpu_percent is not None else "-"
+		rss = f"{result.peak_rss_bytes / 1024 ** 2:.0f} MiB" if result.peak_rss_bytes else "-"
+		print(
+			f"{result.codec:<16} {result.fps:8.1f} fps {result.speed:7.2f}x  cpu {cpu:>6}  rss {rss:>9}"
+			f"  {result.output_bytes / 1024 ** 2:8.1f} MiB" + (f"  ({result.error})" if result.error else ""),
+			flush=True,
+		)
+
+	codecs = [c.strip() for c in args.codecs.split(",") if c.strip()] if args.codecs else None
+	results = run_benchmarks(args.clip, codecs, args.timeout or None, on_result=show)
+	if not results:
+		print("No codecs to benchmark")
+		return 1
+	print(f"Saved to {save_results(results)}")
+	return 0 if any(result.complete for result in results) else 1
+
+
+def _add_encode_options(parser: argparse.ArgumentParser) -> None:
+	"""Options of the `batch` and `watch` commands that set up the encodes."""
+	parser.add_argument("--preset", help="Preset name from the preset folder")
+	parser.add_argument("--preset-file", help="Preset JSON file to use instead of a named preset")
+	parser.add_argument("--preset-dir", help="Preset folder (default ~/.ffmpeg_encoder/presets)")
+	parser.add_argument("-j", "--concurrency", type=int, default=1, help="Jobs to run at the same time")
+	parser.add_argument("--pattern", default="{name}_encoded", help="Output filename pattern: {name}, {codec}, {quality}, {container}")
+	parser.add_argument(
+		"--order",
+		choices=["longest", "input"],
+		default="longest",
+		help="Start the longest predicted jobs first (default), or keep the input order",
+	)
+	parser.add_argument(
+		"--nvenc-sessions",
+		type=int,
+		default=DEFAULT_NVENC_SESSIONS,
+		help=f"NVENC jobs per GPU, run beside the -j CPU jobs (default {DEFAULT_NVENC_SESSIONS}; 0: NVENC jobs share -j)",
+	)
+	parser.add_argument("--retries", type=int, default=2, help="Reruns of a job after a transient failure (default 2)")
+	parser.add_argument("--retry-delay", type=float, default=10.0, help="Seconds before the first rerun; doubles each time (default 10)")
+	parser.add_argument(
+		"--gpu-fallback",
+		action="store_true",
+		help="Rerun NVENC jobs on libx264/libx265 when the GPU is busy or missing",
+	)
+	parser.add_argument("--writers-per-device", type=int, help="Most jobs writing to one disk at the same time")
+	parser.add_argument(
+		"--no-space-check",
+		action="store_true",
+		help="Start jobs without reserving their estimated output size on the output disk",
+	)
+	parser.add_argument("--scratch", help="Local folder to copy network inputs to before encoding, and to write their outputs to")
+	parser.add_argument("--scratch-size", type=float, default=100.0, help="GB of scratch space to use (default 100)")
+	parser.add_argument("--prefetch", type=int, default=2, help="Queued inputs to copy ahead of the running jobs (default 2)")
+	parser.add_argument("--stage-all", action="store_true", help="Stage every input and output, not only those on network shares")
+	parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics while running")
+	parser.add_argument("-v", "--verbose", action="store_true", help="Also print ffmpeg output as job_log events")
+	parser.add_argument("--event-log", help="JSON-lines event log with stage spans (default ~/.ffmpeg_encoder/logs/events.jsonl)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		prog="ffmpeg-encoder",
+		description="FFmpeg Encoder",
+		epilog="Without a command the desktop app opens: ffmpeg-encoder [FILE_OR_FOLDER ...] [--preset NAME] "
+		"[--priority N] [--new-instance]. When it is already running, the files are added to its queue instead.",
+	)
+	sub = parser.add_subparsers(dest="command")
+
+	batch = sub.add_parser("batch", help="Encode a folder or manifest without the GUI")
+	batch.add_argument("source", help="Folder of videos, or a manifest (.json list or one path per line)")
+	batch.add_argument("-o", "--output-dir", help="Output folder (default: next to each input)")
+	batch.add_argument("-r", "--recursive", action="store_true", help="Scan sub folders too")
+	batch.add_argument(
+		"--if-exists",
+		choices=["overwrite", "skip", "rename"],
+		default="overwrite",
+		help="When an output file already exists; outputs within the batch are always kept apart",
+	)
+	_add_encode_options(batch)
+	batch.set_defaults(func=_cmd_batch)
+
+	watch = sub.add_parser("watch", help="Encode videos as they are copied into hot folders")
+	watch.add_argument("folders", nargs="*", help="Folders to watch, encoded with --preset")
+	watch.add_argument(
+		"--config",
+		help='JSON list of folders or {"path", "preset", "output", "recursive", "priority"} objects, one preset per folder',
+	)
+	watch.add_argument("-o", "--output-dir", help="Output folder (default: an \"encoded\" folder in each watched folder)")
+	watch.add_argument("-r", "--recursive", action="store_true", help="Watch sub folders too")
+	watch.add_argument(
+		"--if-exists",
+		choices=["overwrite", "skip", "rename"],
+		default="skip",
+		help="When an output file already exists (default skip, so a restart does not encode everything again)",
+	)
+	watch.add_argument(
+		"--settle",
+		type=float,
+		default=DEFAULT_SETTLE_SECONDS,
+		help=f"Seconds a file's size must hold still before it is encoded (default {DEFAULT_SETTLE_SECONDS:g})",
+	)
+	watch.add_argument(
+		"--poll-interval",
+		type=float,
+		default=DEFAULT_POLL_SECONDS,
+		help=f"Seconds between rescans of network shares, which inotify cannot watch (default {DEFAULT_POLL_SECONDS:g})",
+	)
+	watch.add_argument("--new-only", action="store_true", help="Ignore the files already in the folders at start")
+	_add_encode_options(watch)
+	watch.set_defaults(func=_cmd_watch)
+
+	bench = sub.add_parser("bench", help="Measure encoder throughput on this machine for job time estimates")
+	bench.add_argument("--clip", help="Clip to encode (default: a generated 720p testsrc2 clip)")
+	bench.add_argument("--codecs", help="Comma separated encoders (default: every available one)")
+	bench.add_argument("--timeout", type=float, default=300.0, help="Seconds per codec before it is cut off (0: no limit)")
+	bench.add_argument("--event-log", help="JSON-lines event log (default ~/.ffmpeg_encoder/logs/events.jsonl)")
+	bench.set_defaults(func=_cmd_bench)
+	return parser
+
+
+def build_gui_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(prog="ffmpeg-encoder", add_help=False)
+	parser.add_argument("paths", nargs="*")
+	parser.add_argument("--preset")
+	parser.add_argument("--priority", type=int, default=0)
+	parser.add_argument("--new-instance", action="store_true")
+	return parser
+
+
+def _open_gui(argv: List[str]) -> None:
+	# Qt's own options (-style, -platform, ...) are left for QApplication
+	args, _ = build_gui_parser().parse_known_args(argv)
+	paths = [os.path.abspath(p) for p in args.paths]
+	from .utils.instance import InstanceLock, send_command
+
+	lock = InstanceLock()
+	if not lock.acquire() and not args.new_instance:
+		reply = send_command({"command": "enqueue", "paths": paths, "preset": args.preset, "priority": args.priority})
+		if reply is not None:
+			if not reply.get("ok"):
+				print(f"FFmpeg Encoder refused the files: {reply.get('error')}", file=sys.stderr)
+				sys.exit(1)
+			return
+		print("The running FFmpeg Encoder does not answer; opening a new window", file=sys.stderr)
+	# The only path that imports Qt
+	from .app import main as gui_main
+
+	gui_main(paths, args.preset, args.priority, lock if lock.held else None)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+	argv = sys.argv[1:] if argv is None else argv
+	if not argv or argv[0] not in ("batch", "watch", "bench", "-h", "--help"):
+		# No subcommand: hand the files to the running desktop app, or start it
+		_open_gui(argv)
+		return
+
+	args = build_parser().parse_args(argv)
+	from .utils.events import configure_event_log
+
+	configure_event_log(args.event_log)
+	sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import math
+import re
+import statistics
+import subprocess
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional
+
+from .ffmpeg_cmd import VideoSettings, format_bitrate, parse_bitrate
+from .ffprobe import probe_duration_seconds
+
+
+# Probe encodes run at a fixed, cheap operating point so their bitrates are
+# comparable between files: the higher the bitrate, the harder the content.
+PROBE_HEIGHT = 360
+PROBE_CRF = 23
+PROBE_PRESET = "ultrafast"
+
+# Probe bitrate of "average" live action footage at the operating point above.
+REFERENCE_KBPS = 700.0
+
+# CRF change per doubling/halving of the probe bitrate, and how far we may move
+# away from the user's CRF. Easy content may go further up than hard content down.
+CRF_PER_DOUBLING = 2.0
+MAX_CRF_INCREASE = 6
+MAX_CRF_DECREASE = 4
+
+# Bounds for scaling a user bitrate by content complexity.
+MIN_BITRATE_SCALE = 0.5
+MAX_BITRATE_SCALE = 1.5
+
+_VIDEO_SIZE_RE = re.compile(r"video:\s*([\d.]+)\s*(k|ki|m|mi)?b", re.IGNORECASE)
+
+
+@dataclass
+class ComplexityResult:
+	kbps: float
+	samples: List[float] = field(default_factory=list)
+
+	@property
+	def ratio(self) -> float:
+		"""Complexity relative to average content (1.0 = average)."""
+		return self.kbps / REFERENCE_KBPS
+
+
+def sample_offsets(duration: float, count: int, segment_seconds: float) -> List[float]:
+	"""Return start times of `count` evenly spread segments."""
+	if duration <= 0 or count <= 0:
+		return []
+	if duration <= segment_seconds * count:
+		return [0.0]
+	step = duration / count
+	return [max(0.0, (i + 0.5) * step - segment_seconds / 2) for i in range(count)]
+
+
+def _parse_video_kbytes(stderr: str) -> Optional[float]:
+	matches = _VIDEO_SIZE_RE.findall(stderr)
+	if not matches:
+		return None
+	value, unit = matches[-1]
+	size = float(value)
+	if unit.lower().startswith("m"):
+		size *= 1024
+	return size
+
+
+def probe_encode_kbps(path: str, start: float, seconds: float) -> Optional[float]:
+	"""Encode one downscaled segment to the null muxer and return its bitrate."""
+	cmd = [
+		"ffmpeg",
+		"-hide_banner",
+		"-nostats",
+		"-ss", f"{start:.3f}",
+		"-t", f"{seconds:.3f}",
+		"-i", path,
+		"-map", "0:v:0",
+		"-an",
+		"-sn",
+		"-vf", f"scale=-2:{PROBE_HEIGHT}",
+		"-c:v", "libx264",
+		"-preset", PROBE_PRESET,
+		"-crf", str(PROBE_CRF),
+		"-f", "null",
+		"-",
+	]
+	proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
+	if proc.returncode != 0:
+		return None
+	kbytes = _parse_video_kbytes(proc.stderr)
+	if kbytes is None or seconds <= 0:
+		return None
+	return kbytes * 8 * 1.024 / seconds
+
+
+def measure_complexity(
+	path: str,
+	duration: Optional[float] = None,
+	samples: int = 3,
+	segment_seconds: float = 2.0,
+) -> Optional[ComplexityResult]:
+	"""Estimate how hard `path` is to compress from a few sampled probe encodes."""
+	if duration is None:
+		duration = probe_duration_seconds(path)
+	if not duration:
+		return None
+
+	rates: List[float] = []
+	for start in sample_offsets(duration, samples, segment_seconds):
+		seconds = min(segment_seconds, duration - start)
+		kbps = probe_encode_kbps(path, start, seconds)
+		if kbps is not None:
+			rates.append(kbps)
+	if not rates:
+		return None
+	return ComplexityResult(kbps=statistics.median(rates), samples=rates)
+
+
+def choose_settings(s: VideoSettings, complexity: ComplexityResult) -> VideoSettings:
+	"""Return a copy of `s` with CRF or bitrate adjusted to the content."""
+	doublings = math.log2(max(complexity.ratio, 1e-6))
+
+	if s.bitrate and not s.crf_applies():
+		bits = parse_bitrate(s.bitrate)
+		if bits is None:
+			return s
+		scale = min(MAX_BITRATE_SCALE, max(MIN_BITRATE_SCALE, math.sqrt(complexity.ratio)))
+		return replace(s, bitrate=format_bitrate(bits * scale))
+
+	if s.crf is None:
+		return s
+	offset = round(-CRF_PER_DOUBLING * doublings)
+	offset = min(MAX_CRF_INCREASE, max(-MAX_CRF_DECREASE, offset))
+	return replace(s, crf=min(51, max(0, s.crf + offset)))
+
+
+def apply_content_aware(
+	path: str,
+	s: VideoSettings,
+	on_log: Optional[Callable[[str], None]] = None,
+) -> VideoSettings:
+	"""Analyze `path` and return per-file settings; falls back to `s` unchanged."""
+	try:
+		complexity = measure_complexity(path)
+	except Exception as e:
+		complexity = None
+		if on_log:
+			on_log(f"Content analysis failed for {path}: {e}")
+	if complexity is None:
+		return s
+
+	chosen = choose_settings(s, complexity)
+	if on_log:
+		quality = f"bitrate {chosen.bitrate}" if chosen.bitrate and not chosen.crf_applies() else f"CRF {chosen.crf}"
+		on_log(f"Content analysis: {complexity.kbps:.0f} kbps probe ({complexity.ratio:.2f}x average) -> {quality}")
+	return chosen
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import concurrent.futures
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from .progress import parse_stats_line
+from .runner import resume_process, suspend_process
+from .telemetry import SAMPLE_INTERVAL, MetricsRegistry, ProcessSample, read_process_stats
+
+
+READ_CHUNK = 64 * 1024
+# ffmpeg rewrites its -stats line with carriage returns, so split on both
+_LINE_SPLIT = re.compile(r"\r\n|\r|\n")
+
+
+@dataclass
+class RunnerEvent:
+	job_id: str
+	kind: str  # "log" or "exit"
+	data: Any
+
+
+class AsyncFFmpegRunner:
+	"""Drives any number of ffmpeg processes from one asyncio loop on a background thread.
+
+	Output is read from binary pipes and decoded incrementally; every line and
+	exit code is posted to `events`, a thread-safe queue the caller drains.
+	Each process is sampled every `sample_interval` seconds for CPU, memory,
+	I/O and its latest fps/speed; samples go to the job's `on_sample` and to
+	`metrics` when given.
+	"""
+
+	def __init__(
+		self,
+		events: Optional[queue.Queue] = None,
+		kill_grace: float = 5.0,
+		sample_interval: float = SAMPLE_INTERVAL,
+		metrics: Optional[MetricsRegistry] = None,
+	) -> None:
+		self.events: queue.Queue = events if events is not None else queue.Queue()
+		self.kill_grace = kill_grace
+		self.sample_interval = sample_interval
+		self.metrics = metrics
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self._thread: Optional[threading.Thread] = None
+		self._procs: Dict[str, asyncio.subprocess.Process] = {}
+		self._paused: set = set()  # job ids whose process is stopped
+		self._start_lock = threading.Lock()
+
+	def start(self) -> None:
+		# Batch workers submit their first jobs at the same time; only one may start the loop
+		with self._start_lock:
+			if self._thread is not None:
+				return
+			ready = threading.Event()
+
+			def _serve() -> None:
+				self._loop = asyncio.new_event_loop()
+				asyncio.set_event_loop(self._loop)
+				ready.set()
+				self._loop.run_forever()
+				self._loop.close()
+
+			self._thread = threading.Thread(target=_serve, name="ffmpeg-runner", daemon=True)
+			self._thread.start()
+			ready.wait()
+
+	def stop(self) -> None:
+		"""Terminate running processes and shut the loop down."""
+		if self._loop is None or self._thread is None:
+			return
+		for job_id in list(self._procs):
+			self.cancel(job_id)
+		asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result(timeout=self.kill_grace + 1)
+		self._loop.call_soon_threadsafe(self._loop.stop)
+		self._thread.join(timeout=2)
+		self._loop = None
+		self._thread = None
+
+	def submit(
+		self,
+		job_id: str,
+		cmd: List[str],
+		timeout: Optional[float] = None,
+		on_line: Optional[Callable[[str], None]] = None,
+		on_sample: Optional[Callable[[ProcessSample], None]] = None,
+		paused: Optional[Callable[[], bool]] = None,
+	) -> concurrent.futures.Future:
+		"""Start `cmd` on the loop; the returned future resolves to its exit code.
+
+		When `paused()` is true once the process exists, it is stopped at once.
+		"""
+		if self._loop is None:
+			self.start()
+		assert self._loop is not None
+		return asyncio.run_coroutine_threadsafe(self._run(job_id, cmd, timeout, on_line, on_sample, paused), self._loop)
+
+	def cancel(self, job_id: str) -> None:
+		"""Terminate the process running for `job_id`, killing it if it ignores the request."""
+		if self._loop is None:
+			return
+		asyncio.run_coroutine_threadsafe(self._terminate(job_id), self._loop)
+
+	def pause(self, job_id: str) -> bool:
+		"""Stop the process of `job_id` where it is; it keeps its memory and output file open."""
+		proc = self._procs.get(job_id)
+		if proc is None or proc.returncode is not None or not suspend_process(proc.pid):
+			return False
+		self._paused.add(job_id)
+		return True
+
+	def resume(self, job_id: str) -> bool:
+		proc = self._procs.get(job_id)
+		self._paused.discard(job_id)
+		if proc is None or proc.returncode is not None:
+			return False
+		return resume_process(proc.pid)
+
+	def is_running(self, job_id: str) -> bool:
+		return job_id in self._procs
+
+	def runner(
+		self,
+		job_id: str,
+		on_log: Optional[Callable[[str], None]] = None,
+		timeout: Optional[float] = None,
+		on_sample: Optional[Callable[[ProcessSample], None]] = None,
+	) -> "LoopRunner":
+		return LoopRunner(self, job_id, on_log, timeout, on_sample)
+
+	async def _run(
+		self,
+		job_id: str,
+		cmd: List[str],
+		timeout: Optional[float],
+		on_line: Optional[Callable[[str], None]],
+		on_sample: Optional[Callable[[ProcessSample], None]] = None,
+		paused: Optional[Callable[[], bool]] = None,
+	) -> int:
+		emit_line = on_line or (lambda line: self.events.put(RunnerEvent(job_id, "log", line)))
+		latest: Dict[str, float] = {}
+
+		def emit(line: str) -> None:
+			if "speed=" in line:
+				stats = parse_stats_line(line)
+				if stats:
+					latest.update(stats)
+			emit_line(line)
+
+		try:
+			proc = await asyncio.create_subprocess_exec(
+				*cmd,
+				stdin=asyncio.subprocess.DEVNULL,
+				stdout=asyncio.subprocess.PIPE,
+				stderr=asyncio.subprocess.PIPE,
+			)
+		except OSError as e:
+			emit(f"Failed to start {cmd[0]}: {e}")
+			self.events.put(RunnerEvent(job_id, "exit", -1))
+			return -1
+
+		self._procs[job_id] = proc
+		# Checked after the process is registered, so a pause racing its start is never lost
+		if paused is not None and paused() and suspend_process(proc.pid):
+			self._paused.add(job_id)
+		pumps = [
+			asyncio.ensure_future(self._pump(proc.stdout, emit)),
+			asyncio.ensure_future(self._pump(proc.stderr, emit)),
+		]
+		sampler = None
+		if (on_sample is not None or self.metrics is not None) and self.sample_interval > 0:
+			sampler = asyncio.ensure_future(self._sample(job_id, proc, latest, on_sample))
+		try:
+			await asyncio.wait_for(proc.wait(), timeout)
+		except asyncio.TimeoutError:
+			emit(f"Timed out after {timeout:.0f}s, terminating")
+			await self._terminate(job_id)
+		finally:
+			if sampler is not None:
+				sampler.cancel()
+			await asyncio.gather(*pumps, return_exceptions=True)
+			self._procs.pop(job_id, None)
+			self._paused.discard(job_id)
+
+		code = proc.returncode if proc.returncode is not None else -1
+		if self.metrics is not None:
+			self.metrics.finish(job_id, code)
+		self.events.put(RunnerEvent(job_id, "exit", code))
+		return code
+
+	async def _sample(
+		self,
+		job_id: str,
+		proc: asyncio.subprocess.Process,
+		latest: Dict[str, float],
+		on_sample: Optional[Callable[[ProcessSample], None]],
+	) -> None:
+		while proc.returncode is None:
+			# /proc reads are a few microseconds, cheap enough to do on the loop
+			usage = read_process_stats(proc.pid)
+			if usage is not None:
+				cpu, rss, read, write = usage
+				sample = ProcessSample(time.time(), proc.pid, cpu, rss, read, write, latest.get("fps"), latest.get("speed"))
+				if on_sample is not None:
+					on_sample(sample)
+				if self.metrics is not None:
+					self.metrics.update(job_id, sample)
+			await asyncio.sleep(self.sample_interval)
+
+	async def _pump(self, stream: Optional[asyncio.StreamReader], emit: Callable[[str], None]) -> None:
+		if stream is None:
+			return
+		decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+		pending = ""
+		while True:
+			chunk = await stream.read(READ_CHUNK)
+			if not chunk:
+				break
+			pending += decoder.decode(chunk)
+			*lines, pending = _LINE_SPLIT.split(pending)
+			for line in lines:
+				if line:
+					emit(line)
+		pending += decoder.decode(b"", final=True)
+		if pending.strip():
+			emit(pending)
+
+	async def _terminate(self, job_id: str) -> None:
+		proc = self._procs.get(job_id)
+		if proc is None or proc.returncode is not None:
+			return
+		try:
+			proc.terminate()
+			if job_id in self._paused:
+				# A stopped process only acts on SIGTERM once it runs again
+				self.resume(job_id)
+			await asyncio.wait_for(proc.wait(), self.kill_grace)
+		except asyncio.TimeoutError:
+			proc.kill()
+		except ProcessLookupError:
+			pass
+
+	async def _drain(self) -> None:
+		while self._procs:
+			await asyncio.sleep(0.05)
+
+
+class LoopRunner:
+	"""Blocking per-job facade with the FFmpegRunner interface, backed by the shared loop.
+
+	`run` blocks the calling thread until ffmpeg exits. The loop replaces the
+	pipe reader threads, but each running command still ties up the thread
+	that called `run`, so N concurrent jobs need N caller threads.
+	"""
+
+	def __init__(
+		self,
+		owner: AsyncFFmpegRunner,
+		job_id: str,
+		on_log: Optional[Callable[[str], None]] = None,
+		timeout: Optional[float] = None,
+		on_sample: Optional[Callable[[ProcessSample], None]] = None,
+	) -> None:
+		self.owner = owner
+		self.job_id = job_id
+		self.timeout = timeout
+		self.on_sample = on_sample
+		self.on_log = on_log or (lambda line: owner.events.put(RunnerEvent(job_id, "log", line)))
+		self._pause_requested = False
+
+	def run(self, cmd: List[str]) -> int:
+		self.on_log("Running: " + " ".join(cmd))
+		return self.owner.submit(
+			self.job_id, cmd, self.timeout, self.on_log, self.on_sample, lambda: self._pause_requested
+		).result()
+
+	def terminate(self) -> None:
+		self.owner.cancel(self.job_id)
+
+	def pause(self) -> bool:
+		"""Stop the running command, or, between commands (e.g. two passes), the next one as it starts."""
+		self._pause_requested = True
+		self.owner.pause(self.job_id)
+		return True
+
+	def resume(self) -> bool:
+		self._pause_requested = False
+		self.owner.resume(self.job_id)
+		return True
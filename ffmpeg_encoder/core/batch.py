@@ -0,0 +1,584 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import count, islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .async_runner import AsyncFFmpegRunner
+from .cost_model import CostModel, estimate_makespan
+from .disk import DiskBudget
+from .ffmpeg_cmd import VideoSettings
+from .ffprobe import probe_duration_seconds
+from .gpu import GpuSlots, uses_nvenc
+from .pipeline import CANCELLED, encode_with_retry
+from .progress import parse_stats_line
+from .queue import JobStatus, QueueItem
+from .retry import NO_RETRY, RetryPolicy
+from .runner import CommandRunner
+from .staging import Stager
+from .telemetry import summarize
+from ..utils.events import job_scope, record_span, span
+
+
+# Minimum seconds between progress events for one job.
+PROGRESS_INTERVAL = 1.0
+
+# Queued job as kept in the start-order heap: (-priority, -predicted seconds, submission order, item)
+_Entry = Tuple[int, float, int, QueueItem]
+
+
+@dataclass
+class BatchEvent:
+	kind: str  # job_started, job_progress, job_status, job_log, job_finished, batch_eta, batch_finished, job_skipped (CLI)
+	job_id: Optional[str] = None
+	data: Dict[str, Any] = field(default_factory=dict)
+
+
+def output_path_for(source: str, settings: VideoSettings, output_dir: Optional[str] = None, pattern: str = "{name}_encoded") -> str:
+	"""Output path from a filename pattern, using the same variables as the output dialog."""
+	src = Path(source)
+	filename = pattern.format(
+		name=src.stem,
+		codec=settings.video_codec.replace("lib", "").replace("_", ""),
+		quality=f"crf{settings.crf}" if settings.crf else "bitrate",
+		container=settings.container,
+	)
+	folder = Path(output_dir) if output_dir else src.parent
+	return str(folder / f"{filename}.{settings.output_extension()}")
+
+
+class BatchRunner:
+	"""Runs queue items through the encode pipeline on a fixed number of worker threads.
+
+	ffmpeg processes themselves are driven by the shared AsyncFFmpegRunner; a
+	worker blocks on its job's stages, so every running ffmpeg process still
+	holds one worker thread. `runner_factory` can supply a fake
+	runner for tests and benchmarks. Higher `priority` items start first;
+	among equals, with a `cost_model`, jobs start longest predicted first
+	and `batch_eta` events estimate the remaining time. With a
+	`disk_budget`, a job waits until its output fits on the volume it
+	writes to (scratch, when staged) and that volume has a free writer
+	slot. With a `stager`, the next inputs are copied to local scratch
+	while jobs encode, and outputs are moved back after the worker has
+	moved on; such a job finishes when its output is in place. Failed jobs are retried per `retry`. With `gpu_slots`, NVENC jobs
+	run on extra workers beside the `concurrency` CPU jobs, as many per GPU
+	as the driver allows sessions.
+
+	`cancel`, `pause` and `resume` may be called from any thread, for one
+	job or the whole batch. A batch run with `keep_open` also takes items
+	from `submit` until `close`.
+	"""
+
+	def __init__(
+		self,
+		runner: Optional[AsyncFFmpegRunner] = None,
+		concurrency: int = 1,
+		on_event: Optional[Callable[[BatchEvent], None]] = None,
+		runner_factory: Optional[Callable[[QueueItem, Callable[[str], None]], CommandRunner]] = None,
+		cost_model: Optional[CostModel] = None,
+		disk_budget: Optional[DiskBudget] = None,
+		stager: Optional[Stager] = None,
+		retry: Optional[RetryPolicy] = None,
+		gpu_slots: Optional[GpuSlots] = None,
+	) -> None:
+		self.runner = runner
+		self.concurrency = max(1, concurrency)
+		self.on_event = on_event or (lambda event: None)
+		self.runner_factory = runner_factory
+		self.cost_model = cost_model
+		self.disk_budget = disk_budget
+		self.stager = stager
+		self.retry = retry or NO_RETRY
+		self.gpu_slots = gpu_slots
+		self._workers = self.concurrency
+		self._lock = threading.Condition()
+		self._queue: List[_Entry] = []  # CPU jobs, heap in start order; cancelled and paused entries leave it lazily
+		self._gpu_queue: List[_Entry] = []  # NVENC jobs when there are `gpu_slots`, likewise
+		self._queued: Dict[str, QueueItem] = {}  # job id -> item for every job still waiting to start
+		self._queued_sources: Counter = Counter()  # source path -> queued jobs reading it
+		self._parked: Dict[str, _Entry] = {}  # held queued jobs, taken out of the heap until `resume`
+		self._seq = count()
+		self._running: Dict[str, QueueItem] = {}
+		self._cpu_running: set = set()  # running job ids taken from the CPU queue
+		self._predicted: Dict[str, float] = {}
+		self._enqueued: Dict[str, float] = {}
+		self._held: set = set()  # job ids already reported as waiting for their volume
+		self._runners: Dict[str, CommandRunner] = {}  # running job id -> its runner
+		self._cancelled: set = set()
+		self._paused: set = set()  # paused running jobs and held queued ones
+		self._batch_paused = False
+		self._paused_since: Dict[str, float] = {}
+		self._paused_seconds: Dict[str, float] = {}
+		self._last_eta = 0.0
+		self._items: List[QueueItem] = []
+		self._open = False  # workers wait for `submit` until `close`
+
+	def _emit(self, kind: str, job_id: Optional[str] = None, **data: Any) -> None:
+		self.on_event(BatchEvent(kind, job_id, data))
+
+	def _make_runner(self, item: QueueItem, on_log: Callable[[str], None]) -> CommandRunner:
+		if self.runner_factory is not None:
+			return self.runner_factory(item, on_log)
+		if self.runner is None:
+			self.runner = AsyncFFmpegRunner()
+			self.runner.start()
+		return self.runner.runner(item.job_id, on_log=on_log, on_sample=item.telemetry.append)
+
+	def eta_seconds(self) -> Optional[float]:
+		"""Predicted seconds until the batch finishes, or None without a cost model."""
+		if self.cost_model is None:
+			return None
+		with self._lock:
+			busy = [self._predicted.get(item.job_id, 0.0) * (1 - item.progress) for item in self._running.values()]
+			pending = [self._predicted.get(job_id, 0.0) for job_id in self._queued]
+		return estimate_makespan(pending, self._workers, busy)
+
+	def _emit_eta(self, force: bool = False) -> None:
+		now = time.monotonic()
+		if self.cost_model is None or (not force and now - self._last_eta < PROGRESS_INTERVAL):
+			return
+		self._last_eta = now
+		self._emit("batch_eta", seconds=round(self.eta_seconds() or 0.0, 1))
+
+	def _queue_for(self, item: QueueItem) -> List[_Entry]:
+		return self._gpu_queue if self.gpu_slots is not None and uses_nvenc(item.settings) else self._queue
+
+	def _startable(self) -> List[List[_Entry]]:
+		"""Queues whose head may start: CPU jobs up to `concurrency`, NVENC jobs while a GPU has a free session; lock held."""
+		queues = []
+		if self.gpu_slots is None or len(self._cpu_running) < self.concurrency:
+			queues.append(self._queue)
+		if self._head(self._gpu_queue) is not None and self.gpu_slots.admits(self._gpu_queue[0][-1]):
+			queues.append(self._gpu_queue)
+		return queues
+
+	def _push(self, item: QueueItem) -> None:
+		"""Queue `item` in start order; call with the lock held."""
+		self._queued[item.job_id] = item
+		self._queued_sources[item.source_path] += 1
+		heapq.heappush(self._queue_for(item), (-item.priority, -self._predicted.get(item.job_id, 0.0), next(self._seq), item))
+
+	def _unqueue(self, item: QueueItem) -> None:
+		"""Forget a queued job; its heap entry is skipped when it comes up. Call with the lock held."""
+		del self._queued[item.job_id]
+		self._parked.pop(item.job_id, None)
+		self._queued_sources[item.source_path] -= 1
+		if not self._queued_sources[item.source_path]:
+			del self._queued_sources[item.source_path]
+
+	def _head(self, queue: List[_Entry]) -> Optional[_Entry]:
+		"""First entry of `queue` that may start, dropping cancelled and parking held ones on the way; lock held."""
+		while queue:
+			item = queue[0][-1]
+			if self._queued.get(item.job_id) is not item:
+				heapq.heappop(queue)
+			elif item.job_id in self._paused:
+				self._parked[item.job_id] = heapq.heappop(queue)
+			else:
+				return queue[0]
+		return None
+
+	def _popped(self, queues: List[List[_Entry]], taken: List[_Entry]) -> Iterator[QueueItem]:
+		"""Pop items of `queues` in start order; their entries go to `taken` to be put back with `_restore`."""
+		while True:
+			heads = [(entry, queue) for queue in queues for entry in [self._head(queue)] if entry is not None]
+			if not heads:
+				return
+			entry, queue = min(heads, key=lambda head: head[0])
+			heapq.heappop(queue)
+			taken.append(entry)
+			yield entry[-1]
+
+	def _restore(self, taken: List[_Entry], keep: Optional[QueueItem] = None) -> None:
+		for entry in taken:
+			if entry[-1] is not keep:
+				heapq.heappush(self._queue_for(entry[-1]), entry)
+
+	def _pick(self, held: List[QueueItem]) -> Tuple[Optional[QueueItem], Optional[str]]:
+		"""Queued job to start next and the error it fails with, or (None, None) to wait; lock held.
+
+		Only the jobs up to the picked one leave the heap, so a pick costs
+		O(log n) unless many jobs ahead of it are held back.
+		"""
+		if self._batch_paused:
+			return None, None
+		taken: List[_Entry] = []
+		queues = self._startable()
+		item, error = None, None
+		if self.disk_budget is None:
+			item = next(self._popped(queues, taken), None)
+		else:
+			admission = self.disk_budget.pick(self._popped(queues, taken), self._write_path)
+			candidates = [entry[-1] for entry in taken]
+			for i in admission.waiting:
+				if candidates[i].job_id not in self._held:
+					self._held.add(candidates[i].job_id)
+					held.append(candidates[i])
+			if admission.index is not None:
+				item, error = candidates[admission.index], admission.error
+		self._restore(taken, item)
+		return item, error
+
+	def _upcoming(self, limit: int) -> List[str]:
+		"""Sources of the next `limit` jobs to start, skipping held ones; lock held."""
+		taken: List[_Entry] = []
+		sources = [item.source_path for item in islice(self._popped([self._queue, self._gpu_queue], taken), limit)]
+		self._restore(taken)
+		return sources
+
+	def _write_path(self, item: QueueItem) -> str:
+		"""Where the encoder will write: scratch when the stager takes the output, else the output itself."""
+		if self.stager is not None and self.stager.stages_output(item):
+			return self.stager.scratch_path(item)
+		return item.output_path
+
+	def _redirect(self, item: QueueItem, path: str) -> None:
+		"""Point the job's disk reservation at the volume it now writes to."""
+		if self.disk_budget is not None:
+			with self._lock:
+				self.disk_budget.redirect(item, path)
+				self._lock.notify_all()
+
+	def _next_item(self) -> Optional[QueueItem]:
+		held: List[QueueItem] = []
+		upcoming: List[str] = []
+		try:
+			with self._lock:
+				while self._queued or self._open:
+					item, error = self._pick(held)
+					if item is None:
+						# Woken up when a running job releases its volume, or on resume and cancel
+						self._lock.wait()
+						continue
+					self._unqueue(item)
+					self._running[item.job_id] = item
+					if self._queue_for(item) is self._queue:
+						# A job that falls back to the CPU encoder later keeps its GPU slot and is not counted
+						self._cpu_running.add(item.job_id)
+					if error is not None:
+						item.status = JobStatus.FAILED
+						item.message = error
+					else:
+						if self.disk_budget is not None:
+							self.disk_budget.acquire(item, self._write_path(item))
+						if self.gpu_slots is not None:
+							self.gpu_slots.acquire(item)
+					if self.stager is not None:
+						# Held jobs may wait indefinitely, so their inputs are not worth copying yet
+						upcoming = [item.source_path] + self._upcoming(self.stager.prefetch_count)
+					return item
+				return None
+		finally:
+			for item in held:
+				self._emit("job_status", item.job_id, status="Waiting for disk")
+			if upcoming:
+				self.stager.prefetch(upcoming)
+
+	def _run_item(self, item: QueueItem) -> bool:
+		"""Run one job; True when its output is still being moved back from scratch."""
+		with job_scope(item.job_id):
+			record_span("queue_wait", self._enqueued.pop(item.job_id, time.time()), time.time())
+			with span("job", source=item.source_path, output=item.output_path) as fields:
+				moving = self._run_stages(item)
+				fields["result"] = item.status.name
+		return moving
+
+	def _run_stages(self, item: QueueItem) -> bool:
+		if item.status == JobStatus.FAILED:
+			# Refused by the disk budget before it started
+			self._emit("job_finished", item.job_id, status=item.status.name, code=-1, seconds=0.0, message=item.message)
+			return False
+		if item.duration is None:
+			try:
+				item.duration = probe_duration_seconds(item.source_path)
+			except Exception:
+				item.duration = None
+
+		last_progress = 0.0
+
+		def on_log(line: str) -> None:
+			nonlocal last_progress
+			stats = parse_stats_line(line)
+			if stats is None:
+				self._emit("job_log", item.job_id, line=line)
+				return
+			if item.duration and "time" in stats:
+				item.progress = min(1.0, max(0.0, stats["time"] / item.duration))
+			now = time.monotonic()
+			if now - last_progress >= PROGRESS_INTERVAL:
+				last_progress = now
+				self._emit("job_progress", item.job_id, progress=round(item.progress, 4), **stats)
+				self._emit_eta()
+
+		self._emit("job_started", item.job_id, source=item.source_path, output=item.output_path)
+		source, output = item.source_path, item.output_path
+		local_output = None
+		if self.stager is not None:
+			local_source = self.stager.open_input(
+				source, on_wait=lambda: self._emit("job_status", item.job_id, status="Staging")
+			)
+			item.source_path = local_source or source
+			local_output = self.stager.local_output(item)
+			item.output_path = local_output or output
+			# Scratch may have been full after all
+			self._redirect(item, item.output_path)
+		started = time.monotonic()
+		try:
+			runner = self._make_runner(item, on_log)
+			held = False
+			with self._lock:
+				self._runners[item.job_id] = runner
+				if item.job_id in self._paused:
+					# Paused after it was picked but before it had a runner
+					held = runner.pause()
+					if held:
+						self._paused_since[item.job_id] = time.monotonic()
+					else:
+						self._paused.discard(item.job_id)
+			if held:
+				self._emit("job_status", item.job_id, status="Paused")
+			code = encode_with_retry(
+				item,
+				runner,
+				self.retry,
+				on_log,
+				on_status=lambda text: self._emit("job_status", item.job_id, status=text),
+				cancelled=lambda: item.job_id in self._cancelled,
+			)
+		except Exception as e:
+			code = -1
+			item.status = JobStatus.FAILED
+			item.message = str(e)
+		finally:
+			item.source_path, item.output_path = source, output
+			if self.stager is not None:
+				self.stager.close_input(source)
+			with self._lock:
+				self._runners.pop(item.job_id, None)
+				self._paused.discard(item.job_id)
+				paused_at = self._paused_since.pop(item.job_id, None)
+				paused = self._paused_seconds.pop(item.job_id, 0.0)
+		if paused_at is not None:
+			paused += time.monotonic() - paused_at
+		# Time spent paused says nothing about the encoder's speed
+		seconds = time.monotonic() - started - paused
+		if self.cost_model is not None and item.attempts <= 1:
+			# Retries and CPU fallbacks would blur the codec's speed
+			self.cost_model.observe(item, seconds)
+		if local_output is None:
+			self._finish(item, code, seconds)
+			return False
+		if code != 0:
+			self.stager.discard_local(local_output)
+			self._finish(item, code, seconds)
+			return False
+
+		def moved(error: Optional[str]) -> None:
+			if error is None:
+				item.status = JobStatus.DONE
+				self._finish(item, 0, seconds)
+			else:
+				item.status = JobStatus.FAILED
+				item.message = f"Could not move the output into place: {error}"
+				self._finish(item, -1, seconds)
+			self._release(item)
+
+		# The encode is done; the job is not until its output is in place, and it writes there now
+		self._redirect(item, output)
+		item.status = JobStatus.RUNNING
+		self._emit("job_status", item.job_id, status="Moving output")
+		self.stager.move_back(local_output, output, item.job_id, moved)
+		return True
+
+	def _finish(self, item: QueueItem, code: int, seconds: float) -> None:
+		self._emit(
+			"job_finished",
+			item.job_id,
+			status=item.status.name,
+			code=code,
+			seconds=round(seconds, 3),
+			message=item.message,
+			attempts=item.attempts,
+			scores=item.scores,
+			telemetry=summarize(item.telemetry),
+		)
+
+	def _matches(self, job_id: Optional[str], candidate: str) -> bool:
+		return job_id is None or job_id == candidate
+
+	def cancel(self, job_id: Optional[str] = None) -> None:
+		"""Cancel one job, or every job when `job_id` is None; queued jobs never start, running ones are terminated."""
+		with self._lock:
+			if job_id is None:
+				dropped = list(self._queued.values())
+			else:
+				dropped = [self._queued[job_id]] if job_id in self._queued else []
+			for item in dropped:
+				self._unqueue(item)
+			if job_id is None:
+				self._queue.clear()
+				self._gpu_queue.clear()
+			running = [i for i in self._running if self._matches(job_id, i)]
+			self._cancelled.update(running)
+			runners = [self._runners[i] for i in running if i in self._runners]
+			self._lock.notify_all()
+			unused = [
+				item.source_path for item in dropped
+				if item.source_path not in self._queued_sources
+				and not any(r.source_path == item.source_path for r in self._running.values())
+			]
+		if self.stager is not None:
+			self.stager.forget(unused)
+		for item in dropped:
+			item.status = JobStatus.CANCELLED
+			item.message = "Cancelled"
+			self._emit("job_finished", item.job_id, status=item.status.name, code=CANCELLED, seconds=0.0, message=item.message)
+		for runner in runners:
+			runner.terminate()
+		self._emit_eta(force=True)
+
+	def pause(self, job_id: Optional[str] = None) -> None:
+		"""Pause one job, or the batch when `job_id` is None.
+
+		A running job's ffmpeg is stopped in place (SIGSTOP), or its next
+		command as it starts; a queued job is held back. A running job counts
+		as paused only once its runner accepted the pause. A paused batch
+		starts no new jobs.
+		"""
+		now = time.monotonic()
+		paused: List[str] = []
+		with self._lock:
+			if job_id is None:
+				self._batch_paused = True
+			elif job_id not in self._runners:
+				# Queued, or about to get its runner, which applies the pause
+				self._paused.add(job_id)
+			for i, runner in self._runners.items():
+				if self._matches(job_id, i) and i not in self._paused_since and runner.pause():
+					self._paused.add(i)
+					self._paused_since[i] = now
+					paused.append(i)
+		for i in paused:
+			self._emit("job_status", i, status="Paused")
+
+	def resume(self, job_id: Optional[str] = None) -> None:
+		"""Undo `pause` for one job, or for the batch and every paused job when `job_id` is None."""
+		now = time.monotonic()
+		resumed: List[str] = []
+		with self._lock:
+			if job_id is None:
+				self._batch_paused = False
+			for i in [i for i in self._paused if self._matches(job_id, i)]:
+				self._paused.discard(i)
+				entry = self._parked.pop(i, None)
+				if entry is not None:
+					heapq.heappush(self._queue_for(entry[-1]), entry)
+				since = self._paused_since.pop(i, None)
+				if since is not None:
+					self._paused_seconds[i] = self._paused_seconds.get(i, 0.0) + now - since
+					self._runners[i].resume()
+					resumed.append(i)
+			self._lock.notify_all()
+		for i in resumed:
+			self._emit("job_status", i, status="Encoding")
+
+	@property
+	def paused(self) -> bool:
+		return self._batch_paused
+
+	def _release(self, item: QueueItem) -> None:
+		with self._lock:
+			self._running.pop(item.job_id, None)
+			self._cpu_running.discard(item.job_id)
+			if self.disk_budget is not None:
+				self.disk_budget.release(item)
+			if self.gpu_slots is not None:
+				self.gpu_slots.release(item)
+			self._lock.notify_all()
+		self._emit_eta(force=True)
+
+	def _worker(self) -> None:
+		while True:
+			item = self._next_item()
+			if item is None:
+				return
+			moving = False
+			try:
+				moving = self._run_item(item)
+			finally:
+				if not moving:
+					self._release(item)
+
+	def _order(self, items: List[QueueItem]) -> List[QueueItem]:
+		"""Start order of new items; probes them for the cost model, so call without the lock."""
+		if self.cost_model is not None:
+			self.cost_model.prepare(items)
+			ordered = self.cost_model.order(items)
+			items = [item for item, _ in ordered]
+			self._predicted.update((item.job_id, seconds) for item, seconds in ordered)
+		# Stable: within a priority the longest-first (or input) order stays
+		return sorted(items, key=lambda item: -item.priority)
+
+	def submit(self, items: List[QueueItem]) -> None:
+		"""Queue more items on a batch running with `keep_open`; callable from any thread."""
+		items = self._order(list(items))
+		now = time.time()
+		with self._lock:
+			for item in items:
+				self._enqueued[item.job_id] = now
+			self._items.extend(items)
+			for item in items:
+				self._push(item)
+			self._lock.notify_all()
+		self._emit_eta(force=True)
+
+	def close(self) -> None:
+		"""Let a `keep_open` batch finish once its queue is empty."""
+		with self._lock:
+			self._open = False
+			self._lock.notify_all()
+
+	def run(self, items: List[QueueItem], keep_open: bool = False) -> List[QueueItem]:
+		"""Run `items` to completion and return them with their final status.
+
+		With `keep_open`, the workers also run items passed to `submit`, and
+		`run` returns, with those items too, only after `close`.
+		"""
+		started = time.monotonic()
+		now = time.time()
+		self._enqueued = {item.job_id: now for item in items}
+		self._items = list(items)
+		self._open = keep_open
+		self._workers = self.concurrency
+		if self.gpu_slots is not None and (keep_open or any(uses_nvenc(item.settings) for item in items)):
+			self._workers += self.gpu_slots.capacity
+		pending = self._order(list(items))
+		with self._lock:
+			for item in pending:
+				self._push(item)
+		self._emit_eta(force=True)
+		workers = [
+			threading.Thread(target=self._worker, name=f"batch-worker-{i}", daemon=True)
+			for i in range(self._workers if keep_open else min(self._workers, len(items)))
+		]
+		for worker in workers:
+			worker.start()
+		for worker in workers:
+			worker.join()
+		if self.stager is not None:
+			self.stager.drain()
+		items = self._items
+		self._emit(
+			"batch_finished",
+			total=len(items),
+			done=sum(1 for item in items if item.status == JobStatus.DONE),
+			failed=sum(1 for item in items if item.status == JobStatus.FAILED),
+			cancelled=sum(1 for item in items if item.status == JobStatus.CANCELLED),
+			seconds=round(time.monotonic() - started, 3),
+		)
+		return items
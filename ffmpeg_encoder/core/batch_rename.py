@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import csv
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+MAPPING_FILTER = "Mapping files (*.xlsx *.xlsm *.csv *.tsv *.txt)"
+_INVALID_CHARS = set('<>:"/\\|?*')
+
+
+def _cell_text(value) -> str:
+	if value is None:
+		return ""
+	if isinstance(value, float) and value.is_integer():
+		# Spreadsheets store numeric names such as 0001 as floats
+		return str(int(value))
+	return str(value).strip()
+
+
+def iter_mapping_rows(path: str, header: bool = True) -> Iterator[Tuple[str, str]]:
+	"""Stream (source name, new name) pairs from the first two columns of an xlsx or CSV file."""
+	suffix = Path(path).suffix.lower()
+	if suffix in (".xlsx", ".xlsm"):
+		import openpyxl
+
+		workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+		try:
+			sheet = workbook.active
+			for row in sheet.iter_rows(min_row=2 if header else 1, max_col=2, values_only=True):
+				if len(row) >= 2:
+					yield _cell_text(row[0]), _cell_text(row[1])
+		finally:
+			workbook.close()
+		return
+
+	with open(path, newline="", encoding="utf-8-sig") as f:
+		reader = csv.reader(f, delimiter="\t" if suffix == ".tsv" else ",")
+		if header:
+			next(reader, None)
+		for row in reader:
+			if len(row) >= 2:
+				yield row[0].strip(), row[1].strip()
+
+
+@dataclass
+class RenameMapping:
+	"""Source name -> new name, indexed by the source's stem so the extension may be left out."""
+
+	entries: Dict[str, str] = field(default_factory=dict)
+	duplicates: List[str] = field(default_factory=list)  # sources listed twice with different names
+
+	@classmethod
+	def load(cls, path: str, header: bool = True) -> "RenameMapping":
+		mapping = cls()
+		for source, target in iter_mapping_rows(path, header):
+			if not source or not target:
+				continue
+			key = os.path.normcase(Path(source).stem)
+			previous = mapping.entries.get(key)
+			if previous is not None and previous != target:
+				mapping.duplicates.append(source)
+				continue
+			mapping.entries[key] = target
+		return mapping
+
+	def __len__(self) -> int:
+		return len(self.entries)
+
+	def new_name(self, path: str) -> Optional[str]:
+		"""New file name for `path`, keeping its extension when the sheet omits one."""
+		source = Path(path)
+		target = self.entries.get(os.path.normcase(source.stem))
+		if target is None:
+			return None
+		if not Path(target).suffix:
+			target += source.suffix
+		return target
+
+
+_mapping_cache: Dict[Tuple[str, bool], Tuple[Tuple[int, int], RenameMapping]] = {}
+
+
+def load_mapping(path: str, header: bool = True) -> RenameMapping:
+	"""RenameMapping.load, cached until the file changes so reopening the dialog does not re-read the sheet."""
+	key = (os.path.abspath(path), header)
+	st = os.stat(path)
+	stamp = (st.st_mtime_ns, st.st_size)
+	cached = _mapping_cache.get(key)
+	if cached is not None and cached[0] == stamp:
+		return cached[1]
+	mapping = RenameMapping.load(path, header)
+	_mapping_cache[key] = (stamp, mapping)
+	return mapping
+
+
+def pattern_name(path: str, pattern: str, index: int) -> str:
+	"""Fill `pattern` ({name}, {index}, {ext}) for one file; the extension is kept unless the pattern has one."""
+	source = Path(path)
+	name = pattern.format(name=source.stem, index=index, ext=source.suffix.lstrip("."))
+	if not Path(name).suffix:
+		name += source.suffix
+	return name
+
+
+@dataclass
+class RenamePlan:
+	operations: List[Tuple[str, str]] = field(default_factory=list)  # (old path, new path) as requested
+	steps: List[Tuple[str, str]] = field(default_factory=list)  # moves in execution order, via temp names for cycles
+	problems: List[str] = field(default_factory=list)
+	unmatched: List[str] = field(default_factory=list)
+
+	@property
+	def ok(self) -> bool:
+		return not self.problems
+
+
+def _name_problem(name: str) -> Optional[str]:
+	if not name or name in (".", ".."):
+		return "empty name"
+	bad = _INVALID_CHARS.intersection(name)
+	if bad:
+		return f"invalid characters {''.join(sorted(bad))}"
+	if name != name.rstrip(" ."):
+		return "name ends with a space or dot"
+	return None
+
+
+def plan_renames(files: Sequence[str], new_name: Callable[[str], Optional[str]], exists: Callable[[str], bool] = os.path.exists) -> RenamePlan:
+	"""Check every rename up front and order the moves so no step overwrites a file.
+
+	Collisions (two files to one name, or onto a file that stays) are problems;
+	chains (a->b, b->c) run tail first and cycles (a->b, b->a) go through a temp name.
+	"""
+	plan = RenamePlan()
+	requested: List[Tuple[str, str, str]] = []
+	for path in files:
+		name = new_name(path)
+		if name is None:
+			plan.unmatched.append(path)
+			continue
+		problem = _name_problem(name)
+		if problem:
+			plan.problems.append(f"{Path(path).name}: {problem}")
+			continue
+		target = os.path.join(os.path.dirname(path), name)
+		if os.path.abspath(target) != os.path.abspath(path):
+			requested.append((path, name, target))
+
+	# Only files that actually move free their name; unmatched and unchanged ones stay in the way
+	sources = {os.path.normcase(os.path.abspath(path)) for path, _, _ in requested}
+	claimed: Dict[str, str] = {}
+	for path, name, target in requested:
+		# A case-only rename on a case-insensitive file system becomes a one-step cycle
+		key = os.path.normcase(os.path.abspath(target))
+		if key in claimed:
+			plan.problems.append(f"{Path(path).name} and {Path(claimed[key]).name} both become {name}")
+			continue
+		if key not in sources and exists(target):
+			plan.problems.append(f"{Path(path).name}: {name} already exists")
+			continue
+		claimed[key] = path
+		plan.operations.append((path, target))
+	if not plan.problems:
+		plan.steps = _order_steps(plan.operations)
+	return plan
+
+
+def _order_steps(operations: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+	by_source = {os.path.normcase(os.path.abspath(src)): i for i, (src, _) in enumerate(operations)}
+	done = [False] * len(operations)
+	steps: List[Tuple[str, str]] = []
+	for first in range(len(operations)):
+		if done[first]:
+			continue
+		# Follow the chain of moves whose target is still occupied by another move's source
+		chain = [first]
+		in_chain = {first}
+		cycle = False
+		while True:
+			nxt = by_source.get(os.path.normcase(os.path.abspath(operations[chain[-1]][1])))
+			if nxt is None or done[nxt]:
+				break
+			if nxt in in_chain:
+				cycle = True
+				break
+			chain.append(nxt)
+			in_chain.add(nxt)
+		if cycle:
+			src, dst = operations[chain[0]]
+			temp = os.path.join(os.path.dirname(src), f".{Path(src).name}.{uuid.uuid4().hex[:8]}.renaming")
+			steps.append((src, temp))
+			steps.extend(operations[i] for i in reversed(chain[1:]))
+			steps.append((temp, dst))
+		else:
+			steps.extend(operations[i] for i in reversed(chain))
+		for i in chain:
+			done[i] = True
+	return steps
+
+
+def apply_renames(plan: RenamePlan) -> List[Tuple[str, str]]:
+	"""Run the plan's steps; on failure every completed step is undone and the error re-raised."""
+	if not plan.ok:
+		raise ValueError("; ".join(plan.problems))
+	completed: List[Tuple[str, str]] = []
+	try:
+		for src, dst in plan.steps:
+			if os.path.lexists(dst):
+				raise FileExistsError(dst)
+			os.rename(src, dst)
+			completed.append((src, dst))
+	except OSError:
+		for src, dst in reversed(completed):
+			try:
+				os.rename(dst, src)
+			except OSError:
+				pass
+		raise
+	return list(plan.operations)
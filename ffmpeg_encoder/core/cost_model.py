@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import heapq
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .encoder_bench import BENCH_DIR, CodecBenchmark, host_name, load_results
+from .ffmpeg_cmd import VideoSettings
+from .ffprobe import run_ffprobe
+from .queue import JobStatus, QueueItem
+from .stream_copy import plan_stream_copy
+from ..utils.events import job_scope
+
+
+REFERENCE_PIXELS = 1920 * 1080
+# Speed (x realtime) at 1080p for hosts that have not been benchmarked yet
+DEFAULT_SPEED = {
+	"libx264": 1.5,
+	"libx264_ll": 6.0,
+	"libx265": 0.4,
+	"libx265_ll": 2.0,
+	"h264_nvenc": 8.0,
+	"h264_nvenc_ll": 10.0,
+	"hevc_nvenc": 6.0,
+	"hevc_nvenc_ll": 8.0,
+	"libvpx-vp9": 0.3,
+	"libaom-av1": 0.05,
+	"prores_ks": 2.0,
+	"dnxhd": 3.0,
+}
+FALLBACK_SPEED = 1.0
+COPY_SPEED = 50.0
+# Fixed cost per job: probing, process start-up, muxing
+JOB_OVERHEAD = 1.0
+# Weight of the newest observation in the per-host throughput history
+HISTORY_WEIGHT = 0.3
+PROBE_WORKERS = 8
+
+
+def history_path(host: Optional[str] = None) -> Path:
+	return BENCH_DIR / f"{host or host_name()}.history.json"
+
+
+def estimate_makespan(costs: Iterable[float], workers: int, busy: Iterable[float] = ()) -> float:
+	"""Finish time of list-scheduling `costs` in order onto `workers`, some already `busy` for a while."""
+	loads = sorted(busy)[:workers]
+	loads += [0.0] * (max(1, workers) - len(loads))
+	heapq.heapify(loads)
+	for cost in costs:
+		heapq.heapreplace(loads, loads[0] + cost)
+	return max(loads)
+
+
+class CostModel:
+	"""Predicts job wall time from duration, resolution, codec and this host's throughput.
+
+	Speeds are normalised to 1080p. Observed speeds from finished jobs take
+	precedence over `ffmpeg-encoder bench` results, which take precedence over
+	built-in defaults.
+	"""
+
+	def __init__(self, bench: Optional[Dict[str, CodecBenchmark]] = None, history: Optional[Dict[str, float]] = None) -> None:
+		self.bench = bench or {}
+		self.history: Dict[str, float] = dict(history or {})
+		self._lock = threading.Lock()
+
+	@classmethod
+	def for_host(cls, host: Optional[str] = None) -> "CostModel":
+		try:
+			history = json.loads(history_path(host).read_text(encoding="utf-8"))
+		except (OSError, ValueError):
+			history = {}
+		return cls(load_results(host), history)
+
+	def save(self, host: Optional[str] = None) -> Path:
+		path = history_path(host)
+		path.parent.mkdir(parents=True, exist_ok=True)
+		with self._lock:
+			path.write_text(json.dumps(self.history, indent=2, sort_keys=True), encoding="utf-8")
+		return path
+
+	def speed(self, codec: str) -> float:
+		"""x realtime at 1080p for one pass of `codec`."""
+		if codec in self.history:
+			return self.history[codec]
+		bench = self.bench.get(codec)
+		if bench is not None and bench.speed > 0 and bench.width and bench.height:
+			return bench.speed * bench.width * bench.height / REFERENCE_PIXELS
+		return DEFAULT_SPEED.get(codec, FALLBACK_SPEED)
+
+	def prepare(self, items: List[QueueItem]) -> None:
+		"""Probe items that have no probe yet, in parallel; the results are kept on the items."""
+		missing = [item for item in items if item.probe is None]
+
+		def _probe(item: QueueItem) -> None:
+			try:
+				with job_scope(item.job_id):
+					item.probe = run_ffprobe(item.source_path)
+			except Exception:
+				return
+			if item.duration is None:
+				try:
+					item.duration = float(item.probe.get("format", {}).get("duration"))
+				except (TypeError, ValueError):
+					pass
+
+		if missing:
+			with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(missing))) as pool:
+				list(pool.map(_probe, missing))
+
+	def predict(self, item: QueueItem) -> float:
+		"""Predicted wall seconds for `item`; unknown durations count as one minute."""
+		s = item.settings or VideoSettings()
+		duration = item.duration or 60.0
+		if item.probe and plan_stream_copy(item.probe, s).video:
+			return JOB_OVERHEAD + duration / COPY_SPEED
+		pixel_scale = _pixels(item) / REFERENCE_PIXELS
+		seconds = duration * pixel_scale / self.speed(s.video_codec) * _passes(s)
+		if s.quality_metrics:
+			# Sampled metric passes decode both files
+			seconds += duration * 0.1
+		return JOB_OVERHEAD + seconds
+
+	def observe(self, item: QueueItem, seconds: float) -> None:
+		"""Fold a finished job's measured throughput into the history for its codec."""
+		s = item.settings or VideoSettings()
+		if item.status != JobStatus.DONE or not item.duration or seconds <= JOB_OVERHEAD:
+			return
+		if s.content_aware or s.target_size or s.quality_metrics or (s.verify and s.verify_samples):
+			# Extra stages make the wall time a poor measure of encoder speed
+			return
+		if item.probe and plan_stream_copy(item.probe, s).video:
+			return
+		speed = item.duration * _pixels(item) / REFERENCE_PIXELS * _passes(s) / (seconds - JOB_OVERHEAD)
+		with self._lock:
+			previous = self.history.get(s.video_codec)
+			self.history[s.video_codec] = speed if previous is None else previous + HISTORY_WEIGHT * (speed - previous)
+
+	def order(self, items: List[QueueItem]) -> List[Tuple[QueueItem, float]]:
+		"""Longest predicted job first: greedy list scheduling of that order keeps the makespan near optimal."""
+		return sorted(((item, self.predict(item)) for item in items), key=lambda pair: pair[1], reverse=True)
+
+
+def _pixels(item: QueueItem) -> int:
+	for stream in (item.probe or {}).get("streams", []):
+		if stream.get("codec_type") == "video" and stream.get("width") and stream.get("height"):
+			return int(stream["width"]) * int(stream["height"])
+	return REFERENCE_PIXELS
+
+
+def _passes(s: VideoSettings) -> int:
+	return 2 if s.two_pass and "nvenc" not in s.video_codec else 1
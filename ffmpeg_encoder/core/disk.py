@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .ffmpeg_cmd import VideoSettings, parse_bitrate
+from .queue import QueueItem
+from .stream_copy import plan_stream_copy
+from .target_size import parse_size
+
+
+# Video bits per pixel per frame at CRF/QP 18, by codec; lower CRF doubles the size every 6 steps
+BITS_PER_PIXEL = {
+	"libx264": 0.10,
+	"libx265": 0.06,
+	"h264_nvenc": 0.13,
+	"hevc_nvenc": 0.09,
+	"libvpx-vp9": 0.06,
+	"libaom-av1": 0.05,
+}
+# Intra codecs ignore CRF; rates at their default profiles
+INTRA_BITS_PER_PIXEL = {"prores_ks": 2.4, "dnxhd": 2.3}
+DEFAULT_BITS_PER_PIXEL = 0.15
+DEFAULT_PIXELS = 1920 * 1080
+DEFAULT_FPS = 30.0
+DEFAULT_AUDIO_BITRATE = 192_000
+# Reserve this much more than the estimate, and keep this much free on every volume
+SPACE_MARGIN = 1.2
+MIN_FREE_BYTES = 1024 ** 3
+
+
+def _video_stream(probe: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+	return next((s for s in (probe or {}).get("streams", []) if s.get("codec_type") == "video"), {})
+
+
+def _fps(stream: Dict[str, Any]) -> float:
+	num, _, den = str(stream.get("avg_frame_rate") or stream.get("r_frame_rate") or "").partition("/")
+	try:
+		fps = float(num) / float(den or 1)
+	except (ValueError, ZeroDivisionError):
+		return DEFAULT_FPS
+	return fps if fps > 0 else DEFAULT_FPS
+
+
+def estimate_output_bytes(settings: VideoSettings, duration: Optional[float], probe: Optional[Dict[str, Any]] = None) -> int:
+	"""Rough size of the encoded file; 0 when the duration is unknown."""
+	if not duration:
+		return 0
+	s = settings
+	cap = parse_size(s.max_filesize) if s.max_filesize and not s.target_size else None
+	if s.target_size:
+		return parse_size(s.target_size) or 0
+	audio = parse_bitrate(s.audio_bitrate) or (DEFAULT_AUDIO_BITRATE if s.audio_codec else 0)
+	if probe and s.stream_copy and plan_stream_copy(probe, s).video:
+		try:
+			video = float(probe.get("format", {}).get("bit_rate")) - audio
+		except (TypeError, ValueError):
+			video = 0.0
+	elif s.bitrate:
+		video = parse_bitrate(s.bitrate) or 0
+	else:
+		stream = _video_stream(probe)
+		pixels = int(stream.get("width") or 0) * int(stream.get("height") or 0) or DEFAULT_PIXELS
+		codec = s.video_codec.replace("_ll", "")
+		if codec in INTRA_BITS_PER_PIXEL:
+			bpp = INTRA_BITS_PER_PIXEL[codec]
+		else:
+			bpp = BITS_PER_PIXEL.get(codec, DEFAULT_BITS_PER_PIXEL) * 2 ** ((18 - (s.crf if s.crf is not None else 18)) / 6)
+		video = pixels * _fps(stream) * bpp
+	size = int((max(video, 0) + audio) * duration / 8)
+	return min(size, cap) if cap else size
+
+
+def device_of(path: str) -> Tuple[int, str]:
+	"""(st_dev, existing directory) for the volume `path` will be written to."""
+	folder = os.path.dirname(os.path.abspath(path))
+	while not os.path.isdir(folder):
+		parent = os.path.dirname(folder)
+		if parent == folder:
+			break
+		folder = parent
+	return os.stat(folder).st_dev, folder
+
+
+@dataclass
+class _Volume:
+	folder: str
+	reserved: int = 0
+	writers: int = 0
+
+
+@dataclass
+class Admission:
+	index: Optional[int] = None  # pending item to start, or None to wait
+	error: Optional[str] = None  # the item at `index` can never fit and should fail
+	waiting: List[int] = field(default_factory=list)  # pending items held back by space or writer limits
+
+
+class DiskBudget:
+	"""Per-volume free-space reservations and writer limits for a batch.
+
+	A job starts only if its estimated output fits in the volume's free space
+	minus what running jobs on it have reserved, and fewer than
+	`writers_per_device` jobs already write there. Reservations are released
+	when a job finishes.
+	"""
+
+	def __init__(
+		self,
+		writers_per_device: Optional[int] = None,
+		margin: float = SPACE_MARGIN,
+		min_free: int = MIN_FREE_BYTES,
+		usage: Callable[[str], Any] = shutil.disk_usage,
+	) -> None:
+		self.writers_per_device = writers_per_device
+		self.margin = margin
+		self.min_free = min_free
+		self.usage = usage
+		self._volumes: Dict[int, _Volume] = {}
+		self._jobs: Dict[str, Tuple[int, int]] = {}  # job_id -> (device, reserved bytes)
+		self._devices: Dict[str, int] = {}  # output folder -> device
+
+	def _device(self, path: str) -> int:
+		key = os.path.dirname(path)
+		device = self._devices.get(key)
+		if device is None:
+			device, folder = device_of(path)
+			self._devices[key] = device
+			self._volumes.setdefault(device, _Volume(folder))
+		return device
+
+	def pick(self, pending: Iterable[QueueItem], path_of: Optional[Callable[[QueueItem], str]] = None) -> Admission:
+		"""First pending item that may start now, in queue order; call with the scheduler's lock held.
+
+		`pending` is read only up to the picked item, so it may be a lazy
+		iterator. `path_of(item)` is the file the job will write, when that is
+		not its output path (e.g. a scratch copy).
+		"""
+		path_of = path_of or (lambda item: item.output_path)
+		free: Dict[int, int] = {}
+		admission = Admission()
+		for index, item in enumerate(pending):
+			device = self._device(path_of(item))
+			volume = self._volumes[device]
+			if self.writers_per_device and volume.writers >= self.writers_per_device:
+				admission.waiting.append(index)
+				continue
+			need = int(estimate_output_bytes(item.settings or VideoSettings(), item.duration, item.probe) * self.margin)
+			if device not in free:
+				free[device] = self.usage(volume.folder).free - self.min_free
+			if need == 0 or need <= free[device] - volume.reserved:
+				admission.index = index
+				return admission
+			if volume.writers == 0:
+				# Nothing will free up space on this volume by finishing
+				admission.index = index
+				admission.error = (
+					f"Not enough space in {volume.folder}: needs about {need / 1024 ** 3:.1f} GB, "
+					f"{max(0, free[device]) / 1024 ** 3:.1f} GB free"
+				)
+				return admission
+			admission.waiting.append(index)
+		return admission
+
+	def acquire(self, item: QueueItem, path: Optional[str] = None) -> None:
+		"""Reserve the item's estimated size and a writer slot on the volume of `path` (default its output)."""
+		device = self._device(path or item.output_path)
+		need = int(estimate_output_bytes(item.settings or VideoSettings(), item.duration, item.probe) * self.margin)
+		volume = self._volumes[device]
+		volume.reserved += need
+		volume.writers += 1
+		self._jobs[item.job_id] = (device, need)
+
+	def redirect(self, item: QueueItem, path: str) -> None:
+		"""Move a running job's reservation to the volume of `path`, which it writes from now on."""
+		entry = self._jobs.get(item.job_id)
+		if entry is None:
+			return
+		device, need = entry
+		target = self._device(path)
+		if target == device:
+			return
+		old, new = self._volumes[device], self._volumes[target]
+		old.reserved -= need
+		old.writers -= 1
+		new.reserved += need
+		new.writers += 1
+		self._jobs[item.job_id] = (target, need)
+
+	def release(self, item: QueueItem) -> None:
+		entry = self._jobs.pop(item.job_id, None)
+		if entry is None:
+			return
+		device, need = entry
+		volume = self._volumes[device]
+		volume.reserved -= need
+		volume.writers -= 1
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import codecs
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, fields, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .ffmpeg_cmd import VideoSettings, build_ffmpeg_commands
+from .ffprobe import run_ffprobe
+from .progress import parse_stats_line
+
+
+BENCH_DIR = Path.home() / ".ffmpeg_encoder" / "bench"
+REFERENCE_SIZE = (1280, 720)
+REFERENCE_RATE = 30
+REFERENCE_SECONDS = 10.0
+# Per-codec limit; slow encoders (libaom-av1) are cut off and scored from their progress so far
+CODEC_TIMEOUT = 300.0
+
+# Codecs whose defaults do not encode an arbitrary 8-bit 4:2:0 clip
+_CODEC_ARGS = {
+	"dnxhd": "-profile:v dnxhr_sq -pix_fmt yuv422p",
+	"prores_ks": "-profile:v 2",
+}
+_CODEC_CONTAINER = {"prores_ks": "mov", "dnxhd": "mov"}
+
+_LINE_SPLIT = re.compile(r"\r\n|\r|\n")
+
+
+@dataclass
+class CodecBenchmark:
+	codec: str
+	fps: float
+	speed: float  # clip seconds encoded per wall second
+	cpu_percent: Optional[float]  # CPU time / wall time, 100 per busy core
+	peak_rss_bytes: Optional[int]
+	output_bytes: int
+	width: int
+	height: int
+	wall_seconds: float
+	complete: bool = True
+	error: Optional[str] = None
+
+	@property
+	def pixels_per_second(self) -> float:
+		return self.fps * self.width * self.height
+
+
+def host_name() -> str:
+	return re.sub(r"[^A-Za-z0-9_.-]", "_", socket.gethostname()) or "localhost"
+
+
+def results_path(host: Optional[str] = None) -> Path:
+	return BENCH_DIR / f"{host or host_name()}.json"
+
+
+def load_results(host: Optional[str] = None) -> Dict[str, CodecBenchmark]:
+	"""Stored benchmarks for `host` (default: this machine), keyed by codec."""
+	path = results_path(host)
+	try:
+		data = json.loads(path.read_text(encoding="utf-8"))
+	except (OSError, ValueError):
+		return {}
+	names = {f.name for f in fields(CodecBenchmark)}
+	return {
+		codec: CodecBenchmark(**{k: v for k, v in entry.items() if k in names})
+		for codec, entry in data.get("results", {}).items()
+	}
+
+
+def save_results(results: List[CodecBenchmark], host: Optional[str] = None) -> Path:
+	"""Merge `results` into the host's file, replacing earlier runs of the same codecs."""
+	merged = load_results(host)
+	merged.update({r.codec: r for r in results})
+	path = results_path(host)
+	path.parent.mkdir(parents=True, exist_ok=True)
+	data = {
+		"host": host or host_name(),
+		"updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		"cpu_count": os.cpu_count(),
+		"results": {codec: asdict(r) for codec, r in sorted(merged.items())},
+	}
+	path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+	return path
+
+
+def available_video_codecs(info: Optional[Dict[str, Any]] = None) -> List[str]:
+	from ..utils.ffmpeg_check import get_user_friendly_codecs
+
+	return [c["id"] for c in get_user_friendly_codecs(None, info)["video"] if not c.get("separator")]
+
+
+def reference_clip(seconds: float = REFERENCE_SECONDS) -> Path:
+	"""A cached testsrc2 + sine clip at the reference size, generated on first use."""
+	width, height = REFERENCE_SIZE
+	path = BENCH_DIR / f"reference_{height}p_{seconds:g}s.mkv"
+	if path.exists():
+		return path
+	path.parent.mkdir(parents=True, exist_ok=True)
+	tmp = path.with_name(path.stem + ".tmp.mkv")
+	subprocess.run(
+		[
+			"ffmpeg", "-hide_banner", "-v", "error", "-y",
+			"-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={REFERENCE_RATE}:duration={seconds:g}",
+			"-f", "lavfi", "-i", f"sine=frequency=1000:duration={seconds:g}",
+			"-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p",
+			"-c:a", "aac", "-shortest", str(tmp),
+		],
+		check=True,
+		capture_output=True,
+	)
+	os.replace(tmp, path)
+	return path
+
+
+def _windows_usage(proc: subprocess.Popen) -> Tuple[Optional[float], Optional[int]]:
+	import ctypes
+	from ctypes import wintypes
+
+	class _MemoryCounters(ctypes.Structure):
+		_fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+			(name, ctypes.c_size_t)
+			for name in (
+				"PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+				"QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage",
+			)
+		]
+
+	handle = int(proc._handle)  # type: ignore[attr-defined]
+	times = [ctypes.c_ulonglong() for _ in range(4)]  # creation, exit, kernel, user in 100 ns units
+	cpu = None
+	if ctypes.windll.kernel32.GetProcessTimes(handle, *[ctypes.byref(t) for t in times]):
+		cpu = (times[2].value + times[3].value) / 1e7
+	counters = _MemoryCounters()
+	counters.cb = ctypes.sizeof(counters)
+	rss = None
+	if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+		rss = int(counters.PeakWorkingSetSize)
+	return cpu, rss
+
+
+def run_measured(cmd: List[str], timeout: Optional[float] = None, on_stats: Optional[Callable[[Dict[str, float]], None]] = None) -> Tuple[int, float, Optional[float], Optional[int], Dict[str, float], bool]:
+	"""Run `cmd` and return (exit code, wall seconds, CPU seconds, peak RSS bytes, last stats, timed out)."""
+	started = time.perf_counter()
+	proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+	timed_out = threading.Event()
+
+	def _kill() -> None:
+		timed_out.set()
+		proc.kill()
+
+	timer = threading.Timer(timeout, _kill) if timeout else None
+	if timer is not None:
+		timer.start()
+	last: Dict[str, float] = {}
+	decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+	pending = ""
+	assert proc.stderr is not None
+	while True:
+		chunk = proc.stderr.read1(64 * 1024)
+		if not chunk:
+			break
+		*lines, pending = _LINE_SPLIT.split(pending + decoder.decode(chunk))
+		for line in lines:
+			stats = parse_stats_line(line)
+			if stats:
+				last = stats
+				if on_stats is not None:
+					on_stats(stats)
+	proc.stderr.close()
+
+	cpu: Optional[float] = None
+	rss: Optional[int] = None
+	if hasattr(os, "wait4"):
+		_, status, usage = os.wait4(proc.pid, 0)
+		proc.returncode = os.waitstatus_to_exitcode(status)
+		cpu = usage.ru_utime + usage.ru_stime
+		# ru_maxrss is KiB on Linux and bytes on macOS
+		rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+	else:
+		proc.wait()
+		if os.name == "nt":
+			try:
+				cpu, rss = _windows_usage(proc)
+			except (OSError, AttributeError):
+				pass
+	wall = time.perf_counter() - started
+	if timer is not None:
+		timer.cancel()
+	return proc.returncode, wall, cpu, rss, last, timed_out.is_set()
+
+
+def benchmark_codec(
+	clip: str,
+	codec: str,
+	width: int,
+	height: int,
+	duration: float,
+	output_dir: Path,
+	timeout: Optional[float] = CODEC_TIMEOUT,
+) -> CodecBenchmark:
+	"""Encode `clip` once with `codec` at default quality and measure the run."""
+	settings = replace(
+		VideoSettings(),
+		container=_CODEC_CONTAINER.get(codec, "mkv"),
+		video_codec=codec,
+		gpu_enable="nvenc" in codec,
+		low_latency="_ll" in codec,
+		extra_params=_CODEC_ARGS.get(codec),
+	)
+	output = output_dir / f"bench_{codec}.{settings.output_extension()}"
+	cmd = build_ffmpeg_commands(clip, str(output), settings)[0]
+	code, wall, cpu, rss, stats, timed_out = run_measured(cmd, timeout)
+
+	encoded = stats.get("time", 0.0)
+	frames = stats.get("frame", 0.0)
+	size = output.stat().st_size if output.exists() else 0
+	if output.exists():
+		output.unlink()
+	error = None
+	if timed_out:
+		error = f"timed out after {timeout:.0f}s"
+	elif code != 0:
+		error = f"ffmpeg exited with {code}"
+	if error and not frames:
+		return CodecBenchmark(codec, 0.0, 0.0, None, rss, 0, width, height, wall, complete=False, error=error)
+	return CodecBenchmark(
+		codec=codec,
+		fps=frames / wall if wall else 0.0,
+		speed=(encoded or duration) / wall if wall else 0.0,
+		cpu_percent=cpu / wall * 100 if cpu is not None and wall else None,
+		peak_rss_bytes=rss,
+		# A cut-off run only wrote part of the clip; scale its size to the whole clip
+		output_bytes=int(size * duration / encoded) if timed_out and encoded else size,
+		width=width,
+		height=height,
+		wall_seconds=wall,
+		complete=error is None,
+		error=error,
+	)
+
+
+def run_benchmarks(
+	clip: Optional[str] = None,
+	codecs: Optional[List[str]] = None,
+	timeout: Optional[float] = CODEC_TIMEOUT,
+	on_result: Optional[Callable[[CodecBenchmark], None]] = None,
+) -> List[CodecBenchmark]:
+	"""Benchmark `codecs` (default: every available one) on `clip` (default: the reference clip)."""
+	clip_path = str(clip or reference_clip())
+	probe = run_ffprobe(clip_path)
+	video = next((s for s in probe.get("streams", []) if s.get("codec_type") == "video"), {})
+	width, height = int(video.get("width") or 0), int(video.get("height") or 0)
+	duration = float(probe.get("format", {}).get("duration") or 0)
+
+	output_dir = BENCH_DIR / "out"
+	output_dir.mkdir(parents=True, exist_ok=True)
+	results = []
+	for codec in codecs or available_video_codecs():
+		result = benchmark_codec(clip_path, codec, width, height, duration, output_dir, timeout)
+		results.append(result)
+		if on_result is not None:
+			on_result(result)
+	return results
+
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import tempfile
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 @dataclass
@@ -17,13 +20,66 @@ class VideoSettings:
 	audio_codec: str = "aac"
 	audio_bitrate: Optional[str] = "192k"
 	max_filesize: Optional[str] = None
+	target_size: Optional[str] = None
 	extra_params: Optional[str] = None
+	content_aware: bool = False
+	stream_copy: bool = False
+	quality_metrics: bool = False
+	metric_samples: int = 3
+	verify: bool = False
+	verify_samples: int = 0
 
 	def output_extension(self) -> str:
 		return self.container
 
+	def crf_applies(self) -> bool:
+		"""Whether the CRF/QP value drives quality for this codec (single pass only)."""
+		if self.two_pass or self.crf is None:
+			return False
+		base_codec = self.video_codec.replace("_ll", "")
+		return base_codec.startswith("libx26") or base_codec in ["h264_nvenc", "hevc_nvenc"]
 
-def build_ffmpeg_commands(input_path: str, output_path: str, s: VideoSettings) -> List[List[str]]:
+
+_BITRATE_UNITS = {"": 1, "k": 1_000, "m": 1_000_000, "g": 1_000_000_000}
+
+
+def parse_bitrate(value: Optional[str]) -> Optional[int]:
+	"""Parse an ffmpeg style bitrate such as "8M" or "2000k" into bits per second."""
+	if not value:
+		return None
+	text = value.strip().lower()
+	unit = text[-1] if text and text[-1] in _BITRATE_UNITS else ""
+	number = text[:-1] if unit else text
+	try:
+		return int(float(number) * _BITRATE_UNITS[unit])
+	except ValueError:
+		return None
+
+
+def format_bitrate(bits_per_second: float) -> str:
+	"""Format bits per second as an ffmpeg bitrate string in kbit/s."""
+	return f"{max(1, int(round(bits_per_second / 1000)))}k"
+
+
+def passlog_prefix(output_path: str) -> str:
+	"""Two-pass log prefix unique per output, so concurrent jobs never share stats files."""
+	digest = hashlib.sha1(os.path.abspath(output_path).encode("utf-8")).hexdigest()[:12]
+	return os.path.join(tempfile.gettempdir(), f"ffmpeg2pass-{digest}")
+
+
+def build_ffmpeg_commands(
+	input_path: str,
+	output_path: str,
+	s: VideoSettings,
+	probe: Optional[Dict[str, Any]] = None,
+	gpu: Optional[int] = None,
+) -> List[List[str]]:
+	"""Build the ffmpeg invocations for one file.
+
+	`probe` is the source's ffprobe info; with `s.stream_copy` set, streams that
+	already match the target are copied instead of re-encoded. `gpu` selects
+	the NVENC device.
+	"""
 	cmd_base: List[str] = [
 		"ffmpeg",
 		"-y",
@@ -89,6 +145,9 @@ def build_ffmpeg_commands(input_path: str, output_path: str, s: VideoSettings) -
 			if s.bitrate:
 				video_args += ["-b:v", s.bitrate]
 
+	if gpu is not None and "nvenc" in s.video_codec:
+		video_args += ["-gpu", str(gpu)]
+
 	if s.gpu_enable:
 		# Rely on chosen codec (e.g., h264_nvenc) rather than auto
 		pass
@@ -99,24 +158,36 @@ def build_ffmpeg_commands(input_path: str, output_path: str, s: VideoSettings) -
 		if s.audio_bitrate:
 			audio_args += ["-b:a", s.audio_bitrate]
 
+	copy_plan = None
+	if probe is not None and s.stream_copy:
+		from .stream_copy import plan_stream_copy
+		copy_plan = plan_stream_copy(probe, s)
+		if copy_plan.video:
+			video_args = ["-c:v", "copy"]
+			# Apple players only accept HEVC in MP4/MOV with the hvc1 tag
+			if s.container in ["mp4", "mov", "m4v"] and s.video_codec in ["libx265", "hevc_nvenc"]:
+				video_args += ["-tag:v", "hvc1"]
+		if copy_plan.audio and s.audio_codec:
+			audio_args = ["-c:a", "copy"]
+
 	misc_args: List[str] = []
-	if s.max_filesize:
+	# A target size is met through rate control; -fs would only truncate the output
+	if s.max_filesize and not s.target_size:
 		misc_args += ["-fs", s.max_filesize]
 	if s.extra_params:
 		misc_args += s.extra_params.split()
 
 	full = cmd_base + video_args + audio_args + misc_args + [output_path]
 
-	if not s.two_pass:
+	if not s.two_pass or (copy_plan and copy_plan.video):
 		return [full]
 
+	# NVENC does both passes inside the encoder
+	if "nvenc" in s.video_codec:
+		return [cmd_base + video_args + ["-multipass", "fullres"] + audio_args + misc_args + [output_path]]
+
 	# Two pass: only for typical x264/x265 style
-	import tempfile
-	import os
-	
-	# Create a temporary directory for pass files
-	temp_dir = tempfile.gettempdir()
-	pass_log = os.path.join(temp_dir, f"ffmpeg2pass-{os.getpid()}.log")
+	pass_log = passlog_prefix(output_path)
 	
 	first = cmd_base + video_args + [
 		"-pass", "1",
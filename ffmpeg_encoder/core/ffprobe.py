@@ -4,6 +4,8 @@ import json
 import subprocess
 from typing import Any, Dict
 
+from ..utils.events import span
+
 
 def run_ffprobe(path: str) -> Dict[str, Any]:
 	cmd = [
@@ -16,10 +18,11 @@ def run_ffprobe(path: str) -> Dict[str, Any]:
 		"-show_streams",
 		path,
 	]
-	proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
-	if proc.returncode != 0:
-		raise RuntimeError(proc.stderr.strip())
-	return json.loads(proc.stdout)
+	with span("probe", path=path):
+		proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
+		if proc.returncode != 0:
+			raise RuntimeError(proc.stderr.strip())
+		return json.loads(proc.stdout)
 
 
 def probe_duration_seconds(path: str) -> float | None:
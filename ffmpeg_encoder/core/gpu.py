@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import subprocess
+from typing import Callable, Dict, List, Optional
+
+from .ffmpeg_cmd import VideoSettings
+from .queue import QueueItem
+
+
+# Concurrent NVENC sessions a GeForce driver allows per GPU; raise it for newer drivers or pro cards
+DEFAULT_NVENC_SESSIONS = 3
+
+
+def uses_nvenc(settings: Optional[VideoSettings]) -> bool:
+	return settings is not None and "nvenc" in settings.video_codec
+
+
+def count_nvenc_devices() -> int:
+	"""NVIDIA GPUs listed by nvidia-smi; 1 when it is missing, so ffmpeg's default device is still used."""
+	try:
+		proc = subprocess.run(["nvidia-smi", "-L"], capture_output=True, text=True, timeout=10, check=False)
+	except (OSError, subprocess.SubprocessError):
+		return 1
+	devices = sum(1 for line in proc.stdout.splitlines() if line.startswith("GPU "))
+	return devices or 1
+
+
+class GpuSlots:
+	"""NVENC session slots per GPU, used by the batch scheduler like a counting semaphore per device.
+
+	A job on an NVENC codec may start only while some device has a free
+	session, and gets the least busy one. The device count is looked up on
+	first use, so CPU-only batches never run nvidia-smi.
+	"""
+
+	def __init__(
+		self,
+		sessions_per_device: int = DEFAULT_NVENC_SESSIONS,
+		devices: Optional[int] = None,
+		detect: Callable[[], int] = count_nvenc_devices,
+	) -> None:
+		self.sessions_per_device = max(1, sessions_per_device)
+		self._devices = devices
+		self._detect = detect
+		self._busy: List[int] = []
+		self._jobs: Dict[str, int] = {}  # job id -> device
+
+	@property
+	def devices(self) -> int:
+		if self._devices is None:
+			self._devices = max(1, self._detect())
+		return self._devices
+
+	def _loads(self) -> List[int]:
+		if not self._busy:
+			self._busy = [0] * self.devices
+		return self._busy
+
+	@property
+	def capacity(self) -> int:
+		return self.devices * self.sessions_per_device
+
+	def admits(self, item: QueueItem) -> bool:
+		"""Whether `item` may start now; call with the scheduler's lock held."""
+		if not uses_nvenc(item.settings):
+			return True
+		return min(self._loads()) < self.sessions_per_device
+
+	def acquire(self, item: QueueItem) -> None:
+		"""Take a session on the least busy device; the device index goes to `item.gpu`."""
+		if not uses_nvenc(item.settings):
+			return
+		loads = self._loads()
+		device = min(range(len(loads)), key=loads.__getitem__)
+		loads[device] += 1
+		self._jobs[item.job_id] = device
+		# With one GPU leave the command as it was
+		item.gpu = device if len(loads) > 1 else None
+
+	def __contains__(self, job_id: str) -> bool:
+		return job_id in self._jobs
+
+	def release(self, item: QueueItem) -> None:
+		device = self._jobs.pop(item.job_id, None)
+		if device is not None:
+			self._busy[device] -= 1
+
+	def busy(self) -> List[int]:
+		"""Sessions in use per device."""
+		return list(self._loads())
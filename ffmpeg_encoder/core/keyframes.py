@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Iterator, List, Optional
+
+from ..utils.events import span
+
+
+INDEX_DIR = Path.home() / ".ffmpeg_encoder" / "keyframes"
+INDEX_MAGIC = b"FEKF1\n"
+# "packets" reads the demuxer's keyframe flags without decoding; "frames" decodes only keyframes (exact for open GOP)
+METHODS = ("packets", "frames")
+# Scene change score (0-1) above which a frame counts as a cut
+DEFAULT_SCENE_THRESHOLD = 0.4
+# Scene detection runs on frames scaled down to this height
+SCENE_HEIGHT = 180
+# A chunk boundary moves back to a scene cut up to this fraction of the chunk length
+SCENE_SLACK = 0.25
+# Seconds a keyframe may sit from a scene cut and still count as on it (about a frame)
+SCENE_TOLERANCE = 0.04
+# Lines of error output kept for the message of a failed scan
+ERROR_TAIL = 20
+
+_PTS_TIME = re.compile(rb"pts_time:\s*(-?[\d.]+)")
+
+
+@dataclass
+class KeyframeIndex:
+	"""Keyframe and scene cut times of one source, in seconds, ascending.
+
+	Times are kept in `array('d')` (8 bytes each), so even hour-long
+	sources with a keyframe per frame stay small, and lookups are binary
+	searches.
+	"""
+
+	keyframes: array = field(default_factory=lambda: array("d"))
+	scenes: array = field(default_factory=lambda: array("d"))
+	scene_threshold: Optional[float] = None  # None: scenes were not detected
+
+	def keyframe_at_or_before(self, t: float) -> Optional[float]:
+		"""Nearest keyframe at or before `t`, or None when `t` is before the first one."""
+		i = bisect_right(self.keyframes, t)
+		return self.keyframes[i - 1] if i else None
+
+	def keyframe_after(self, t: float) -> Optional[float]:
+		"""First keyframe strictly after `t`."""
+		i = bisect_right(self.keyframes, t)
+		return self.keyframes[i] if i < len(self.keyframes) else None
+
+	def scenes_between(self, start: float, end: float) -> List[float]:
+		"""Scene cuts in [start, end)."""
+		return list(self.scenes[bisect_left(self.scenes, start):bisect_left(self.scenes, end)])
+
+	def keyframe_near(self, t: float, tolerance: float) -> Optional[float]:
+		"""Keyframe closest to `t` if it is at most `tolerance` seconds away."""
+		i = bisect_left(self.keyframes, t)
+		near = [k for k in self.keyframes[max(0, i - 1):i + 1] if abs(k - t) <= tolerance]
+		return min(near, key=lambda k: abs(k - t)) if near else None
+
+	def chunk_boundaries(self, chunk_seconds: float, duration: float, min_seconds: Optional[float] = None) -> List[float]:
+		"""Split points, all on keyframes, for chunks of about `chunk_seconds`.
+
+		Each split goes to the latest keyframe at or before its nominal time,
+		or to a scene cut within `SCENE_SLACK` of a chunk before it when a
+		keyframe lies on that cut (within `SCENE_TOLERANCE`), so chunk seams
+		hide in cuts. No chunk, including the last, is shorter than
+		`min_seconds` (default half a chunk).
+		"""
+		if chunk_seconds <= 0:
+			raise ValueError(f"chunk_seconds must be positive, got {chunk_seconds}")
+		min_seconds = chunk_seconds / 2 if min_seconds is None else min_seconds
+
+		def usable(point: Optional[float]) -> bool:
+			return point is not None and point > last and point - last >= min_seconds and duration - point >= min_seconds
+
+		boundaries: List[float] = []
+		last = 0.0
+		target = chunk_seconds
+		while target < duration - min_seconds:
+			point = None
+			for cut in reversed(self.scenes_between(target - chunk_seconds * SCENE_SLACK, target + 1e-6)):
+				point = self.keyframe_near(cut, SCENE_TOLERANCE)
+				if usable(point):
+					break
+				point = None
+			if point is None:
+				point = self.keyframe_at_or_before(target)
+			if not usable(point):
+				# No usable keyframe before this target; try one chunk later
+				target += chunk_seconds
+				continue
+			boundaries.append(point)
+			last = point
+			target = point + chunk_seconds
+		return boundaries
+
+
+def _stream_lines(cmd: List[str], from_stderr: bool = False) -> Iterator[bytes]:
+	"""Yield the output lines of `cmd` as they are written, holding only the last few in memory.
+
+	Raises RuntimeError with the tail of the error output when `cmd` fails.
+	"""
+	tail: Deque[bytes] = deque(maxlen=ERROR_TAIL)
+	# stderr of ffprobe goes to a file: a full pipe nobody reads would stall it
+	with tempfile.TemporaryFile() as errors:
+		proc = subprocess.Popen(
+			cmd,
+			stdin=subprocess.DEVNULL,
+			stdout=subprocess.DEVNULL if from_stderr else subprocess.PIPE,
+			stderr=subprocess.PIPE if from_stderr else errors,
+		)
+		stream = proc.stderr if from_stderr else proc.stdout
+		finished = False
+		try:
+			for line in stream:
+				if from_stderr:
+					tail.append(line)
+				yield line
+			finished = True
+		finally:
+			stream.close()
+			if not finished:
+				# The caller stopped early
+				proc.kill()
+			code = proc.wait()
+		if code != 0:
+			if not from_stderr:
+				size = errors.seek(0, os.SEEK_END)
+				errors.seek(max(0, size - 200 * ERROR_TAIL))
+				tail.extend(errors.read().splitlines()[-ERROR_TAIL:])
+			message = b"\n".join(line.rstrip() for line in tail).decode("utf-8", "replace").strip()
+			raise RuntimeError(message or f"{cmd[0]} exited with code {code}")
+
+
+def _first_float(fields: List[bytes]) -> Optional[float]:
+	for value in fields:
+		try:
+			return float(value)
+		except ValueError:
+			continue
+	return None
+
+
+def iter_keyframes(path: str, method: str = "packets") -> Iterator[float]:
+	"""Keyframe times of the first video stream, in file order."""
+	if method == "packets":
+		cmd = [
+			"ffprobe", "-v", "error", "-select_streams", "v:0",
+			"-show_entries", "packet=pts_time,dts_time,flags", "-of", "csv=print_section=0", path,
+		]
+	elif method == "frames":
+		cmd = [
+			"ffprobe", "-v", "error", "-skip_frame", "nokey", "-select_streams", "v:0",
+			"-show_entries", "frame=best_effort_timestamp_time", "-of", "csv=print_section=0", path,
+		]
+	else:
+		raise ValueError(f"Unknown method '{method}', expected one of {', '.join(METHODS)}")
+	for line in _stream_lines(cmd):
+		fields = line.strip().split(b",")
+		if method == "packets" and b"K" not in fields[-1]:
+			continue
+		t = _first_float(fields)
+		if t is not None:
+			yield t
+
+
+def iter_scene_cuts(path: str, threshold: float = DEFAULT_SCENE_THRESHOLD) -> Iterator[float]:
+	"""Times of frames whose scene change score is above `threshold`; decodes the whole video stream."""
+	cmd = [
+		"ffmpeg", "-hide_banner", "-nostats", "-i", path, "-map", "0:v:0", "-an", "-sn", "-dn",
+		"-vf", f"scale=-2:{SCENE_HEIGHT},select='gt(scene,{threshold})',showinfo", "-f", "null", "-",
+	]
+	for line in _stream_lines(cmd, from_stderr=True):
+		if b"Parsed_showinfo" in line:
+			match = _PTS_TIME.search(line)
+			if match:
+				yield float(match.group(1))
+
+
+def _sorted_array(values: Iterator[float]) -> array:
+	times = array("d")
+	ordered = True
+	for t in values:
+		if times and t < times[-1]:
+			ordered = False
+		times.append(t)
+	# Packets come in decode order; keyframes are nearly always in presentation order already
+	return times if ordered else array("d", sorted(times))
+
+
+def build_index(path: str, scene_threshold: Optional[float] = None, method: str = "packets") -> KeyframeIndex:
+	"""Scan `path` for keyframes, and for scene cuts when `scene_threshold` is given."""
+	with span("keyframes", path=path, method=method, scenes=scene_threshold is not None) as fields:
+		index = KeyframeIndex(_sorted_array(iter_keyframes(path, method)), scene_threshold=scene_threshold)
+		if scene_threshold is not None:
+			index.scenes = _sorted_array(iter_scene_cuts(path, scene_threshold))
+		fields["keyframes"] = len(index.keyframes)
+		fields["scenes"] = len(index.scenes)
+	return index
+
+
+def index_path(path: str, index_dir: Path = INDEX_DIR) -> Path:
+	key = hashlib.sha1(os.path.normcase(os.path.abspath(path)).encode("utf-8")).hexdigest()[:20]
+	return index_dir / f"{key}.kfi"
+
+
+def _source_stamp(path: str) -> dict:
+	st = os.stat(path)
+	return {"source": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def save_index(path: str, index: KeyframeIndex, method: str = "packets", index_dir: Path = INDEX_DIR) -> Path:
+	"""Store the index beside a stamp of the source, so a changed source is scanned again."""
+	header = dict(_source_stamp(path), method=method, scene_threshold=index.scene_threshold,
+		keyframes=len(index.keyframes), scenes=len(index.scenes))
+	target = index_path(path, index_dir)
+	target.parent.mkdir(parents=True, exist_ok=True)
+	partial = target.with_suffix(f".{os.getpid()}.partial")
+	with open(partial, "wb") as f:
+		f.write(INDEX_MAGIC)
+		f.write(json.dumps(header).encode("utf-8") + b"\n")
+		index.keyframes.tofile(f)
+		index.scenes.tofile(f)
+	os.replace(partial, target)
+	return target
+
+
+def read_index(path: str, method: str = "packets", scene_threshold: Optional[float] = None, index_dir: Path = INDEX_DIR) -> Optional[KeyframeIndex]:
+	"""Stored index of `path`, or None when there is none or it no longer matches the source or the options."""
+	try:
+		with open(index_path(path, index_dir), "rb") as f:
+			if f.readline() != INDEX_MAGIC:
+				return None
+			header = json.loads(f.readline())
+			stamp = _source_stamp(path)
+			if header.get("method") != method or any(header.get(k) != v for k, v in stamp.items()):
+				return None
+			if scene_threshold is not None and header.get("scene_threshold") != scene_threshold:
+				return None
+			index = KeyframeIndex(scene_threshold=header.get("scene_threshold"))
+			index.keyframes.fromfile(f, header["keyframes"])
+			index.scenes.fromfile(f, header["scenes"])
+			return index
+	except (OSError, ValueError, KeyError, EOFError):
+		return None
+
+
+def load_index(path: str, scene_threshold: Optional[float] = None, method: str = "packets", index_dir: Path = INDEX_DIR) -> KeyframeIndex:
+	"""Keyframe (and scene) index of `path`, from the on-disk cache or scanned and cached now."""
+	index = read_index(path, method, scene_threshold, index_dir)
+	if index is None:
+		index = build_index(path, scene_threshold, method)
+		try:
+			save_index(path, index, method, index_dir)
+		except OSError:
+			pass
+	return index
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from .ffmpeg_cmd import VideoSettings, build_ffmpeg_commands
+
+
+SWEEP_AXES = frozenset(f.name for f in fields(VideoSettings))
+
+# Settings that change what the pipeline does around ffmpeg without changing its argv.
+_PIPELINE_FIELDS = ("content_aware", "target_size", "stream_copy", "quality_metrics", "metric_samples", "verify", "verify_samples")
+
+
+@dataclass
+class Rendition:
+	settings: VideoSettings
+	variant: Dict[str, Any] = field(default_factory=dict)  # sweep axis values that produced it
+
+
+def validate_sweep(sweep: Dict[str, Sequence[Any]]) -> None:
+	unknown = set(sweep) - SWEEP_AXES
+	if unknown:
+		raise ValueError(f"Unknown sweep axes: {', '.join(sorted(unknown))}")
+	for axis, values in sweep.items():
+		if isinstance(values, (str, bytes)) or not values:
+			raise ValueError(f"Sweep axis '{axis}' needs a non-empty list of values")
+
+
+def expand_settings(base: VideoSettings, sweep: Dict[str, Sequence[Any]]) -> Iterator[Rendition]:
+	"""Yield one rendition per point of the sweep's cartesian product, in declaration order."""
+	validate_sweep(sweep)
+	if not sweep:
+		yield Rendition(base)
+		return
+	axes = list(sweep)
+	for values in itertools.product(*(sweep[axis] for axis in axes)):
+		variant = dict(zip(axes, values))
+		changes = dict(variant)
+		codec = variant.get("video_codec")
+		if codec is not None:
+			# Same derivation as the settings panel
+			changes.setdefault("gpu_enable", "nvenc" in codec)
+			changes.setdefault("low_latency", "_ll" in codec)
+		yield Rendition(replace(base, **changes), variant)
+
+
+def job_key(source: str, s: VideoSettings) -> Tuple:
+	"""Identity of the work a job does: its ffmpeg argv plus the pipeline stages around it."""
+	placeholder = f"output.{s.output_extension()}"
+	argv = tuple(tuple(cmd) for cmd in build_ffmpeg_commands(source, placeholder, s))
+	return (argv,) + tuple(getattr(s, name) for name in _PIPELINE_FIELDS)
+
+
+def iter_jobs(files: Sequence[str], renditions: Iterable[Rendition], skipped: List[Tuple[str, Rendition]] | None = None) -> Iterator[Tuple[str, Rendition]]:
+	"""Lazily pair every rendition with every file, dropping jobs identical to an earlier one.
+
+	Dropped pairs are appended to `skipped` when given.
+	"""
+	seen = set()
+	for rendition in renditions:
+		for source in files:
+			key = (source, job_key(source, rendition.settings))
+			if key in seen:
+				if skipped is not None:
+					skipped.append((source, rendition))
+				continue
+			seen.add(key)
+			yield source, rendition
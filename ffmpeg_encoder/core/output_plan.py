@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+
+# What to do when an output path already exists on disk; the output dialog's "If file exists" choices
+EXISTS_POLICIES = ("Ask", "Overwrite", "Skip", "Rename")
+PARTIAL_MARKER = ".partial"
+
+
+def _key(path: str) -> str:
+	return os.path.normcase(os.path.abspath(path))
+
+
+class OutputPlanner:
+	"""Resolves the output paths of a batch against each other and the disk before any job starts.
+
+	Two jobs of one batch never get the same path: a later one is renamed
+	with a numeric suffix whatever the policy. A path that exists on disk is
+	handled by `policy`; "Ask" calls `ask(path)`, which returns one of the
+	other three.
+	"""
+
+	def __init__(
+		self,
+		policy: str = "Overwrite",
+		ask: Optional[Callable[[str], str]] = None,
+		exists: Callable[[str], bool] = os.path.exists,
+	) -> None:
+		if policy not in EXISTS_POLICIES:
+			raise ValueError(f"Unknown policy '{policy}', expected one of {', '.join(EXISTS_POLICIES)}")
+		self.policy = policy
+		self.ask = ask
+		self.exists = exists
+		self._reserved: Set[str] = set()
+		self._next_suffix: Dict[str, int] = {}
+
+	def __contains__(self, path: str) -> bool:
+		return _key(path) in self._reserved
+
+	def _decide(self, path: str) -> str:
+		if self.policy != "Ask":
+			return self.policy
+		choice = self.ask(path) if self.ask is not None else "Skip"
+		return choice if choice in ("Overwrite", "Skip", "Rename") else "Skip"
+
+	def _free_name(self, path: str) -> str:
+		p = Path(path)
+		base = _key(path)
+		n = self._next_suffix.get(base, 1)
+		while True:
+			candidate = str(p.with_name(f"{p.stem}_{n}{p.suffix}"))
+			n += 1
+			if _key(candidate) not in self._reserved and not self.exists(candidate):
+				self._next_suffix[base] = n
+				return candidate
+
+	def reserve(self, path: str) -> Optional[str]:
+		"""Claim `path` (or a renamed variant) for one job; None means the job should be skipped."""
+		key = _key(path)
+		if key in self._reserved:
+			path = self._free_name(path)
+		elif self.exists(path):
+			choice = self._decide(path)
+			if choice == "Skip":
+				return None
+			if choice == "Rename":
+				path = self._free_name(path)
+		self._reserved.add(_key(path))
+		return path
+
+	def release(self, path: str) -> None:
+		self._reserved.discard(_key(path))
+
+
+def temp_output_path(output_path: str, token: str) -> str:
+	"""Sibling of `output_path` that ffmpeg writes first; it keeps the extension so the muxer is unchanged."""
+	p = Path(output_path)
+	return str(p.with_name(f".{p.stem}.{token}{PARTIAL_MARKER}{p.suffix}"))
+
+
+def writes_atomically(output_path: str) -> bool:
+	"""Image sequences and segment patterns write many files and cannot be renamed into place."""
+	return "%" not in Path(output_path).name
+
+
+def discard_output(temp_path: str) -> None:
+	try:
+		os.remove(temp_path)
+	except OSError:
+		pass
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import glob
+import os
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from .analysis import apply_content_aware
+from .ffmpeg_cmd import VideoSettings, build_ffmpeg_commands, passlog_prefix
+from .ffprobe import probe_duration_seconds, run_ffprobe
+from .output_plan import discard_output, temp_output_path, writes_atomically
+from .progress import parse_stats_line
+from .quality import format_scores, score_output
+from .queue import JobStatus, QueueItem
+from .retry import NO_RETRY, STDERR_TAIL, VERIFY, RetryPolicy, classify_failure
+from .runner import CommandRunner
+from .stream_copy import plan_stream_copy
+from .target_size import apply_target_size, size_correction
+from .verify import verify_output
+from ..utils.events import event, span
+
+
+# Re-encodes allowed to pull a target-size output back inside the tolerance.
+MAX_SIZE_CORRECTIONS = 1
+# Exit code reported for an ffmpeg run that succeeded but whose output failed verification
+VERIFY_FAILED = -2
+# Exit code reported for a job stopped by the user
+CANCELLED = -3
+
+
+def prepare_settings(item: QueueItem, on_log: Callable[[str], None]) -> VideoSettings:
+	"""Resolve the per-file settings for `item` before its commands are built."""
+	settings = item.settings or VideoSettings()
+	if settings.target_size:
+		settings = apply_target_size(item.source_path, settings)
+		on_log(f"Target size {settings.target_size}: video bitrate {settings.bitrate}")
+	elif settings.content_aware:
+		settings = apply_content_aware(item.source_path, settings, on_log)
+	return settings
+
+
+def score_item(item: QueueItem, on_log: Callable[[str], None]) -> None:
+	"""Post-encode stage: store quality scores on the item. Never fails the job."""
+	try:
+		with span("score", samples=item.settings.metric_samples):
+			item.scores = score_output(item.source_path, item.output_path, samples=item.settings.metric_samples)
+	except Exception as e:
+		on_log(f"Quality scoring failed for {item.output_path}: {e}")
+		return
+	if item.scores:
+		on_log(f"Quality: {format_scores(item.scores)}")
+
+
+def verify_item(item: QueueItem, on_log: Callable[[str], None]) -> Optional[str]:
+	"""Post-encode stage: check the output against the source; returns the failure reason, if any."""
+	if item.probe is None:
+		item.probe = run_ffprobe(item.source_path)
+	with span("verify", samples=item.settings.verify_samples) as fields:
+		result = verify_output(item.probe, item.output_path, item.settings, samples=item.settings.verify_samples)
+		fields["problems"] = result.problems
+	if result.ok:
+		return None
+	for problem in result.problems:
+		on_log(f"Verification of {item.output_path}: {problem}")
+	return "Verification failed: " + "; ".join(result.problems)
+
+
+def run_commands(item: QueueItem, runner: CommandRunner, cancelled: Optional[Callable[[], bool]] = None) -> int:
+	"""Run every pass for the item's current settings; stops at the first failure or cancellation."""
+	code = 0
+	try:
+		with span("build"):
+			commands = build_ffmpeg_commands(item.source_path, item.output_path, item.settings, item.probe, item.gpu)
+		with span("encode", passes=len(commands), codec=item.settings.video_codec) as fields:
+			for cmd in commands:
+				if cancelled is not None and cancelled():
+					code = CANCELLED
+					break
+				code = runner.run(cmd)
+				if code != 0:
+					break
+			fields["code"] = code
+	finally:
+		if item.settings.two_pass:
+			for path in glob.glob(passlog_prefix(item.output_path) + "*"):
+				try:
+					os.remove(path)
+				except OSError:
+					pass
+	return code
+
+
+def encode_item(
+	item: QueueItem,
+	runner: CommandRunner,
+	on_log: Optional[Callable[[str], None]] = None,
+	on_status: Optional[Callable[[str], None]] = None,
+	cancelled: Optional[Callable[[], bool]] = None,
+) -> int:
+	"""Run every stage of one queue item and record the outcome on it.
+
+	ffmpeg writes to a hidden temp file next to the output, which is renamed
+	into place only when every stage succeeded; failed or interrupted jobs
+	never leave a file under the final name. `cancelled` is polled between
+	stages; the caller terminates the running ffmpeg itself.
+	"""
+	if not item.output_path:
+		raise ValueError(f"No output path for {item.source_path}")
+	final_path = item.output_path
+	if not writes_atomically(final_path):
+		return _encode_stages(item, runner, on_log, on_status, cancelled)
+	# Every stage (size correction, verify, scoring) works on the temp file
+	item.output_path = temp_output_path(final_path, item.job_id)
+	code = -1
+	try:
+		code = _encode_stages(item, runner, on_log, on_status, cancelled)
+		if code == 0:
+			try:
+				os.replace(item.output_path, final_path)
+			except OSError as e:
+				code = -1
+				item.status = JobStatus.FAILED
+				item.message = f"Could not move the output into place: {e}"
+	finally:
+		if code != 0:
+			discard_output(item.output_path)
+		item.output_path = final_path
+	return code
+
+
+def encode_with_retry(
+	item: QueueItem,
+	runner: CommandRunner,
+	policy: RetryPolicy = NO_RETRY,
+	on_log: Optional[Callable[[str], None]] = None,
+	on_status: Optional[Callable[[str], None]] = None,
+	cancelled: Optional[Callable[[], bool]] = None,
+	sleep: Callable[[float], None] = time.sleep,
+) -> int:
+	"""`encode_item`, rerun per `policy` while its failures are classified as transient.
+
+	A GPU failure the policy falls back on reruns on the CPU at once, even
+	with no retries left: that rerun is not counted against `max_attempts`.
+	A job that still fails is marked FAILED with the classified reason.
+	"""
+	tail: deque = deque(maxlen=STDERR_TAIL)
+	runner_log = runner.on_log
+
+	def capture(line: str) -> None:
+		if parse_stats_line(line) is None:
+			tail.append(line)
+		runner_log(line)
+
+	log = on_log or runner_log
+	status = on_status or (lambda text: None)
+	stopped = cancelled or (lambda: False)
+	settings = item.settings
+	fallbacks = 0
+	runner.on_log = capture
+	try:
+		while True:
+			tail.clear()
+			item.attempts += 1
+			# Every attempt starts from the job's settings, not the previous attempt's resolved ones
+			item.settings = settings
+			code = encode_item(item, runner, on_log, on_status, cancelled)
+			if code == 0 or item.status == JobStatus.CANCELLED:
+				return code
+			failure = classify_failure(code, tail)
+			reason = item.message if failure.kind == VERIFY else failure.reason
+			fallback = policy.next_settings(failure, settings or VideoSettings())
+			if fallback is not None:
+				# The CPU rerun is a different job, not a retry, so it does not use up the retry budget
+				event("job_retry", attempt=item.attempts, kind=failure.kind, reason=reason, fallback=fallback.video_codec)
+				log(f"{reason}; retrying on {fallback.video_codec}")
+				settings = fallback
+				fallbacks += 1
+				continue
+			if item.attempts - fallbacks >= policy.max_attempts or not failure.retryable:
+				item.message = reason if item.attempts == 1 else f"{reason} (after {item.attempts} attempts)"
+				return code
+			event("job_retry", attempt=item.attempts, kind=failure.kind, reason=reason)
+			delay = policy.delay(item.attempts)
+			log(f"{reason}; retrying in {delay:.0f}s (attempt {item.attempts + 1} of {policy.max_attempts})")
+			status(f"Retrying in {delay:.0f}s")
+			deadline = time.monotonic() + delay
+			while not stopped() and time.monotonic() < deadline:
+				sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+			if stopped():
+				item.status = JobStatus.CANCELLED
+				item.message = "Cancelled"
+				status("Cancelled")
+				return CANCELLED
+	finally:
+		runner.on_log = runner_log
+
+
+def _encode_stages(
+	item: QueueItem,
+	runner: CommandRunner,
+	on_log: Optional[Callable[[str], None]],
+	on_status: Optional[Callable[[str], None]],
+	cancelled: Optional[Callable[[], bool]] = None,
+) -> int:
+	log = on_log or runner.on_log
+	status = on_status or (lambda text: None)
+	stopped = cancelled or (lambda: False)
+	item.status = JobStatus.RUNNING
+	settings = item.settings or VideoSettings()
+	copy_plan = None
+	if settings.stream_copy:
+		if item.probe is None:
+			item.probe = run_ffprobe(item.source_path)
+		copy_plan = plan_stream_copy(item.probe, settings)
+		if copy_plan.label:
+			log(f"{copy_plan.label}: {item.source_path} already matches the target")
+
+	copy_video = bool(copy_plan and copy_plan.video)
+	if copy_video:
+		# Nothing left to tune when the video stream is copied as-is
+		item.settings = settings
+	else:
+		if settings.content_aware or settings.target_size:
+			status("Analyzing")
+			with span("analyze"):
+				item.settings = prepare_settings(item, log)
+		else:
+			item.settings = prepare_settings(item, log)
+
+	status(copy_plan.label if copy_plan and copy_plan.label else "Encoding")
+	code = run_commands(item, runner, stopped)
+
+	if code == 0 and item.settings.target_size and not copy_video:
+		duration = probe_duration_seconds(item.source_path) or 0
+		for _ in range(MAX_SIZE_CORRECTIONS):
+			corrected = size_correction(item.settings, item.output_path, duration)
+			if corrected is None:
+				break
+			log(f"Output missed target size {item.settings.target_size}; re-encoding at {corrected.bitrate}")
+			item.settings = corrected
+			code = run_commands(item, runner, stopped)
+			if code != 0:
+				break
+
+	if stopped():
+		# Whatever the terminated ffmpeg returned, and even if it had just finished
+		item.status = JobStatus.CANCELLED
+		status("Cancelled")
+		item.message = "Cancelled"
+		return CANCELLED
+
+	failure = None
+	if code == 0 and item.settings.verify:
+		status("Verifying")
+		failure = verify_item(item, log)
+		if failure:
+			code = VERIFY_FAILED
+
+	if code == 0 and item.settings.quality_metrics:
+		score_item(item, log)
+
+	item.status = JobStatus.DONE if code == 0 else JobStatus.FAILED
+	status("Done" if code == 0 else "Failed")
+	item.progress = 1.0 if code == 0 else item.progress
+	item.message = None if code == 0 else failure or f"ffmpeg exited with code {code}"
+	return code
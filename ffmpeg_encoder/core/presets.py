@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Tuple
 import json
+import os
+import threading
+import time
 from pydantic import BaseModel, Field, ValidationError
 
+from .ffmpeg_cmd import VideoSettings
+from .matrix import Rendition, expand_settings, validate_sweep
+
 
 class Preset(BaseModel):
 	name: str
@@ -19,12 +26,65 @@ class Preset(BaseModel):
 	audio_codec: str = "aac"
 	audio_bitrate: Optional[str] = "192k"
 	max_filesize: Optional[str] = None
+	target_size: Optional[str] = None
 	additional_params: Optional[str] = Field(default=None, description="Extra ffmpeg args string")
 	extra_params: Optional[str] = Field(default=None, description="Extra ffmpeg args string")
+	content_aware: bool = False
+	stream_copy: bool = False
+	quality_metrics: bool = False
+	metric_samples: int = 3
+	verify: bool = False
+	verify_samples: int = 0
+	tags: List[str] = Field(default_factory=list)
+	description: Optional[str] = None
+	base: Optional[str] = Field(default=None, description="Preset whose values this one overrides")
+	sweep: Dict[str, List[Any]] = Field(default_factory=dict, description="Axis -> values to expand into renditions")
 
 	def to_settings(self) -> Dict[str, Any]:
 		return self.model_dump()
 
+	def to_video_settings(self) -> VideoSettings:
+		data = self.model_dump()
+		settings = VideoSettings(**{f.name: data[f.name] for f in fields(VideoSettings) if f.name in data})
+		if not settings.extra_params and self.additional_params:
+			settings.extra_params = self.additional_params
+		return settings
+
+	def renditions(self) -> Iterator[Rendition]:
+		"""Lazily expand the sweep axes; a preset without a sweep is a single rendition."""
+		return expand_settings(self.to_video_settings(), self.sweep)
+
+
+def resolve_preset(preset: Preset, lookup: Callable[[str], Preset]) -> Preset:
+	"""Flatten `preset` onto its chain of bases.
+
+	Only fields stored in a preset file override its base; sweep axes merge
+	by axis, nearest preset winning.
+	"""
+	chain = [preset]
+	seen = {preset.name}
+	while chain[-1].base:
+		name = chain[-1].base
+		if name in seen:
+			raise ValueError(f"Preset inheritance cycle: {' -> '.join(p.name for p in chain)} -> {name}")
+		try:
+			parent = lookup(name)
+		except (KeyError, FileNotFoundError):
+			raise ValueError(f"Preset '{chain[-1].name}' inherits from missing preset '{name}'") from None
+		chain.append(parent)
+		seen.add(name)
+
+	data: Dict[str, Any] = {}
+	sweep: Dict[str, List[Any]] = {}
+	for item in reversed(chain):
+		for key in item.model_fields_set:
+			data[key] = getattr(item, key)
+		sweep.update(item.sweep)
+	data.update(name=preset.name, base=None, sweep=sweep)
+	resolved = Preset(**data)
+	validate_sweep(resolved.sweep)
+	return resolved
+
 
 class PresetStore:
 	def __init__(self, root: Optional[Path] = None) -> None:
@@ -38,9 +98,14 @@ class PresetStore:
 
 	def save(self, preset: Preset) -> Path:
 		path = self.root / f"{preset.name}.json"
-		data = preset.model_dump()
-		if not data.get("additional_params"):
-			data["additional_params"] = None
+		if preset.base:
+			# Keep only the overrides so later changes to the base carry through
+			data = preset.model_dump(exclude_unset=True)
+			data["name"] = preset.name
+		else:
+			data = preset.model_dump()
+			if not data.get("additional_params"):
+				data["additional_params"] = None
 		path.write_text(json.dumps(data, indent=2), encoding="utf-8")
 		return path
 
@@ -49,6 +114,9 @@ class PresetStore:
 		data = json.loads(path.read_text(encoding="utf-8"))
 		return Preset(**data)
 
+	def resolve(self, name: str) -> Preset:
+		return resolve_preset(self.load(name), self.load)
+
 	def delete(self, name: str) -> None:
 		path = self.root / f"{name}.json"
 		if path.exists():
@@ -67,6 +135,8 @@ class PresetStore:
 
 	def export_preset(self, settings: Dict[str, Any], file_path: str) -> None:
 		"""Export settings as a preset to a file."""
+		settings = dict(settings)
+		settings.setdefault("name", Path(file_path).stem)
 		preset = Preset(**settings)
 		Path(file_path).write_text(preset.model_dump_json(indent=2), encoding="utf-8")
 
@@ -74,3 +144,155 @@ class PresetStore:
 		"""Import a preset from a file."""
 		data = json.loads(Path(file_path).read_text(encoding="utf-8"))
 		return Preset(**data)
+
+
+@dataclass
+class _CatalogEntry:
+	preset: Preset
+	stamp: Tuple[int, int]  # (mtime_ns, size) of the file it was read from
+	haystack: str  # lower-cased name, description and tags for search
+
+
+class PresetCatalog:
+	"""Validated in-memory index of a preset folder.
+
+	Lookups never touch disk. `refresh` stats the folder and re-reads only
+	files whose mtime or size changed; call `invalidate` from a file watcher,
+	or set `poll_interval` to re-stat at most that often on lookup.
+	"""
+
+	def __init__(self, store: Optional[PresetStore] = None, poll_interval: Optional[float] = None) -> None:
+		self.store = store or PresetStore()
+		self.poll_interval = poll_interval
+		# File name -> reason, for presets that failed to parse or validate
+		self.errors: Dict[str, str] = {}
+		self._entries: Dict[str, _CatalogEntry] = {}
+		# Stamps of files that failed, so they are not re-read until they change
+		self._failed: Dict[str, Tuple[int, int]] = {}
+		self._lock = threading.RLock()
+		self._dirty = True
+		self._checked = 0.0
+
+	def invalidate(self) -> None:
+		"""Mark the index stale; the next lookup rescans the folder."""
+		self._dirty = True
+
+	def refresh(self) -> bool:
+		"""Bring the index in line with the folder; returns True if anything changed."""
+		with self._lock:
+			seen: Dict[str, Tuple[int, int]] = {}
+			try:
+				with os.scandir(self.store.root) as it:
+					for entry in it:
+						if entry.name.endswith(".json") and entry.is_file():
+							st = entry.stat()
+							seen[entry.name[:-5]] = (st.st_mtime_ns, st.st_size)
+			except OSError as e:
+				# Keep serving the last good index while a network folder is unreachable
+				self.errors[str(self.store.root)] = str(e)
+				return False
+			self.errors.pop(str(self.store.root), None)
+
+			changed = False
+			for name in list(self._entries):
+				if name not in seen:
+					del self._entries[name]
+					changed = True
+			for name in list(self._failed):
+				if name not in seen:
+					del self._failed[name]
+					self.errors.pop(f"{name}.json", None)
+
+			for name, stamp in seen.items():
+				current = self._entries.get(name)
+				if current is not None and current.stamp == stamp:
+					continue
+				if self._failed.get(name) == stamp:
+					continue
+				try:
+					preset = self.store.load(name)
+				except (OSError, ValueError, ValidationError) as e:
+					self._entries.pop(name, None)
+					self._failed[name] = stamp
+					self.errors[f"{name}.json"] = str(e)
+					changed = True
+					continue
+				self._failed.pop(name, None)
+				self.errors.pop(f"{name}.json", None)
+				self._entries[name] = _CatalogEntry(preset, stamp, _haystack(name, preset))
+				changed = True
+
+			self._dirty = False
+			self._checked = time.monotonic()
+			return changed
+
+	def _ensure_fresh(self) -> None:
+		if self._dirty or (
+			self.poll_interval is not None and time.monotonic() - self._checked >= self.poll_interval
+		):
+			self.refresh()
+
+	def names(self) -> List[str]:
+		self._ensure_fresh()
+		with self._lock:
+			return sorted(self._entries, key=str.lower)
+
+	def get(self, name: str) -> Preset:
+		"""Return the indexed preset; raises KeyError if it is not in the folder."""
+		self._ensure_fresh()
+		with self._lock:
+			return self._entries[name].preset
+
+	def resolve(self, name: str) -> Preset:
+		"""`get` with the base chain applied."""
+		return resolve_preset(self.get(name), self.get)
+
+	def __contains__(self, name: str) -> bool:
+		self._ensure_fresh()
+		with self._lock:
+			return name in self._entries
+
+	def __len__(self) -> int:
+		self._ensure_fresh()
+		with self._lock:
+			return len(self._entries)
+
+	def tags(self) -> List[str]:
+		self._ensure_fresh()
+		with self._lock:
+			return sorted({tag for entry in self._entries.values() for tag in entry.preset.tags}, key=str.lower)
+
+	def search(self, text: str = "", tags: Iterable[str] = ()) -> List[Preset]:
+		"""Presets whose name, description or tags contain every word of `text` and that carry all `tags`."""
+		self._ensure_fresh()
+		words = text.lower().split()
+		wanted = {tag.lower() for tag in tags}
+		with self._lock:
+			matches = [
+				entry.preset
+				for entry in self._entries.values()
+				if all(word in entry.haystack for word in words)
+				and wanted <= {tag.lower() for tag in entry.preset.tags}
+			]
+		return sorted(matches, key=lambda preset: preset.name.lower())
+
+	def save(self, preset: Preset) -> Path:
+		"""Write `preset` through to the folder and update the index in place."""
+		with self._lock:
+			path = self.store.save(preset)
+			st = path.stat()
+			self._entries[preset.name] = _CatalogEntry(preset, (st.st_mtime_ns, st.st_size), _haystack(preset.name, preset))
+			self._failed.pop(preset.name, None)
+			self.errors.pop(path.name, None)
+			return path
+
+	def delete(self, name: str) -> None:
+		with self._lock:
+			self.store.delete(name)
+			self._entries.pop(name, None)
+			self._failed.pop(name, None)
+			self.errors.pop(f"{name}.json", None)
+
+
+def _haystack(name: str, preset: Preset) -> str:
+	return " ".join([name, preset.description or "", *preset.tags]).lower()
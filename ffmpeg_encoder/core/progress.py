@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Optional
+
+
+_FIELD_RE = re.compile(r"(frame|fps|time|bitrate|speed)=\s*(\S+)")
+
+
+def parse_time(value: str) -> Optional[float]:
+	"""Parse an ffmpeg HH:MM:SS.xx timestamp into seconds."""
+	parts = value.split(":")
+	if len(parts) != 3:
+		return None
+	try:
+		hours, minutes, seconds = float(parts[0]), float(parts[1]), float(parts[2])
+	except ValueError:
+		return None
+	sign = -1 if value.startswith("-") else 1
+	return sign * (abs(hours) * 3600 + minutes * 60 + seconds)
+
+
+def parse_stats_line(line: str) -> Optional[Dict[str, float]]:
+	"""Parse an ffmpeg -stats line ("frame= 120 fps= 48 ... speed=1.9x").
+
+	Returns frame, fps, time (seconds), speed and bitrate (kbit/s) when present.
+	"""
+	if "time=" not in line:
+		return None
+	stats: Dict[str, float] = {}
+	for key, value in _FIELD_RE.findall(line):
+		if key == "time":
+			seconds = parse_time(value)
+			if seconds is not None:
+				stats["time"] = seconds
+		elif key == "speed":
+			try:
+				stats["speed"] = float(value.rstrip("x"))
+			except ValueError:
+				pass
+		elif key == "bitrate":
+			try:
+				stats["bitrate"] = float(value.replace("kbits/s", ""))
+			except ValueError:
+				pass
+		elif key in ("frame", "fps"):
+			try:
+				stats[key] = float(value)
+			except ValueError:
+				pass
+	return stats or None
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .analysis import sample_offsets
+from .ffprobe import run_ffprobe
+
+
+DEFAULT_METRICS = ("ssim", "psnr", "vmaf")
+SEGMENT_SECONDS = 4.0
+# PSNR is infinite for identical frames; cap it so averages stay meaningful.
+PSNR_CAP = 100.0
+
+_SSIM_RE = re.compile(r"SSIM .*All:\s*([\d.]+)")
+_PSNR_RE = re.compile(r"PSNR .*average:\s*([\d.]+|inf)")
+_VMAF_RE = re.compile(r"VMAF score[:=]\s*([\d.]+)")
+
+_FILTERS = {"ssim": "ssim", "psnr": "psnr", "vmaf": "libvmaf"}
+
+
+def available_metrics(requested: Sequence[str] = DEFAULT_METRICS) -> List[str]:
+	"""Drop metrics whose filter is missing from the ffmpeg build (usually VMAF)."""
+	from ..utils.ffmpeg_check import has_filter
+
+	return [m for m in requested if m in _FILTERS and (m != "vmaf" or has_filter("libvmaf"))]
+
+
+def _video_size(info: Dict) -> Optional[Tuple[int, int]]:
+	for stream in info.get("streams", []):
+		if stream.get("codec_type") == "video" and stream.get("width") and stream.get("height"):
+			return int(stream["width"]), int(stream["height"])
+	return None
+
+
+def build_metric_command(
+	source: str,
+	output: str,
+	metrics: Sequence[str],
+	size: Optional[Tuple[int, int]] = None,
+	start: Optional[float] = None,
+	seconds: Optional[float] = None,
+) -> List[str]:
+	"""Build one ffmpeg call that scores `output` (distorted) against `source` (reference)."""
+	window: List[str] = []
+	if start is not None:
+		window += ["-ss", f"{start:.3f}"]
+	if seconds is not None:
+		window += ["-t", f"{seconds:.3f}"]
+
+	count = len(metrics)
+	scale = f",scale={size[0]}:{size[1]}:flags=bicubic" if size else ""
+	dist = "".join(f"[d{i}]" for i in range(count))
+	ref = "".join(f"[r{i}]" for i in range(count))
+	graph = [
+		f"[0:v]settb=AVTB,setpts=PTS-STARTPTS{scale},split={count}{dist}",
+		f"[1:v]settb=AVTB,setpts=PTS-STARTPTS,split={count}{ref}",
+	]
+	graph += [f"[d{i}][r{i}]{_FILTERS[m]}" for i, m in enumerate(metrics)]
+
+	return [
+		"ffmpeg",
+		"-hide_banner",
+		"-nostats",
+		*window, "-i", output,
+		*window, "-i", source,
+		"-lavfi", ";".join(graph),
+		"-an",
+		"-f", "null",
+		"-",
+	]
+
+
+def parse_metric_output(stderr: str, metrics: Sequence[str]) -> Dict[str, float]:
+	scores: Dict[str, float] = {}
+	patterns = {"ssim": _SSIM_RE, "psnr": _PSNR_RE, "vmaf": _VMAF_RE}
+	for metric in metrics:
+		matches = patterns[metric].findall(stderr)
+		if not matches:
+			continue
+		value = matches[-1]
+		scores[metric] = PSNR_CAP if value == "inf" else min(float(value), PSNR_CAP)
+	return scores
+
+
+def _run_metrics(cmd: List[str], metrics: Sequence[str]) -> Dict[str, float]:
+	proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
+	if proc.returncode != 0:
+		lines = proc.stderr.strip().splitlines()
+		raise RuntimeError(lines[-1] if lines else f"ffmpeg exited with code {proc.returncode}")
+	return parse_metric_output(proc.stderr, metrics)
+
+
+def score_output(
+	source: str,
+	output: str,
+	metrics: Optional[Sequence[str]] = None,
+	samples: int = 3,
+	segment_seconds: float = SEGMENT_SECONDS,
+	workers: int = 2,
+) -> Dict[str, float]:
+	"""Compute SSIM/PSNR (and VMAF when available) of `output` against `source`.
+
+	With `samples` > 0 only that many evenly spread segments are scored, in
+	parallel, and the result is their duration-weighted mean; 0 scores the whole
+	file, as does a file no longer than the segments together.
+	"""
+	metrics = available_metrics(metrics or DEFAULT_METRICS)
+	if not metrics:
+		return {}
+
+	info = run_ffprobe(output)
+	size = _video_size(run_ffprobe(source))
+	duration = float(info.get("format", {}).get("duration") or 0)
+
+	windows: List[Tuple[Optional[float], Optional[float]]] = [(None, None)]
+	# Samples would cover the whole of a short file anyway, so it is scored in one unbounded pass
+	if samples > 0 and duration > samples * segment_seconds:
+		starts = sample_offsets(duration, samples, segment_seconds)
+		windows = [(start, min(segment_seconds, duration - start)) for start in starts]
+
+	cmds = [build_metric_command(source, output, metrics, size, start, seconds) for start, seconds in windows]
+	with ThreadPoolExecutor(max_workers=max(1, min(workers, len(cmds)))) as pool:
+		results = list(pool.map(lambda cmd: _run_metrics(cmd, metrics), cmds))
+
+	weights = [seconds or duration or 1.0 for _, seconds in windows]
+	scores: Dict[str, float] = {}
+	for metric in metrics:
+		pairs = [(r[metric], w) for r, w in zip(results, weights) if metric in r]
+		if pairs:
+			scores[metric] = sum(v * w for v, w in pairs) / sum(w for _, w in pairs)
+	return scores
+
+
+def format_scores(scores: Dict[str, float]) -> str:
+	parts = []
+	if "ssim" in scores:
+		parts.append(f"SSIM {scores['ssim']:.4f}")
+	if "psnr" in scores:
+		parts.append(f"PSNR {scores['psnr']:.2f} dB")
+	if "vmaf" in scores:
+		parts.append(f"VMAF {scores['vmaf']:.2f}")
+	return ", ".join(parts)
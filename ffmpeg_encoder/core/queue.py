@@ -1,8 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import uuid
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import List
+from typing import Any, Dict, List, Optional
+
+from .ffmpeg_cmd import VideoSettings
+from .telemetry import ProcessSample
 
 
 class JobStatus(Enum):
@@ -20,6 +24,15 @@ class QueueItem:
 	status: JobStatus = JobStatus.PENDING
 	progress: float = 0.0
 	message: str | None = None
+	settings: Optional[VideoSettings] = None
+	scores: Dict[str, float] = field(default_factory=dict)
+	probe: Optional[Dict[str, Any]] = None
+	duration: Optional[float] = None
+	job_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+	telemetry: List[ProcessSample] = field(default_factory=list)  # resource samples of its ffmpeg runs
+	attempts: int = 0  # encode runs, including retries
+	gpu: Optional[int] = None  # NVENC device assigned by the scheduler
+	priority: int = 0  # higher starts first; equal priorities keep the scheduler's order
 
 
 class JobQueue:
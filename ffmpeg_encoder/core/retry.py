@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import random
+import re
+from dataclasses import dataclass, replace
+from typing import Iterable, List, Optional, Pattern, Tuple
+
+from .ffmpeg_cmd import VideoSettings
+
+
+# Failure kinds
+IO_ERROR = "io"  # network share or disk hiccup
+GPU_BUSY = "gpu_busy"  # NVENC session limit or GPU memory exhausted
+GPU_UNAVAILABLE = "gpu_unavailable"  # no NVENC device or driver
+OUT_OF_MEMORY = "oom"
+VERIFY = "verify"
+INPUT = "input"  # missing or unreadable source
+SETTINGS = "settings"  # ffmpeg rejected the arguments
+UNKNOWN = "unknown"
+
+# Exit codes of ffmpeg killed by a signal; SIGKILL is almost always the OOM killer
+_SIGKILL_CODES = {-9, 137}
+# Exit code the pipeline reports for a failed output verification
+_VERIFY_FAILED = -2
+# Lines of ffmpeg output kept for classification
+STDERR_TAIL = 40
+
+# Checked in order against the whole tail: ffmpeg follows the real error with generic
+# ones ("Error initializing output stream", "Conversion failed!"), so specific patterns come first
+_PATTERNS: List[Tuple[Pattern[str], str, bool, str]] = [
+	(re.compile(p, re.IGNORECASE), kind, retryable, reason)
+	for p, kind, retryable, reason in [
+		(r"OpenEncodeSessionEx failed: (out of memory|incompatible client key)", GPU_BUSY, True, "NVENC session limit reached"),
+		(r"CUDA_ERROR_OUT_OF_MEMORY|cuMemAlloc.*out of memory", GPU_BUSY, True, "GPU out of memory"),
+		(r"No (NVENC|CUDA) capable devices found|Cannot load (libcuda|nvcuda|libnvidia-encode|nvEncodeAPI)"
+		 r"|Driver does not support the required nvenc API version|minimum required Nvidia driver",
+		 GPU_UNAVAILABLE, False, "NVENC not available"),
+		(r"Cannot allocate memory|Out of memory|std::bad_alloc", OUT_OF_MEMORY, True, "Out of memory"),
+		(r"Input/output error|Stale file handle|Connection (reset|refused|timed out)|Network is unreachable"
+		 r"|Host is down|Resource temporarily unavailable|Operation timed out|Server returned 5\d\d",
+		 IO_ERROR, True, "I/O error"),
+		(r"No such file or directory|Permission denied|Invalid data found when processing input|moov atom not found",
+		 INPUT, False, "Input cannot be read"),
+		(r"Unknown encoder|Unrecognized option|Option not found|Error (initializing|opening) output|Invalid argument"
+		 r"|Error setting option",
+		 SETTINGS, False, "Invalid encoder settings"),
+	]
+]
+
+# CPU codec to use when an NVENC encode cannot run on this machine
+CPU_FALLBACK = {
+	"h264_nvenc": "libx264",
+	"hevc_nvenc": "libx265",
+	"h264_nvenc_ll": "libx264_ll",
+	"hevc_nvenc_ll": "libx265_ll",
+}
+
+
+@dataclass(frozen=True)
+class Failure:
+	kind: str
+	reason: str
+	retryable: bool
+
+
+def classify_failure(code: int, lines: Iterable[str] = ()) -> Failure:
+	"""Classify a failed job from its exit code and the tail of its ffmpeg output."""
+	lines = list(lines)
+	for pattern, kind, retryable, reason in _PATTERNS:
+		for line in reversed(lines):
+			if pattern.search(line):
+				return Failure(kind, f"{reason}: {line.strip()}", retryable)
+	if code in _SIGKILL_CODES:
+		return Failure(OUT_OF_MEMORY, "ffmpeg was killed (out of memory?)", True)
+	if code == _VERIFY_FAILED:
+		# A damaged output is usually a write that went wrong, not the settings
+		return Failure(VERIFY, "Output failed verification", True)
+	return Failure(UNKNOWN, f"ffmpeg exited with code {code}", False)
+
+
+def cpu_fallback(settings: VideoSettings) -> Optional[VideoSettings]:
+	"""The same settings on the matching CPU encoder, or None if the codec is not NVENC."""
+	codec = CPU_FALLBACK.get(settings.video_codec)
+	if codec is None:
+		return None
+	return replace(settings, video_codec=codec, gpu_enable=False)
+
+
+@dataclass
+class RetryPolicy:
+	"""How often and how fast failed jobs are retried.
+
+	Only failures classified as retryable are retried, at most
+	`max_attempts` runs in total, waiting an exponentially growing, jittered
+	delay in between. With `gpu_fallback`, an NVENC job that hit the session
+	limit or has no GPU reruns at once on the CPU encoder; that rerun does
+	not count as an attempt, so it happens even with no retries.
+	"""
+
+	max_attempts: int = 3
+	base_delay: float = 10.0
+	max_delay: float = 300.0
+	gpu_fallback: bool = False
+
+	def delay(self, attempt: int) -> float:
+		"""Seconds to wait after failed attempt number `attempt` (1-based)."""
+		ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+		# Jitter keeps parallel jobs that failed together from retrying together
+		return ceiling * random.uniform(0.5, 1.0)
+
+	def next_settings(self, failure: Failure, settings: VideoSettings) -> Optional[VideoSettings]:
+		"""Settings for an immediate CPU rerun, when the policy allows one for this failure."""
+		if self.gpu_fallback and failure.kind in (GPU_BUSY, GPU_UNAVAILABLE):
+			return cpu_fallback(settings)
+		return None
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
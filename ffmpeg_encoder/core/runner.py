@@ -1,14 +1,66 @@
 from __future__ import annotations
 
+import os
+import signal
 import subprocess
 import threading
-from typing import Callable, List, Optional
+from typing import Callable, List, Optional, Protocol
+
+
+class CommandRunner(Protocol):
+	"""What the pipeline needs from a runner; FFmpegRunner and LoopRunner both provide it."""
+
+	on_log: Callable[[str], None]
+
+	def run(self, cmd: List[str]) -> int: ...
+
+	def terminate(self) -> None: ...
+
+	def pause(self) -> bool: ...
+
+	def resume(self) -> bool: ...
+
+
+def _nt_process_call(pid: int, name: str) -> bool:
+	import ctypes
+
+	PROCESS_SUSPEND_RESUME = 0x0800
+	handle = ctypes.windll.kernel32.OpenProcess(PROCESS_SUSPEND_RESUME, False, pid)
+	if not handle:
+		return False
+	try:
+		return getattr(ctypes.windll.ntdll, name)(handle) == 0
+	finally:
+		ctypes.windll.kernel32.CloseHandle(handle)
+
+
+def suspend_process(pid: int) -> bool:
+	"""Stop a process in place (SIGSTOP, or NtSuspendProcess on Windows); False if it is gone."""
+	if os.name == "nt":
+		return _nt_process_call(pid, "NtSuspendProcess")
+	try:
+		os.kill(pid, signal.SIGSTOP)
+	except ProcessLookupError:
+		return False
+	return True
+
+
+def resume_process(pid: int) -> bool:
+	if os.name == "nt":
+		return _nt_process_call(pid, "NtResumeProcess")
+	try:
+		os.kill(pid, signal.SIGCONT)
+	except ProcessLookupError:
+		return False
+	return True
 
 
 class FFmpegRunner:
 	def __init__(self, on_log: Callable[[str], None]) -> None:
 		self.on_log = on_log
 		self._proc: Optional[subprocess.Popen[str]] = None
+		self._paused = False
+		self._pause_requested = False  # also stops commands started while paused
 
 	def run(self, cmd: List[str]) -> int:
 		self.on_log("Running: " + " ".join(cmd))
@@ -20,6 +72,8 @@ class FFmpegRunner:
 			bufsize=1,
 			universal_newlines=True,
 		)
+		if self._pause_requested:
+			self._paused = suspend_process(self._proc.pid)
 
 		def _pipe(stream):
 			assert stream is not None
@@ -42,3 +96,20 @@ class FFmpegRunner:
 	def terminate(self) -> None:
 		if self._proc and self._proc.poll() is None:
 			self._proc.terminate()
+			if self._paused:
+				# A stopped process only acts on the signal once it runs again
+				self.resume()
+
+	def pause(self) -> bool:
+		"""Stop the running command, or, between commands (e.g. two passes), the next one as it starts."""
+		self._pause_requested = True
+		if self._proc is not None and self._proc.poll() is None:
+			self._paused = suspend_process(self._proc.pid)
+		return True
+
+	def resume(self) -> bool:
+		self._pause_requested = False
+		if self._proc is None or self._proc.poll() is not None:
+			return True
+		self._paused = False
+		return resume_process(self._proc.pid)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from ..utils.events import span
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v'}
+
+
+def is_video_file(path: str) -> bool:
+	return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+
+def scan_folder(folder: str, recursive: bool = False) -> List[str]:
+	"""Return the video files in `folder`, sorted by path."""
+	found: List[str] = []
+	pending = [folder]
+	with span("scan", folder=folder, recursive=recursive) as fields:
+		while pending:
+			current = pending.pop()
+			with os.scandir(current) as entries:
+				for entry in entries:
+					if entry.is_dir(follow_symlinks=False):
+						if recursive:
+							pending.append(entry.path)
+					elif entry.is_file() and is_video_file(entry.name):
+						found.append(entry.path)
+		fields["files"] = len(found)
+	return sorted(found)
+
+
+def read_manifest(path: str) -> List[Dict[str, Any]]:
+	"""Read a batch manifest.
+
+	JSON manifests are a list of paths or of {"source", "output", "preset",
+	"priority"} objects; any other file is one source path per line ("#" starts a comment).
+	"""
+	manifest = Path(path)
+	base = manifest.parent
+	entries: List[Dict[str, Any]] = []
+	if manifest.suffix.lower() == ".json":
+		data = json.loads(manifest.read_text(encoding="utf-8"))
+		for entry in data:
+			if isinstance(entry, str):
+				entry = {"source": entry}
+			if not entry.get("source"):
+				raise ValueError(f"Manifest entry without source: {entry}")
+			entries.append(dict(entry))
+	else:
+		for line in manifest.read_text(encoding="utf-8").splitlines():
+			line = line.strip()
+			if line and not line.startswith("#"):
+				entries.append({"source": line})
+
+	for entry in entries:
+		if not os.path.isabs(entry["source"]):
+			entry["source"] = str(base / entry["source"])
+	return entries
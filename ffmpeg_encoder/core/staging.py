@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from .disk import SPACE_MARGIN, estimate_output_bytes
+from .ffmpeg_cmd import VideoSettings
+from .output_plan import discard_output, temp_output_path, writes_atomically
+from .queue import QueueItem
+from ..utils.events import job_scope, span
+
+
+# File systems whose reads go over the network; their files are staged unless staging is forced for all inputs
+NETWORK_FS_TYPES = {
+	"cifs", "smb3", "smbfs", "nfs", "nfs4", "afs", "ceph", "glusterfs", "9p", "davfs",
+	"fuse.sshfs", "fuse.rclone", "fuse.s3fs", "fuse.gcsfuse",
+}
+DEFAULT_PREFETCH = 2
+DEFAULT_SCRATCH_BYTES = 100 * 1024 ** 3
+# Large sequential reads keep SMB/NFS streaming instead of round-tripping per block
+COPY_CHUNK = 16 * 1024 ** 2
+
+
+@lru_cache(maxsize=1)
+def _linux_mounts() -> Tuple[Tuple[str, str], ...]:
+	"""(mount point, fs type), longest mount point first."""
+	mounts = []
+	try:
+		with open("/proc/mounts", encoding="utf-8") as f:
+			for line in f:
+				parts = line.split()
+				if len(parts) >= 3:
+					point = parts[1].replace("\\040", " ").replace("\\011", "\t")
+					mounts.append((point, parts[2]))
+	except OSError:
+		return ()
+	return tuple(sorted(mounts, key=lambda m: len(m[0]), reverse=True))
+
+
+def is_network_path(path: str) -> bool:
+	"""True when `path` is on an SMB/NFS share (UNC or mapped drive on Windows, /proc/mounts on Linux)."""
+	path = os.path.abspath(path)
+	if os.name == "nt":
+		if path.startswith("\\\\"):
+			return True
+		import ctypes
+
+		drive = os.path.splitdrive(path)[0]
+		return bool(drive) and ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == 4  # DRIVE_REMOTE
+	for point, fs_type in _linux_mounts():
+		if path == point or path.startswith(point.rstrip("/") + "/"):
+			return fs_type in NETWORK_FS_TYPES
+	return False
+
+
+def copy_file(src: str, dst: str, chunk: int = COPY_CHUNK) -> int:
+	"""Copy with large sequential reads through one reused buffer; returns the bytes copied."""
+	buffer = bytearray(chunk)
+	view = memoryview(buffer)
+	copied = 0
+	with open(src, "rb", buffering=0) as fin, open(dst, "wb", buffering=0) as fout:
+		if hasattr(os, "posix_fadvise"):
+			os.posix_fadvise(fin.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+		while True:
+			n = fin.readinto(view)
+			if not n:
+				break
+			written = 0
+			while written < n:
+				written += fout.write(view[written:n])
+			copied += n
+	return copied
+
+
+@dataclass
+class _Entry:
+	source: str
+	local: str
+	size: int
+	ready: threading.Event = field(default_factory=threading.Event)
+	error: Optional[str] = None
+	refs: int = 0
+	opened: bool = False  # prefetched copies are kept at least until their job has used them
+	dropped: bool = False  # forgotten while its copy was queued or running
+
+
+class Stager:
+	"""Local scratch copies of slow (network) inputs and outputs for a batch.
+
+	`prefetch` copies upcoming inputs on a background thread while other jobs
+	encode; `open_input` hands a job its local copy, waiting for the copy if
+	it is still running. Copies stay cached, least recently used first out,
+	until `capacity` bytes are needed for newer ones. Outputs are written to
+	scratch and `move_back` copies them to their folder on another thread, so
+	the encoder never waits on the share. A file that does not fit is read or
+	written in place.
+	"""
+
+	def __init__(
+		self,
+		scratch_dir: str,
+		capacity: int = DEFAULT_SCRATCH_BYTES,
+		prefetch: int = DEFAULT_PREFETCH,
+		stage_all: bool = False,
+		copy: Callable[[str, str], int] = copy_file,
+	) -> None:
+		self.root = os.path.join(scratch_dir, f"staging-{uuid.uuid4().hex[:8]}")
+		os.makedirs(self.root)
+		self.capacity = capacity
+		self.prefetch_count = max(0, prefetch)
+		self.stage_all = stage_all
+		self.copy = copy
+		self._lock = threading.Lock()
+		self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # least recently used first
+		self._used = 0  # bytes of cached inputs, including copies in flight
+		self._outputs: Dict[str, int] = {}  # local output -> reserved bytes
+		self._remote: Dict[str, bool] = {}  # folder -> is_network_path
+		# One stream each way: parallel reads of one share only add seeks
+		self._copier = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stage-in")
+		self._mover = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stage-out")
+		self._moves: Set[Future] = set()  # moves still pending
+
+	def wants(self, path: str) -> bool:
+		if self.stage_all:
+			return True
+		folder = os.path.dirname(os.path.abspath(path))
+		remote = self._remote.get(folder)
+		if remote is None:
+			remote = self._remote[folder] = is_network_path(folder)
+		return remote
+
+	def _free(self) -> int:
+		return self.capacity - self._used - sum(self._outputs.values())
+
+	def _make_room(self, size: int) -> bool:
+		"""Evict idle cached inputs until `size` bytes fit; call with the lock held."""
+		if size > self.capacity or size > shutil.disk_usage(self.root).free:
+			return False
+		for key in list(self._entries):
+			if self._free() >= size:
+				break
+			entry = self._entries[key]
+			if entry.refs == 0 and entry.opened:
+				del self._entries[key]
+				self._used -= entry.size
+				discard_output(entry.local)
+		return self._free() >= size
+
+	def prefetch(self, paths: Iterable[str]) -> None:
+		"""Start copying `paths` that are not staged yet, in order."""
+		for path in paths:
+			key = os.path.normcase(os.path.abspath(path))
+			with self._lock:
+				if key in self._entries:
+					continue
+			# Stat outside the lock: a busy share must not block jobs picking up their copies
+			try:
+				if not self.wants(path):
+					continue
+				size = os.path.getsize(path)
+			except OSError:
+				continue
+			with self._lock:
+				if key in self._entries or not self._make_room(size):
+					continue
+				local = os.path.join(self.root, f"in-{uuid.uuid4().hex[:8]}-{Path(path).name}")
+				entry = self._entries[key] = _Entry(path, local, size)
+				self._used += size
+			self._copier.submit(self._copy_in, entry)
+
+	def _copy_in(self, entry: _Entry) -> None:
+		partial = entry.local + ".partial"
+		try:
+			if not entry.dropped:
+				with span("stage_in", source=entry.source, bytes=entry.size):
+					self.copy(entry.source, partial)
+					os.replace(partial, entry.local)
+		except OSError as e:
+			entry.error = str(e)
+			discard_output(partial)
+		finally:
+			entry.ready.set()
+		with self._lock:
+			if entry.dropped:
+				# Its job went away while the copy was queued or running
+				discard_output(entry.local)
+				self._used -= entry.size
+
+	def forget(self, paths: Iterable[str]) -> None:
+		"""Drop prefetched copies of `paths` no job has opened, e.g. because their jobs were cancelled.
+
+		Such copies are never evicted to make room, so they would otherwise
+		hold scratch space until `close`.
+		"""
+		with self._lock:
+			for path in paths:
+				key = os.path.normcase(os.path.abspath(path))
+				entry = self._entries.get(key)
+				if entry is None or entry.opened:
+					continue
+				del self._entries[key]
+				if entry.ready.is_set():
+					discard_output(entry.local)
+					self._used -= entry.size
+				else:
+					# The copier frees the space once it is done with the entry
+					entry.dropped = True
+
+	def _claim(self, key: str) -> Optional[_Entry]:
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				# Referenced entries are never evicted
+				entry.refs += 1
+				entry.opened = True
+				self._entries.move_to_end(key)
+			return entry
+
+	def open_input(self, path: str, on_wait: Optional[Callable[[], None]] = None) -> Optional[str]:
+		"""Local copy of `path` for a starting job, or None to read it in place; pair with `close_input`."""
+		key = os.path.normcase(os.path.abspath(path))
+		entry = self._claim(key)
+		if entry is None:
+			self.prefetch([path])
+			entry = self._claim(key)
+			if entry is None:
+				return None
+		if not entry.ready.is_set() and on_wait is not None:
+			on_wait()
+		entry.ready.wait()
+		if entry.error is not None:
+			self.close_input(path)
+			return None
+		return entry.local
+
+	def close_input(self, path: str) -> None:
+		key = os.path.normcase(os.path.abspath(path))
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return
+			entry.refs -= 1
+			if entry.error is not None and entry.refs == 0:
+				del self._entries[key]
+				self._used -= entry.size
+
+	def stages_output(self, item: QueueItem) -> bool:
+		"""Whether `local_output` will try to put the item's output on scratch (it may still not fit)."""
+		return bool(item.output_path) and writes_atomically(item.output_path) and self.wants(item.output_path)
+
+	def scratch_path(self, item: QueueItem) -> str:
+		"""A path on the scratch volume, for scheduling the job's writes there."""
+		return os.path.join(self.root, f"out-{item.job_id}-{Path(item.output_path).name}")
+
+	def local_output(self, item: QueueItem) -> Optional[str]:
+		"""Scratch path for the item's output, or None to write it in place."""
+		if not self.stages_output(item):
+			return None
+		need = int(estimate_output_bytes(item.settings or VideoSettings(), item.duration, item.probe) * SPACE_MARGIN)
+		if need == 0:
+			# Unknown duration: no way to tell whether it fits
+			return None
+		local = self.scratch_path(item)
+		with self._lock:
+			if not self._make_room(need):
+				return None
+			self._outputs[local] = need
+		return local
+
+	def move_back(self, local: str, final: str, job_id: str, on_done: Callable[[Optional[str]], None]) -> None:
+		"""Move a finished scratch output into place in the background; `on_done(error)` runs on the mover thread."""
+		future = self._mover.submit(self._move_back, local, final, job_id, on_done)
+		with self._lock:
+			self._moves.add(future)
+		future.add_done_callback(self._move_finished)
+
+	def _move_finished(self, future: Future) -> None:
+		with self._lock:
+			self._moves.discard(future)
+
+	def _move_back(self, local: str, final: str, job_id: str, on_done: Callable[[Optional[str]], None]) -> None:
+		temp = temp_output_path(final, job_id)
+		error = None
+		with job_scope(job_id):
+			try:
+				with span("stage_out", output=final):
+					self.copy(local, temp)
+					os.replace(temp, final)
+			except OSError as e:
+				error = str(e)
+				discard_output(temp)
+		self.discard_local(local)
+		on_done(error)
+
+	def discard_local(self, local: str) -> None:
+		"""Drop a scratch output that will not be moved back."""
+		discard_output(local)
+		with self._lock:
+			self._outputs.pop(local, None)
+
+	def drain(self) -> None:
+		"""Wait until every output has been moved back."""
+		while True:
+			with self._lock:
+				pending = list(self._moves)
+			if not pending:
+				return
+			for future in pending:
+				future.result()
+
+	def close(self) -> None:
+		self.drain()
+		self._copier.shutdown(wait=True, cancel_futures=True)
+		self._mover.shutdown(wait=True)
+		shutil.rmtree(self.root, ignore_errors=True)
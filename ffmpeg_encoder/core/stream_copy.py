@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .ffmpeg_cmd import VideoSettings, parse_bitrate
+
+
+# Encoder -> codec_name reported by ffprobe for the streams it produces.
+VIDEO_CODEC_NAMES = {
+	"libx264": "h264",
+	"h264_nvenc": "h264",
+	"libx265": "hevc",
+	"hevc_nvenc": "hevc",
+	"libvpx-vp9": "vp9",
+	"libaom-av1": "av1",
+	"prores_ks": "prores",
+	"dnxhd": "dnxhd",
+}
+
+AUDIO_CODEC_NAMES = {
+	"aac": "aac",
+	"libmp3lame": "mp3",
+	"libopus": "opus",
+	"libvorbis": "vorbis",
+	"ac3": "ac3",
+	"flac": "flac",
+}
+
+# Profiles a player expects from the target codec; None accepts any profile.
+ALLOWED_PROFILES = {
+	"h264": {"Constrained Baseline", "Baseline", "Main", "High"},
+	"hevc": {"Main", "Main 10"},
+}
+
+ALLOWED_PIX_FMTS = {
+	"h264": {"yuv420p", "yuvj420p"},
+	"hevc": {"yuv420p", "yuvj420p", "yuv420p10le"},
+	"vp9": {"yuv420p"},
+	"av1": {"yuv420p", "yuv420p10le"},
+}
+
+CONTAINER_VIDEO = {
+	"mp4": {"h264", "hevc", "av1", "vp9"},
+	"m4v": {"h264", "hevc"},
+	"mov": {"h264", "hevc", "prores"},
+	"mkv": {"h264", "hevc", "vp9", "av1", "prores", "dnxhd"},
+	"webm": {"vp9", "av1"},
+	"avi": {"h264", "dnxhd"},
+	"flv": {"h264"},
+	"wmv": set(),
+}
+
+CONTAINER_AUDIO = {
+	"mp4": {"aac", "mp3", "ac3", "opus", "flac"},
+	"m4v": {"aac", "ac3"},
+	"mov": {"aac", "mp3", "ac3"},
+	"mkv": {"aac", "mp3", "ac3", "opus", "vorbis", "flac"},
+	"webm": {"opus", "vorbis"},
+	"avi": {"mp3", "ac3"},
+	"flv": {"aac", "mp3"},
+	"wmv": set(),
+}
+
+# Extra parameters that change the video/audio samples and therefore need a re-encode.
+_VIDEO_PROCESSING_ARGS = {"-vf", "-filter:v", "-filter_complex", "-s", "-r", "-pix_fmt", "-profile:v", "-preset"}
+_AUDIO_PROCESSING_ARGS = {"-af", "-filter:a", "-filter_complex", "-ar", "-ac"}
+
+# Slack for bitrates reported by the container rather than measured.
+_BITRATE_SLACK = 1.05
+
+
+@dataclass
+class CopyPlan:
+	video: bool = False
+	audio: bool = False
+
+	@property
+	def label(self) -> str:
+		if self.video and self.audio:
+			return "Remux"
+		if self.video:
+			return "Copy video"
+		if self.audio:
+			return "Copy audio"
+		return ""
+
+
+def _first_stream(probe: Dict[str, Any], codec_type: str) -> Optional[Dict[str, Any]]:
+	for stream in probe.get("streams", []):
+		if stream.get("codec_type") == codec_type:
+			return stream
+	return None
+
+
+def _int(value: Any) -> Optional[int]:
+	try:
+		return int(value)
+	except (TypeError, ValueError):
+		return None
+
+
+def _video_bitrate(probe: Dict[str, Any], stream: Dict[str, Any], audio: Optional[Dict[str, Any]]) -> Optional[int]:
+	rate = _int(stream.get("bit_rate"))
+	if rate is not None:
+		return rate
+	# Matroska has no per-stream bitrate; derive it from the overall rate
+	total = _int(probe.get("format", {}).get("bit_rate"))
+	if total is None:
+		return None
+	audio_rate = _int(audio.get("bit_rate")) if audio else None
+	return total - (audio_rate or 0)
+
+
+def _extra_args(s: VideoSettings) -> set[str]:
+	return set(s.extra_params.split()) if s.extra_params else set()
+
+
+def _can_copy_video(probe: Dict[str, Any], s: VideoSettings) -> bool:
+	stream = _first_stream(probe, "video")
+	target = VIDEO_CODEC_NAMES.get(s.video_codec)
+	if stream is None or target is None or stream.get("codec_name") != target:
+		return False
+	if target not in CONTAINER_VIDEO.get(s.container, set()):
+		return False
+	if _extra_args(s) & _VIDEO_PROCESSING_ARGS:
+		return False
+
+	profiles = ALLOWED_PROFILES.get(target)
+	if profiles is not None and stream.get("profile") not in profiles:
+		return False
+	pix_fmts = ALLOWED_PIX_FMTS.get(target)
+	if pix_fmts is not None and stream.get("pix_fmt") not in pix_fmts:
+		return False
+
+	# A set bitrate is a cap even with CRF (the encode passes both), so a richer source is re-encoded
+	if s.bitrate:
+		limit = parse_bitrate(s.bitrate)
+		rate = _video_bitrate(probe, stream, _first_stream(probe, "audio"))
+		if limit is None or rate is None or rate > limit * _BITRATE_SLACK:
+			return False
+
+	size_limit = s.target_size or s.max_filesize
+	if size_limit:
+		from .target_size import parse_size
+
+		limit = parse_size(size_limit)
+		size = _int(probe.get("format", {}).get("size"))
+		if limit is None or size is None or size > limit:
+			return False
+	return True
+
+
+def _can_copy_audio(probe: Dict[str, Any], s: VideoSettings) -> bool:
+	stream = _first_stream(probe, "audio")
+	if stream is None:
+		# Nothing to encode, so the audio side is trivially satisfied
+		return True
+	target = AUDIO_CODEC_NAMES.get(s.audio_codec)
+	if target is None or stream.get("codec_name") != target:
+		return False
+	if target not in CONTAINER_AUDIO.get(s.container, set()):
+		return False
+	if _extra_args(s) & _AUDIO_PROCESSING_ARGS:
+		return False
+	if s.audio_bitrate and target != "flac":
+		limit = parse_bitrate(s.audio_bitrate)
+		rate = _int(stream.get("bit_rate"))
+		if limit is None or rate is None or rate > limit * _BITRATE_SLACK:
+			return False
+	return True
+
+
+def plan_stream_copy(probe: Optional[Dict[str, Any]], s: VideoSettings) -> CopyPlan:
+	"""Decide which streams of a probed source already satisfy `s` and can be copied."""
+	if not probe or not s.stream_copy or s.video_codec.endswith("_ll"):
+		return CopyPlan()
+	return CopyPlan(video=_can_copy_video(probe, s), audio=_can_copy_audio(probe, s))
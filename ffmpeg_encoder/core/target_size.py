@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+from dataclasses import replace
+from typing import Optional
+
+from .ffmpeg_cmd import VideoSettings, format_bitrate, parse_bitrate
+from .ffprobe import probe_duration_seconds
+
+
+# Fraction of the target reserved for container overhead (headers, index, padding).
+CONTAINER_OVERHEAD = 0.02
+# Accepted undershoot; any overshoot of the target is always corrected.
+TARGET_SIZE_TOLERANCE = 0.05
+MIN_VIDEO_BITRATE = 50_000
+
+_SIZE_UNITS = {
+	"": 1,
+	"k": 1000, "m": 1000 ** 2, "g": 1000 ** 3,
+	"ki": 1024, "mi": 1024 ** 2, "gi": 1024 ** 3,
+}
+
+
+def parse_size(value: Optional[str]) -> Optional[int]:
+	"""Parse sizes like "700M", "1.5G" or "650MiB" into bytes."""
+	if not value:
+		return None
+	text = value.strip().lower()
+	if text.endswith("b"):
+		text = text[:-1]
+	number = text.rstrip("kmgi")
+	unit = text[len(number):]
+	if unit not in _SIZE_UNITS:
+		return None
+	try:
+		return int(float(number) * _SIZE_UNITS[unit])
+	except ValueError:
+		return None
+
+
+def target_video_bitrate(target_bytes: int, duration: float, audio_bitrate: Optional[str]) -> int:
+	"""Video bitrate (bits/s) that makes `duration` seconds fit in `target_bytes`."""
+	if duration <= 0:
+		raise ValueError("Duration must be positive to target a file size")
+	total = target_bytes * 8 * (1 - CONTAINER_OVERHEAD) / duration
+	video = total - (parse_bitrate(audio_bitrate) or 0)
+	if video < MIN_VIDEO_BITRATE:
+		raise ValueError(
+			f"Target size {target_bytes} bytes is too small for {duration:.1f}s with audio at {audio_bitrate}"
+		)
+	return int(video)
+
+
+def apply_target_size(path: str, s: VideoSettings, duration: Optional[float] = None) -> VideoSettings:
+	"""Replace CRF with the bitrate that lands the output on `s.target_size`, encoded in two passes.
+
+	Single-pass ABR drifts too far from its bitrate to hit a size, so two
+	passes are always on (NVENC does them inside the encoder).
+	"""
+	target = parse_size(s.target_size)
+	if target is None:
+		raise ValueError(f"Invalid target size: {s.target_size}")
+	if duration is None:
+		duration = probe_duration_seconds(path)
+	if not duration:
+		raise ValueError(f"Cannot target a size without a duration: {path}")
+	bitrate = target_video_bitrate(target, duration, s.audio_bitrate if s.audio_codec else None)
+	return replace(s, crf=None, bitrate=format_bitrate(bitrate), max_filesize=None, two_pass=True)
+
+
+def size_correction(s: VideoSettings, output_path: str, duration: float) -> Optional[VideoSettings]:
+	"""Return corrected settings if the output missed its target, else None."""
+	target = parse_size(s.target_size)
+	current = parse_bitrate(s.bitrate)
+	if target is None or current is None or duration <= 0 or not os.path.exists(output_path):
+		return None
+	actual = os.path.getsize(output_path)
+	if target * (1 - TARGET_SIZE_TOLERANCE) <= actual <= target:
+		return None
+	# Move only the video bitrate, aiming at the middle of the tolerance band.
+	aim = target * (1 - TARGET_SIZE_TOLERANCE / 2)
+	corrected = current - (actual - aim) * 8 / duration
+	return replace(s, bitrate=format_bitrate(max(MIN_VIDEO_BITRATE, corrected)))
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+# Seconds between samples of a running ffmpeg process
+SAMPLE_INTERVAL = 1.0
+METRIC_PREFIX = "ffmpeg_encoder"
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_psutil = None
+
+
+@dataclass(slots=True)
+class ProcessSample:
+	time: float  # epoch seconds
+	pid: int
+	cpu_seconds: Optional[float] = None
+	rss_bytes: Optional[int] = None
+	read_bytes: Optional[int] = None
+	write_bytes: Optional[int] = None
+	fps: Optional[float] = None
+	speed: Optional[float] = None
+
+
+def _read_proc(pid: int) -> Tuple[float, int, Optional[int], Optional[int]]:
+	with open(f"/proc/{pid}/stat", "rb") as f:
+		data = f.read()
+	# The command name may contain spaces; the fixed fields start after its ")"
+	values = data[data.rindex(b")") + 2:].split()
+	cpu = (int(values[11]) + int(values[12])) / _CLK_TCK
+	rss = int(values[21]) * _PAGE_SIZE
+	read = write = None
+	try:
+		with open(f"/proc/{pid}/io", "rb") as f:
+			for line in f:
+				key, _, value = line.partition(b":")
+				if key == b"read_bytes":
+					read = int(value)
+				elif key == b"write_bytes":
+					write = int(value)
+	except OSError:
+		# /proc/<pid>/io needs ptrace access on hardened kernels
+		pass
+	return cpu, rss, read, write
+
+
+def _load_psutil():
+	global _psutil
+	if _psutil is None:
+		try:
+			import psutil
+
+			_psutil = psutil
+		except ImportError:
+			_psutil = False
+	return _psutil
+
+
+def _read_psutil(pid: int) -> Tuple[float, int, Optional[int], Optional[int]]:
+	proc = _psutil.Process(pid)
+	with proc.oneshot():
+		times = proc.cpu_times()
+		rss = proc.memory_info().rss
+		try:
+			io = proc.io_counters()
+			read, write = io.read_bytes, io.write_bytes
+		except (AttributeError, _psutil.AccessDenied):
+			read = write = None
+	return times.user + times.system, rss, read, write
+
+
+def read_process_stats(pid: int) -> Optional[Tuple[float, int, Optional[int], Optional[int]]]:
+	"""(CPU seconds, RSS bytes, read bytes, write bytes) for a live process, or None if unavailable.
+
+	Uses /proc where it exists and psutil, if installed, elsewhere.
+	"""
+	try:
+		if os.path.isdir("/proc/self"):
+			return _read_proc(pid)
+		if not _load_psutil():
+			return None
+		return _read_psutil(pid)
+	except Exception:
+		# The process exited between samples
+		return None
+
+
+def summarize(samples: List[ProcessSample]) -> Dict[str, float]:
+	"""Totals and peaks over a job's samples, summed across its passes."""
+	summary: Dict[str, float] = {}
+	last_by_pid: Dict[int, ProcessSample] = {}
+	for sample in samples:
+		last_by_pid[sample.pid] = sample
+		if sample.rss_bytes is not None:
+			summary["peak_rss_bytes"] = max(summary.get("peak_rss_bytes", 0), sample.rss_bytes)
+		if sample.fps is not None:
+			summary["peak_fps"] = max(summary.get("peak_fps", 0.0), sample.fps)
+	for key in ("cpu_seconds", "read_bytes", "write_bytes"):
+		values = [getattr(s, key) for s in last_by_pid.values() if getattr(s, key) is not None]
+		if values:
+			summary[key] = sum(values)
+	return summary
+
+
+class MetricsRegistry:
+	"""Latest sample per running job plus batch counters, rendered in Prometheus text format."""
+
+	_GAUGES = (
+		("cpu_seconds", "job_cpu_seconds", "CPU time used by the job's current ffmpeg process"),
+		("rss_bytes", "job_rss_bytes", "Resident memory of the job's current ffmpeg process"),
+		("read_bytes", "job_read_bytes", "Bytes read from storage by the job's current ffmpeg process"),
+		("write_bytes", "job_write_bytes", "Bytes written to storage by the job's current ffmpeg process"),
+		("fps", "job_fps", "Frames encoded per second"),
+		("speed", "job_speed", "Encoding speed as a multiple of realtime"),
+	)
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._latest: Dict[str, ProcessSample] = {}
+		self._finished: Dict[str, int] = {}
+
+	def update(self, job_id: str, sample: ProcessSample) -> None:
+		with self._lock:
+			self._latest[job_id] = sample
+
+	def finish(self, job_id: str, code: int) -> None:
+		outcome = "success" if code == 0 else "failure"
+		with self._lock:
+			self._latest.pop(job_id, None)
+			self._finished[outcome] = self._finished.get(outcome, 0) + 1
+
+	def render(self) -> str:
+		with self._lock:
+			latest = dict(self._latest)
+			finished = dict(self._finished)
+		lines = [
+			f"# HELP {METRIC_PREFIX}_processes_running ffmpeg processes currently running",
+			f"# TYPE {METRIC_PREFIX}_processes_running gauge",
+			f"{METRIC_PREFIX}_processes_running {len(latest)}",
+			f"# HELP {METRIC_PREFIX}_processes_finished_total ffmpeg processes that have exited",
+			f"# TYPE {METRIC_PREFIX}_processes_finished_total counter",
+		]
+		for outcome in ("success", "failure"):
+			lines.append(f'{METRIC_PREFIX}_processes_finished_total{{outcome="{outcome}"}} {finished.get(outcome, 0)}')
+		for attr, name, help_text in self._GAUGES:
+			lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+			lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+			for job_id, sample in sorted(latest.items()):
+				value = getattr(sample, attr)
+				if value is not None:
+					lines.append(f'{METRIC_PREFIX}_{name}{{job="{job_id}"}} {value}')
+		return "\n".join(lines) + "\n"
+
+
+def serve_metrics(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+	"""Serve `registry` at http://host:port/metrics from a daemon thread; call shutdown() to stop."""
+
+	class _Handler(BaseHTTPRequestHandler):
+		def do_GET(self) -> None:
+			if self.path.split("?", 1)[0] != "/metrics":
+				self.send_error(404)
+				return
+			body = registry.render().encode("utf-8")
+			self.send_response(200)
+			self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, format: str, *args) -> None:
+			pass
+
+	server = ThreadingHTTPServer((host, port), _Handler)
+	server.daemon_threads = True
+	threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+	return server
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .analysis import sample_offsets
+from .ffmpeg_cmd import VideoSettings
+from .ffprobe import run_ffprobe
+
+
+# Allowed duration difference: the larger of an absolute slack (muxer/audio padding) and a fraction
+DURATION_TOLERANCE_SECONDS = 0.5
+DURATION_TOLERANCE_RATIO = 0.01
+SEGMENT_SECONDS = 2.0
+VERIFY_WORKERS = 4
+# Extra args that legitimately change duration or the stream layout
+_TRIM_ARGS = {"-t", "-to", "-ss", "-sseof", "-frames:v", "-vframes"}
+_MAP_ARGS = {"-map", "-vn", "-an", "-sn", "-dn"}
+
+
+@dataclass
+class VerifyResult:
+	problems: List[str] = field(default_factory=list)
+	duration: Optional[float] = None
+	segments: int = 0  # decoded sample segments
+
+	@property
+	def ok(self) -> bool:
+		return not self.problems
+
+
+def _duration(info: Dict[str, Any]) -> Optional[float]:
+	try:
+		return float(info.get("format", {}).get("duration"))
+	except (TypeError, ValueError):
+		return None
+
+
+def _stream_counts(info: Dict[str, Any]) -> Dict[str, int]:
+	counts: Dict[str, int] = {}
+	for stream in info.get("streams", []):
+		kind = stream.get("codec_type")
+		if kind == "video" and stream.get("disposition", {}).get("attached_pic"):
+			# Cover art is not a video track
+			continue
+		counts[kind] = counts.get(kind, 0) + 1
+	return counts
+
+
+def check_streams(source: Dict[str, Any], output: Dict[str, Any], settings: VideoSettings) -> List[str]:
+	"""ffmpeg's default mapping keeps one video and one audio stream; both must survive."""
+	extra = set((settings.extra_params or "").split())
+	if extra & _MAP_ARGS:
+		return []
+	want, have = _stream_counts(source), _stream_counts(output)
+	problems = []
+	for kind in ("video", "audio"):
+		if want.get(kind) and not have.get(kind):
+			problems.append(f"no {kind} stream in output")
+	return problems
+
+
+def check_duration(source: Dict[str, Any], output: Dict[str, Any], settings: VideoSettings) -> List[str]:
+	if set((settings.extra_params or "").split()) & _TRIM_ARGS:
+		return []
+	expected, actual = _duration(source), _duration(output)
+	if expected is None:
+		return []
+	if actual is None:
+		return ["output duration unknown"]
+	tolerance = max(DURATION_TOLERANCE_SECONDS, expected * DURATION_TOLERANCE_RATIO)
+	if abs(actual - expected) > tolerance:
+		return [f"duration {actual:.2f}s differs from source {expected:.2f}s"]
+	return []
+
+
+def decode_segment(path: str, start: float, seconds: float) -> Optional[str]:
+	"""Decode one segment to the null muxer; returns the first decoder error, or None if clean."""
+	cmd = [
+		"ffmpeg",
+		"-hide_banner",
+		"-nostats",
+		"-v", "error",
+		"-ss", f"{start:.3f}",
+		"-t", f"{seconds:.3f}",
+		"-i", path,
+		"-map", "0:v?",
+		"-map", "0:a?",
+		"-f", "null",
+		"-",
+	]
+	proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
+	lines = proc.stderr.strip().splitlines()
+	if proc.returncode != 0 or lines:
+		return lines[0] if lines else f"ffmpeg exited with code {proc.returncode}"
+	return None
+
+
+def verify_output(
+	source_info: Dict[str, Any],
+	output_path: str,
+	settings: VideoSettings,
+	samples: int = 0,
+	segment_seconds: float = SEGMENT_SECONDS,
+	workers: int = VERIFY_WORKERS,
+) -> VerifyResult:
+	"""Check `output_path` against the source's ffprobe info.
+
+	Probes the output and compares duration and streams; with `samples` > 0
+	also decodes that many evenly spread segments plus the tail, in parallel,
+	to catch corruption and truncation.
+	"""
+	result = VerifyResult()
+	try:
+		if os.path.getsize(output_path) == 0:
+			result.problems.append("output is empty")
+			return result
+	except OSError:
+		result.problems.append("output is missing")
+		return result
+	try:
+		info = run_ffprobe(output_path)
+	except Exception as e:
+		result.problems.append(f"output cannot be probed: {e}")
+		return result
+
+	result.duration = _duration(info)
+	result.problems += check_streams(source_info, info, settings)
+	result.problems += check_duration(source_info, info, settings)
+
+	duration = result.duration or 0.0
+	if samples > 0 and duration > 0:
+		starts = sample_offsets(duration, samples, segment_seconds)
+		# A truncated or damaged end of file is the most common failure
+		starts.append(max(0.0, duration - segment_seconds))
+		starts = sorted(set(round(start, 3) for start in starts))
+		with ThreadPoolExecutor(max_workers=max(1, min(workers, len(starts)))) as pool:
+			errors = list(pool.map(lambda start: decode_segment(output_path, start, segment_seconds), starts))
+		result.segments = len(starts)
+		for start, error in zip(starts, errors):
+			if error:
+				result.problems.append(f"decode error at {start:.1f}s: {error}")
+	return result
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import heapq
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .scan import is_video_file
+from .staging import is_network_path
+
+logger = logging.getLogger(__name__)
+
+
+# A file is taken once its size and mtime have not changed for this long
+DEFAULT_SETTLE_SECONDS = 5.0
+# Rescan interval of folders inotify cannot watch (network shares, other platforms)
+DEFAULT_POLL_SECONDS = 10.0
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+_READ_SIZE = 64 * 1024
+
+
+@dataclass
+class WatchFolder:
+	path: str
+	preset: Optional[str] = None  # None: the default settings
+	output_dir: Optional[str] = None  # None: next to each input
+	recursive: bool = False
+	priority: int = 0
+
+
+def load_watch_config(path: str) -> List[WatchFolder]:
+	"""Read a JSON list of folder paths or {"path", "preset", "output", "recursive", "priority"} objects."""
+	config = Path(path)
+	base = config.parent
+	folders: List[WatchFolder] = []
+	for entry in json.loads(config.read_text(encoding="utf-8")):
+		if isinstance(entry, str):
+			entry = {"path": entry}
+		if not entry.get("path"):
+			raise ValueError(f"Watch folder without path: {entry}")
+		folder = Path(entry["path"])
+		output = entry.get("output")
+		folders.append(WatchFolder(
+			path=str(folder if folder.is_absolute() else base / folder),
+			preset=entry.get("preset"),
+			output_dir=str(base / output) if output and not os.path.isabs(output) else output,
+			recursive=bool(entry.get("recursive", False)),
+			priority=int(entry.get("priority") or 0),
+		))
+	return folders
+
+
+class _Inotify:
+	"""Linux inotify through ctypes: one descriptor for every watched directory."""
+
+	def __init__(self) -> None:
+		libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+		self._add_watch = libc.inotify_add_watch
+		self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+		self._add_watch.restype = ctypes.c_int
+		fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if fd < 0:
+			code = ctypes.get_errno()
+			raise OSError(code, os.strerror(code))
+		self.fd = fd
+
+	def add(self, path: str) -> int:
+		wd = self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+		if wd < 0:
+			code = ctypes.get_errno()
+			raise OSError(code, os.strerror(code), path)
+		return wd
+
+	def read(self) -> List[Tuple[int, int, str]]:
+		"""Pending (wd, mask, name) events; empty when there are none."""
+		try:
+			data = os.read(self.fd, _READ_SIZE)
+		except BlockingIOError:
+			return []
+		events = []
+		offset = 0
+		while offset + _EVENT.size <= len(data):
+			wd, mask, _, length = _EVENT.unpack_from(data, offset)
+			offset += _EVENT.size
+			name = data[offset:offset + length].split(b"\0", 1)[0]
+			offset += length
+			events.append((wd, mask, os.fsdecode(name)))
+		return events
+
+	def close(self) -> None:
+		os.close(self.fd)
+
+
+@dataclass
+class _Candidate:
+	folder: WatchFolder
+	size: int
+	mtime_ns: int
+	changed: float  # monotonic time the size or mtime last changed
+
+
+class FolderWatcher:
+	"""Reports media files that land in watched folders, once they have stopped growing.
+
+	Local folders on Linux are watched with inotify; network shares, whose
+	remote writes inotify never sees, and folders on other platforms are
+	rescanned every `poll_interval` seconds. A new or changed file is
+	handed to `on_ready(path, folder)` after its size and mtime have held
+	still for `settle` seconds, so half-copied files are skipped until the
+	copy ends. One thread serves every folder and sleeps until the next
+	event, settle check or rescan is due.
+	"""
+
+	def __init__(
+		self,
+		folders: List[WatchFolder],
+		on_ready: Callable[[str, WatchFolder], None],
+		settle: float = DEFAULT_SETTLE_SECONDS,
+		poll_interval: float = DEFAULT_POLL_SECONDS,
+		existing: bool = True,
+		ignore: Optional[Callable[[str], bool]] = None,
+		use_inotify: Optional[bool] = None,
+	) -> None:
+		self.folders = list(folders)
+		self.on_ready = on_ready
+		self.settle = settle
+		self.poll_interval = poll_interval
+		self.existing = existing
+		self.ignore = ignore or (lambda path: False)
+		self.use_inotify = sys.platform.startswith("linux") if use_inotify is None else use_inotify
+		self._inotify: Optional[_Inotify] = None
+		self._watches: Dict[int, Tuple[str, WatchFolder]] = {}  # wd -> (directory, folder)
+		self._polled: List[WatchFolder] = []
+		self._listing: Dict[str, Dict[str, Tuple[int, int]]] = {}  # polled folder -> {file: (size, mtime_ns)}
+		self._candidates: Dict[str, _Candidate] = {}
+		self._due: List[Tuple[float, str]] = []  # heap of (settle check time, path), one per candidate
+		self._taken: Dict[str, Tuple[int, int]] = {}  # reported file still in place -> its (size, mtime_ns) then
+		self._stop = threading.Event()
+		self._wake: Optional[Tuple[int, int]] = None
+		self._thread: Optional[threading.Thread] = None
+
+	def start(self) -> None:
+		if self.use_inotify and self._wake is None:
+			# Made before the thread runs, so a stop() that comes first can still wake its select()
+			self._wake = os.pipe()
+		self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+		self._thread.start()
+
+	def stop(self) -> None:
+		self._stop.set()
+		if self._wake is not None:
+			os.write(self._wake[1], b"\0")
+		if self._thread is not None:
+			self._thread.join()
+		if self._wake is not None:
+			os.close(self._wake[0])
+			os.close(self._wake[1])
+			self._wake = None
+
+	@property
+	def polled(self) -> List[WatchFolder]:
+		"""Folders watched by rescanning."""
+		return list(self._polled)
+
+	def _run(self) -> None:
+		try:
+			self._setup()
+			self._loop()
+		finally:
+			if self._inotify is not None:
+				self._inotify.close()
+
+	def _setup(self) -> None:
+		if self.use_inotify:
+			try:
+				self._inotify = _Inotify()
+			except (OSError, AttributeError) as e:
+				logger.warning("inotify is not available, rescanning every %.0f s: %s", self.poll_interval, e)
+		for folder in self.folders:
+			if self._inotify is not None and not is_network_path(folder.path):
+				try:
+					self._watch_tree(folder.path, folder, report=self.existing)
+					continue
+				except OSError as e:
+					if e.errno == errno.ENOSPC:
+						logger.warning("inotify watch limit reached (fs.inotify.max_user_watches), rescanning %s", folder.path)
+					elif e.errno != errno.ENOENT:
+						logger.warning("Cannot watch %s, rescanning it: %s", folder.path, e)
+			self._polled.append(folder)
+			self._poll(folder, report=self.existing)
+
+	def _watch_tree(self, directory: str, folder: WatchFolder, report: bool = True) -> None:
+		"""Watch `directory` (and its sub folders when recursive); with `report`, also pick up the files already in it."""
+		self._watches[self._inotify.add(directory)] = (directory, folder)
+		with os.scandir(directory) as entries:
+			for entry in entries:
+				if entry.is_dir(follow_symlinks=False):
+					if folder.recursive:
+						self._watch_tree(entry.path, folder, report)
+				elif report:
+					self._touch(entry.path, folder)
+
+	def _loop(self) -> None:
+		next_poll = time.monotonic() + self.poll_interval
+		while not self._stop.is_set():
+			now = time.monotonic()
+			if self._polled and now >= next_poll:
+				for folder in self._polled:
+					self._poll(folder)
+				next_poll = time.monotonic() + self.poll_interval
+			self._check_due(time.monotonic())
+
+			waits = [next_poll] if self._polled else []
+			if self._due:
+				waits.append(self._due[0][0])
+			timeout = max(0.0, min(waits) - time.monotonic()) if waits else None
+			if self._inotify is None:
+				self._stop.wait(timeout)
+				continue
+			readable, _, _ = select.select([self._inotify.fd, self._wake[0]], [], [], timeout)
+			if self._inotify.fd in readable:
+				self._handle(self._inotify.read())
+
+	def _handle(self, events: List[Tuple[int, int, str]]) -> None:
+		for wd, mask, name in events:
+			if mask & IN_Q_OVERFLOW:
+				# Events were dropped: look at every watched directory again
+				for path in [path for path in self._taken if not os.path.exists(path)]:
+					self._forget(path)
+				for directory, folder in list(self._watches.values()):
+					self._rescan(directory, folder)
+				continue
+			watch = self._watches.get(wd)
+			if watch is None:
+				continue
+			directory, folder = watch
+			if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+				self._watches.pop(wd, None)
+				continue
+			path = os.path.join(directory, name)
+			if mask & (IN_DELETE | IN_MOVED_FROM):
+				self._forget(path, tree=bool(mask & IN_ISDIR))
+				continue
+			if mask & IN_ISDIR:
+				if folder.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+					try:
+						self._watch_tree(path, folder)
+					except OSError as e:
+						logger.warning("Cannot watch %s: %s", path, e)
+				continue
+			self._touch(path, folder)
+
+	def _rescan(self, directory: str, folder: WatchFolder) -> None:
+		try:
+			with os.scandir(directory) as entries:
+				for entry in entries:
+					if not entry.is_dir(follow_symlinks=False):
+						self._touch(entry.path, folder)
+		except OSError:
+			pass
+
+	def _poll(self, folder: WatchFolder, report: bool = True) -> None:
+		"""Rescan a folder and look closer at files that are new or changed since the last scan."""
+		listing: Dict[str, Tuple[int, int]] = {}
+		previous = self._listing.get(folder.path, {})
+		pending = [folder.path]
+		complete = True
+		while pending:
+			try:
+				with os.scandir(pending.pop()) as entries:
+					for entry in entries:
+						if entry.is_dir(follow_symlinks=False):
+							if folder.recursive:
+								pending.append(entry.path)
+							continue
+						if not is_video_file(entry.name) or entry.name.startswith("."):
+							continue
+						try:
+							st = entry.stat()
+						except OSError:
+							continue
+						listing[entry.path] = (st.st_size, st.st_mtime_ns)
+						if report and previous.get(entry.path) != listing[entry.path]:
+							self._touch(entry.path, folder)
+			except OSError:
+				complete = False
+				continue
+		if complete:
+			# A share that is briefly unreachable must not make taken files look new
+			for path in previous.keys() - listing.keys():
+				self._forget(path)
+		self._listing[folder.path] = listing
+
+	def _forget(self, path: str, tree: bool = False) -> None:
+		"""Drop a file (with `tree`, everything under a directory) that was deleted or moved away."""
+		self._taken.pop(path, None)
+		self._candidates.pop(path, None)
+		if tree:
+			prefix = os.path.join(path, "")
+			for taken in [p for p in self._taken if p.startswith(prefix)]:
+				del self._taken[taken]
+
+	def _touch(self, path: str, folder: WatchFolder) -> None:
+		"""Note a new or changed file; it is reported once it has settled."""
+		name = os.path.basename(path)
+		# Dot files include the pipeline's own .partial outputs
+		if name.startswith(".") or not is_video_file(name) or self.ignore(path):
+			return
+		try:
+			st = os.stat(path)
+		except OSError:
+			return
+		stamp = (st.st_size, st.st_mtime_ns)
+		if self._taken.get(path) == stamp:
+			return
+		now = time.monotonic()
+		candidate = self._candidates.get(path)
+		if candidate is None:
+			self._candidates[path] = _Candidate(folder, *stamp, changed=now)
+			heapq.heappush(self._due, (now + self.settle, path))
+		elif (candidate.size, candidate.mtime_ns) != stamp:
+			candidate.size, candidate.mtime_ns = stamp
+			candidate.changed = now
+
+	def _check_due(self, now: float) -> None:
+		while self._due and self._due[0][0] <= now:
+			_, path = heapq.heappop(self._due)
+			candidate = self._candidates.get(path)
+			if candidate is None:
+				continue
+			try:
+				st = os.stat(path)
+			except OSError:
+				# Moved away or deleted before it settled
+				del self._candidates[path]
+				continue
+			stamp = (st.st_size, st.st_mtime_ns)
+			if stamp != (candidate.size, candidate.mtime_ns):
+				candidate.size, candidate.mtime_ns = stamp
+				candidate.changed = now
+			if candidate.size == 0:
+				# Most likely a copy that has not started writing yet
+				heapq.heappush(self._due, (now + self.settle, path))
+				continue
+			if now - candidate.changed < self.settle:
+				heapq.heappush(self._due, (candidate.changed + self.settle, path))
+				continue
+			del self._candidates[path]
+			self._taken[path] = stamp
+			try:
+				self.on_ready(path, candidate.folder)
+			except Exception:
+				logger.exception("Could not queue %s", path)
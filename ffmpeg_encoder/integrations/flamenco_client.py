@@ -2,13 +2,25 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
+import logging
 import time
 import requests
 import yaml
 import os
 from pathlib import Path
 
+from ..core.retry import IO_ERROR, SETTINGS, Failure, RetryPolicy, classify_failure
 from ..utils.env import get_submitter_platform
+from ..utils.events import event, span
+
+
+logger = logging.getLogger(__name__)
+
+# Manager hiccups worth another request; other 4xx answers will not change
+RETRYABLE_HTTP_STATUS = {408, 429, 500, 502, 503, 504}
+# Answers that say the request was not processed at all, so even a POST may be sent again
+UNPROCESSED_HTTP_STATUS = {429, 503}
+MANAGER_RETRY = RetryPolicy(max_attempts=4, base_delay=2.0, max_delay=30.0)
 
 
 @dataclass
@@ -184,12 +196,12 @@ def _setup_manager_config(manager_config_path: Path) -> None:
 			with open(manager_config_path, 'w', encoding='utf-8') as f:
 				yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
 			
-			print("Manager 설정에 FFmpeg 변수가 추가되었습니다.")
+			logger.info("Manager 설정에 FFmpeg 변수가 추가되었습니다.")
 		else:
-			print("Manager 설정에 FFmpeg 변수가 이미 존재합니다.")
+			logger.info("Manager 설정에 FFmpeg 변수가 이미 존재합니다.")
 			
 	except Exception as e:
-		print(f"Manager 설정 수정 오류: {e}")
+		logger.error("Manager 설정 수정 오류: %s", e)
 
 def _setup_worker_config(worker_config_path: Path) -> None:
 	"""Worker 설정 파일을 생성하거나 업데이트합니다."""
@@ -233,9 +245,9 @@ def _setup_worker_config(worker_config_path: Path) -> None:
 				with open(worker_config_path, 'w', encoding='utf-8') as f:
 					yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
 				
-				print("Worker 설정에 FFmpeg 변수가 추가되었습니다.")
+				logger.info("Worker 설정에 FFmpeg 변수가 추가되었습니다.")
 			else:
-				print("Worker 설정에 FFmpeg 변수가 이미 존재합니다.")
+				logger.info("Worker 설정에 FFmpeg 변수가 이미 존재합니다.")
 		else:
 			# 기존 파일이 없으면 새로 생성
 			worker_config = {
@@ -256,10 +268,10 @@ def _setup_worker_config(worker_config_path: Path) -> None:
 			with open(worker_config_path, 'w', encoding='utf-8') as f:
 				yaml.dump(worker_config, f, default_flow_style=False, allow_unicode=True)
 			
-			print("새로운 Worker 설정 파일이 생성되었습니다.")
+			logger.info("새로운 Worker 설정 파일이 생성되었습니다.")
 			
 	except Exception as e:
-		print(f"Worker 설정 생성/수정 오류: {e}")
+		logger.error("Worker 설정 생성/수정 오류: %s", e)
 
 def _setup_ffmpeg_job_type(scripts_dir: Path) -> None:
 	"""FFmpeg 작업 타입 스크립트를 생성합니다."""
@@ -301,9 +313,9 @@ function compileJob(job) {
 	if not compiler_path.exists():
 		with open(compiler_path, 'w', encoding='utf-8') as f:
 			f.write(ffmpeg_compiler_script)
-		print("FFmpeg 작업 컴파일러 스크립트(JavaScript)가 생성되었습니다.")
+		logger.info("FFmpeg 작업 컴파일러 스크립트(JavaScript)가 생성되었습니다.")
 	else:
-		print("FFmpeg 작업 컴파일러 스크립트가 이미 존재합니다.")
+		logger.info("FFmpeg 작업 컴파일러 스크립트가 이미 존재합니다.")
 	
 	# Python 백업 컴파일러도 생성 (호환성을 위해)
 	python_compiler_script = """#!/usr/bin/env python3
@@ -373,9 +385,9 @@ if __name__ == '__main__':
 		if os.name != 'nt':
 			os.chmod(python_compiler_path, 0o755)
 		
-		print("FFmpeg Python 백업 컴파일러가 생성되었습니다.")
+		logger.info("FFmpeg Python 백업 컴파일러가 생성되었습니다.")
 	else:
-		print("FFmpeg Python 백업 컴파일러가 이미 존재합니다.")
+		logger.info("FFmpeg Python 백업 컴파일러가 이미 존재합니다.")
 
 def _setup_flamenco_structure(flamenco_dir: Path) -> None:
 	"""Flamenco 폴더 구조를 생성합니다."""
@@ -396,9 +408,9 @@ def _setup_flamenco_structure(flamenco_dir: Path) -> None:
 			created_dirs.append(dir_name)
 	
 	if created_dirs:
-		print(f"생성된 디렉토리: {', '.join(created_dirs)}")
+		logger.info("생성된 디렉토리: %s", ", ".join(created_dirs))
 	else:
-		print("모든 필요한 디렉토리가 이미 존재합니다.")
+		logger.info("모든 필요한 디렉토리가 이미 존재합니다.")
 
 def load_flamenco_config(flamenco_path: str) -> FlamencoAutoConfig:
 	"""Flamenco 설치 경로에서 설정을 자동으로 읽어옵니다."""
@@ -476,16 +488,77 @@ def load_flamenco_config(flamenco_path: str) -> FlamencoAutoConfig:
 		)
 
 
+def classify_request_error(e: Exception, idempotent: bool = True) -> Failure:
+	"""Whether a failed manager request may be sent again.
+
+	A POST that timed out, or got a 5xx from the manager or a proxy in front
+	of it, may already have created the job, so for it only connection
+	failures and 429/503 (not processed) are retried.
+	"""
+	if isinstance(e, requests.HTTPError) and e.response is not None:
+		code = e.response.status_code
+		if code in RETRYABLE_HTTP_STATUS:
+			return Failure(IO_ERROR, f"Manager answered {code}", idempotent or code in UNPROCESSED_HTTP_STATUS)
+		return Failure(SETTINGS, f"Manager rejected the request ({code}): {e.response.text[:200]}", False)
+	if isinstance(e, (requests.ConnectionError, requests.ConnectTimeout)) and not isinstance(e, requests.ReadTimeout):
+		return Failure(IO_ERROR, f"Manager unreachable: {e}", True)
+	if isinstance(e, requests.Timeout):
+		return Failure(IO_ERROR, f"Manager timed out: {e}", idempotent)
+	return Failure(SETTINGS, str(e), False)
+
+
+def retry_after_seconds(response: Optional[requests.Response]) -> Optional[float]:
+	"""Seconds asked for by a Retry-After header (delta or HTTP date), or None."""
+	value = response.headers.get("Retry-After") if response is not None else None
+	if not value:
+		return None
+	try:
+		return max(0.0, float(value))
+	except ValueError:
+		pass
+	try:
+		from email.utils import parsedate_to_datetime
+
+		return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+	except (TypeError, ValueError):
+		return None
+
+
 class FlamencoClient:
-	def __init__(self, cfg: FlamencoConfig) -> None:
+	def __init__(self, cfg: FlamencoConfig, retry: RetryPolicy = MANAGER_RETRY) -> None:
 		self.base_url = cfg.base_url.rstrip("/")
+		self.retry = retry
 		self.session = requests.Session()
 		self.session.headers.update({
 			"Authorization": f"Bearer {cfg.token}",
 			"Content-Type": "application/json",
 		})
 
+	def _request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+		"""Send a request to the manager, retrying per `self.retry` while the failure is transient."""
+		attempt = 0
+		while True:
+			attempt += 1
+			try:
+				r = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+				r.raise_for_status()
+				return r
+			except requests.RequestException as e:
+				failure = classify_request_error(e, idempotent=method != "POST")
+				if not failure.retryable or attempt >= self.retry.max_attempts:
+					raise
+				waited = retry_after_seconds(getattr(e, "response", None))
+				delay = self.retry.delay(attempt) if waited is None else waited
+				logger.warning("%s %s failed (%s); retrying in %.0fs", method, path, failure.reason, delay)
+				time.sleep(delay)
+
 	def submit_ffmpeg_job(self, title: str, command: list[str], files: list[str], output_path: str = None) -> Dict[str, Any]:
+		with span("submit", title=title, files=len(files), manager=self.base_url) as fields:
+			job = self._submit_ffmpeg_job(title, command, files, output_path)
+			fields["flamenco_job"] = job.get("id")
+			return job
+
+	def _submit_ffmpeg_job(self, title: str, command: list[str], files: list[str], output_path: str = None) -> Dict[str, Any]:
 		# Get platform and convert to lowercase
 		platform = get_submitter_platform().lower()
 		
@@ -541,9 +614,7 @@ class FlamencoClient:
 						}
 					}
 				
-				r = self.session.post(f"{self.base_url}/api/v3/jobs", json=payload, timeout=30)
-				r.raise_for_status()
-				return r.json()
+				return self._request("POST", "/api/v3/jobs", json=payload, timeout=30).json()
 				
 			except Exception as e:
 				last_error = e
@@ -553,15 +624,32 @@ class FlamencoClient:
 		raise last_error or Exception("모든 작업 타입이 실패했습니다.")
 
 	def get_job(self, job_id: str) -> Dict[str, Any]:
-		r = self.session.get(f"{self.base_url}/api/v3/jobs/{job_id}", timeout=15)
-		r.raise_for_status()
-		return r.json()
+		return self._request("GET", f"/api/v3/jobs/{job_id}", timeout=15).json()
+
+	def requeue_job(self, job_id: str, reason: str) -> None:
+		self._request("POST", f"/api/v3/jobs/{job_id}/setstatus", json={"status": "requeueing", "reason": reason}, timeout=15)
 
-	def wait_until_finished(self, job_id: str, poll_seconds: float = 3.0, timeout_seconds: float = 0) -> Dict[str, Any]:
+	def wait_until_finished(
+		self,
+		job_id: str,
+		poll_seconds: float = 3.0,
+		timeout_seconds: float = 0,
+		requeues: int = 0,
+	) -> Dict[str, Any]:
+		"""Poll until the job ends; a failed job whose activity reads as transient is requeued up to `requeues` times."""
 		start = time.time()
 		while True:
 			job = self.get_job(job_id)
 			state = job.get("state") or job.get("status")
+			if state == "failed" and requeues > 0:
+				failure = classify_failure(-1, [job.get("activity") or ""])
+				if failure.retryable:
+					requeues -= 1
+					event("flamenco_requeue", flamenco_job=job_id, kind=failure.kind, reason=failure.reason)
+					self.requeue_job(job_id, f"Requeued after: {failure.reason}")
+					time.sleep(poll_seconds)
+					continue
+				job["failure_reason"] = failure.reason
 			if state in {"finished", "failed", "canceled", "completed"}:
 				return job
 			time.sleep(poll_seconds)
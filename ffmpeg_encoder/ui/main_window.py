@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from PySide6.QtCore import Qt, QThread, QObject, Signal
+import queue
+from typing import Optional
+
+from PySide6.QtCore import Qt, QThread, QObject, QTimer, Signal
 from PySide6.QtWidgets import (
 	QMainWindow,
 	QSplitter,
@@ -20,27 +23,143 @@ from .queue_panel import QueuePanel
 from .settings_panel import SettingsPanel
 from .log_panel import LogPanel
 from ..core.ffmpeg_cmd import VideoSettings, build_ffmpeg_commands
-from ..core.runner import FFmpegRunner
-from ..core.presets import Preset, PresetStore
-from ..integrations.flamenco_client import FlamencoClient, FlamencoConfig
+from ..core.async_runner import AsyncFFmpegRunner, RunnerEvent
+from ..core.pipeline import encode_with_retry
+from ..core.queue import JobStatus, QueueItem
+from ..core.retry import NO_RETRY, RetryPolicy
+from ..utils.events import job_scope, span
+from dataclasses import asdict
 from pathlib import Path
 
 
+# Fallback re-stat of the preset folder when change notifications are missed
+PRESET_POLL_SECONDS = 30.0
+
+
 class Worker(QObject):
 	finished = Signal(object)  # Changed from int to object to avoid overflow
 	log = Signal(str)
+	status = Signal(str, str)  # source path, status text
 
-	def __init__(self, cmd: list[str]) -> None:
+	def __init__(self, item: QueueItem, runner: AsyncFFmpegRunner, retry: RetryPolicy = NO_RETRY) -> None:
 		super().__init__()
-		self.cmd = cmd
+		self.item = item
+		self.runner = runner
+		self.retry = retry
+		self.cancelled = False
+		self.job_runner = None  # the job's LoopRunner while run() is active
+
+	def cancel(self) -> None:
+		# Called from the GUI thread; the pipeline polls the flag between stages
+		self.cancelled = True
+		self.runner.cancel(self.item.job_id)
+
+	def pause(self) -> None:
+		# Through the job's runner, so a pause between two passes holds the next one
+		if self.job_runner is not None and self.job_runner.pause():
+			self.status.emit(self.item.source_path, "Paused")
+
+	def resume(self) -> None:
+		if self.job_runner is not None and self.job_runner.resume():
+			self.status.emit(self.item.source_path, "Encoding")
 
 	def run(self) -> None:
-		runner = FFmpegRunner(on_log=self.log.emit)
-		code = runner.run(self.cmd)
+		# ffmpeg output goes through the runner's event queue, not per-line signals
+		runner = self.job_runner = self.runner.runner(self.item.job_id, on_sample=self.item.telemetry.append)
+		try:
+			with job_scope(self.item.job_id), span("job", source=self.item.source_path, output=self.item.output_path):
+				code = encode_with_retry(
+					self.item,
+					runner,
+					self.retry,
+					on_status=lambda text: self.status.emit(self.item.source_path, text),
+					cancelled=lambda: self.cancelled,
+				)
+		except Exception as e:
+			self.log.emit(f"Encoding failed: {e}")
+			code = -1
 		self.finished.emit(code)
 
 
+class BatchWorker(QObject):
+	event = Signal(object)  # BatchEvent
+	finished = Signal(object)  # the items, with their final status
+
+	def __init__(
+		self,
+		items: list,
+		runner: AsyncFFmpegRunner,
+		concurrency: int,
+		writers_per_device: int = 0,
+		scratch_dir: str = "",
+		scratch_gb: int = 100,
+		retry: RetryPolicy = NO_RETRY,
+		nvenc_sessions: int = 0,
+	) -> None:
+		super().__init__()
+		self.items = items
+		self.runner = runner
+		self.concurrency = concurrency
+		self.writers_per_device = writers_per_device
+		self.scratch_dir = scratch_dir
+		self.scratch_gb = scratch_gb
+		self.retry = retry
+		self.nvenc_sessions = nvenc_sessions
+		self.batch = None  # the BatchRunner while run() is active; its controls are thread-safe
+
+	def run(self) -> None:
+		from ..core.batch import BatchRunner
+		from ..core.cost_model import CostModel
+		from ..core.disk import DiskBudget
+		from ..core.gpu import GpuSlots
+		from ..core.staging import Stager
+
+		cost_model = CostModel.for_host()
+		stager = None
+		if self.scratch_dir:
+			try:
+				stager = Stager(self.scratch_dir, self.scratch_gb * 1024 ** 3)
+			except OSError:
+				# Unusable scratch folder: read and write in place
+				stager = None
+		batch = self.batch = BatchRunner(
+			self.runner,
+			self.concurrency,
+			on_event=self._on_event,
+			cost_model=cost_model,
+			disk_budget=DiskBudget(self.writers_per_device or None),
+			stager=stager,
+			retry=self.retry,
+			gpu_slots=GpuSlots(self.nvenc_sessions) if self.nvenc_sessions else None,
+		)
+		try:
+			batch.run(self.items)
+		finally:
+			if stager is not None:
+				stager.close()
+			try:
+				cost_model.save()
+			except OSError:
+				pass
+		self.finished.emit(self.items)
+
+	def _on_event(self, event) -> None:
+		if event.kind == "job_log":
+			# Same path as single encodes: drained onto the log panel in batches
+			self.runner.events.put(RunnerEvent(event.job_id, "log", event.data["line"]))
+		else:
+			self.event.emit(event)
+
+
+def _format_eta(seconds: float) -> str:
+	minutes, secs = divmod(int(seconds + 0.5), 60)
+	hours, minutes = divmod(minutes, 60)
+	return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
 class MainWindow(QMainWindow):
+	remote_command = Signal(dict)  # command from another process, delivered on the GUI thread
+
 	def __init__(self) -> None:
 		super().__init__()
 		self.setWindowTitle("FFmpeg Encoder v2.0 - by Insoo Chang")
@@ -72,10 +191,37 @@ class MainWindow(QMainWindow):
 		self.settings_panel.encode_btn.clicked.connect(self._on_encode_clicked)
 		self.settings_panel.multi_encode_btn.clicked.connect(self._on_multi_encode_clicked)
 		self.settings_panel.submit_flamenco_btn.clicked.connect(self._on_submit_flamenco)
+		self.settings_panel.pause_btn.clicked.connect(lambda: self._control_jobs("pause"))
+		self.settings_panel.resume_btn.clicked.connect(lambda: self._control_jobs("resume"))
+		self.settings_panel.cancel_btn.clicked.connect(lambda: self._control_jobs("cancel"))
+		self.queue_panel.job_action.connect(self._control_jobs)
+		self.remote_command.connect(self._on_remote_command)
 		self.settings_panel.save_preset_clicked.connect(self._on_save_preset)
 		self.settings_panel.load_preset_clicked.connect(self._on_load_preset)
-
-		self.preset_store = PresetStore(Path.home() / ".ffmpeg_encoder" / "presets")
+		self.settings_panel.add_preset_sweep_clicked.connect(self._on_add_preset_sweep)
+
+		# pydantic and the preset folder are only touched when presets are used
+		self._preset_catalog = None
+		self._preset_watcher = None
+
+		# One event loop drives every ffmpeg process; its output is drained in batches
+		self.runner = AsyncFFmpegRunner()
+		self.runner.start()
+		self._event_timer = QTimer(self)
+		self._event_timer.setInterval(100)
+		self._event_timer.timeout.connect(self._drain_runner_events)
+		self._event_timer.start()
+
+	@property
+	def preset_catalog(self):
+		if self._preset_catalog is None:
+			from PySide6.QtCore import QFileSystemWatcher
+			from ..core.presets import PresetCatalog, PresetStore
+			# Change notifications are unreliable on network shares, so also re-stat now and then
+			self._preset_catalog = PresetCatalog(PresetStore(), poll_interval=PRESET_POLL_SECONDS)
+			self._preset_watcher = QFileSystemWatcher([str(self._preset_catalog.store.root)], self)
+			self._preset_watcher.directoryChanged.connect(lambda path: self._preset_catalog.invalidate())
+		return self._preset_catalog
 
 	def _create_menu(self) -> None:
 		menubar = QMenuBar(self)
@@ -113,6 +259,55 @@ class MainWindow(QMainWindow):
 		for f in files:
 			self.queue_panel._add_file_to_queue(f)
 
+	def handle_remote_command(self, message: dict) -> dict:
+		"""Reply to a command sent by a second launch or a script; runs on the command channel's thread."""
+		if message.get("command") != "enqueue":
+			return {"ok": False, "error": f"Unknown command: {message.get('command')}"}
+		paths = message.get("paths") or []
+		if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+			return {"ok": False, "error": "paths must be a list of strings"}
+		try:
+			int(message.get("priority") or 0)
+		except (TypeError, ValueError):
+			return {"ok": False, "error": "priority must be an integer"}
+		self.remote_command.emit(message)
+		return {"ok": True}
+
+	def _on_remote_command(self, message: dict) -> None:
+		self.enqueue_paths(message.get("paths") or [], message.get("preset"), int(message.get("priority") or 0))
+		# Bring the window forward, as a launch would have
+		self.showNormal()
+		self.raise_()
+		self.activateWindow()
+
+	def enqueue_paths(self, paths: list, preset: Optional[str] = None, priority: int = 0) -> None:
+		"""Queue files and folders, to be encoded with `preset` (default: the panel settings) in priority order."""
+		if not paths:
+			return
+		if preset:
+			try:
+				self.preset_catalog.resolve(preset)
+			except Exception as e:
+				self.log_panel.append_line(f"Not queued {len(paths)} path(s): preset '{preset}' cannot be loaded: {e}")
+				return
+		added = self.queue_panel.add_paths(paths, preset, priority)
+		options = ", ".join(o for o in (f"preset {preset}" if preset else "", f"priority {priority}" if priority else "") if o)
+		self.status.showMessage(f"Queued {len(added)} file(s)" + (f" ({options})" if options else ""), 5000)
+
+	def _settings_for(self, file_path: str, default: VideoSettings, by_preset: dict) -> Optional[VideoSettings]:
+		"""Settings for a queued file: its own preset when it was queued with one, else `default`."""
+		file_item = self.queue_panel.file_items.get(file_path)
+		preset = file_item.preset if file_item is not None else None
+		if not preset:
+			return default
+		if preset not in by_preset:
+			try:
+				by_preset[preset] = self.preset_catalog.resolve(preset).to_video_settings()
+			except Exception as e:
+				self.log_panel.append_line(f"Preset '{preset}' cannot be loaded: {e}")
+				by_preset[preset] = None
+		return by_preset[preset]
+
 	def _collect_settings(self) -> VideoSettings:
 		s = VideoSettings()
 		s.container = self.settings_panel.container_format.currentText()
@@ -124,8 +319,9 @@ class MainWindow(QMainWindow):
 		s.crf = int(self.settings_panel.crf.value())
 		bitrate = self.settings_panel.bitrate.text().strip()
 		s.bitrate = bitrate or None
-		# Two-pass UI has been removed; force single-pass
-		s.two_pass = False
+		s.target_size = self.settings_panel.target_size.text().strip() or None
+		# Two-pass is only offered for target-size encodes
+		s.two_pass = bool(s.target_size) and self.settings_panel.target_two_pass.isChecked()
 		
 		# GPU enable is determined by codec selection
 		s.gpu_enable = "nvenc" in s.video_codec
@@ -140,6 +336,12 @@ class MainWindow(QMainWindow):
 		s.audio_bitrate = self.settings_panel.audio_bitrate.text().strip() or None
 		s.max_filesize = self.settings_panel.max_filesize.text().strip() or None
 		s.extra_params = self.settings_panel.extra_params.text().strip() or None
+		s.content_aware = self.settings_panel.content_aware.isChecked()
+		s.stream_copy = self.settings_panel.stream_copy.isChecked()
+		s.quality_metrics = self.settings_panel.quality_metrics.isChecked()
+		s.metric_samples = int(self.settings_panel.metric_samples.value())
+		s.verify = self.settings_panel.verify_output.isChecked()
+		s.verify_samples = int(self.settings_panel.verify_samples.value())
 		return s
 
 	def _apply_settings(self, s: VideoSettings) -> None:
@@ -156,12 +358,20 @@ class MainWindow(QMainWindow):
 		
 		self.settings_panel.crf.setValue(int(s.crf or 18))
 		self.settings_panel.bitrate.setText(s.bitrate or "")
-		# Two-pass UI removed; nothing to set here
+		self.settings_panel.target_size.setText(getattr(s, "target_size", None) or "")
+		if getattr(s, "target_size", None):
+			self.settings_panel.target_two_pass.setChecked(bool(s.two_pass))
 		
 		self.settings_panel.audio_codec.setCurrentText(s.audio_codec)
 		self.settings_panel.audio_bitrate.setText(s.audio_bitrate or "")
 		self.settings_panel.max_filesize.setText(s.max_filesize or "")
 		self.settings_panel.extra_params.setText(s.extra_params or "")
+		self.settings_panel.content_aware.setChecked(bool(getattr(s, "content_aware", False)))
+		self.settings_panel.stream_copy.setChecked(bool(getattr(s, "stream_copy", False)))
+		self.settings_panel.quality_metrics.setChecked(bool(getattr(s, "quality_metrics", False)))
+		self.settings_panel.metric_samples.setValue(int(getattr(s, "metric_samples", 3)))
+		self.settings_panel.verify_output.setChecked(bool(getattr(s, "verify", False)))
+		self.settings_panel.verify_samples.setValue(int(getattr(s, "verify_samples", 0)))
 
 	def _on_encode_clicked(self) -> None:
 		# Get checked file paths from queue
@@ -179,16 +389,116 @@ class MainWindow(QMainWindow):
 		if dialog.exec() != QDialog.Accepted:
 			return
 		
-		# Get output path for first file
-		output_path = dialog.get_output_path(checked_files[0])
-		if not output_path:
+		# Resolve every output up front so parallel jobs never share a file
+		planner = dialog.create_planner()
+		items = []
+		by_preset = {}
+		for file_path in checked_files:
+			file_settings = self._settings_for(file_path, settings, by_preset)
+			if file_settings is None:
+				self.log_panel.append_line(f"Skipped {file_path}: its preset cannot be loaded")
+				continue
+			output_path = dialog.get_output_path(file_path)
+			if not output_path:
+				self.log_panel.append_line(f"Skipped {file_path}: cannot generate output path")
+				continue
+			if file_settings is not settings:
+				# Files queued with their own preset keep its container
+				output_path = str(Path(output_path).with_suffix(f".{file_settings.output_extension()}"))
+			output_path = planner.reserve(output_path)
+			if output_path is None:
+				self.log_panel.append_line(f"Skipped {file_path}: output already exists")
+				continue
+			file_item = self.queue_panel.file_items.get(file_path)
+			priority = file_item.priority if file_item is not None else 0
+			items.append(QueueItem(source_path=file_path, output_path=output_path, settings=file_settings, priority=priority))
+		if not items:
 			self.status.showMessage("Cannot generate output path", 3000)
 			return
 
-		cmds = build_ffmpeg_commands(checked_files[0], output_path, settings)
-		cmd = cmds[-1]  # Single pass or second pass
+		self._start_batch(items)
+
+	def _start_batch(self, items: list) -> None:
+		if getattr(self, "batch_thread", None) is not None:
+			self.status.showMessage("A batch is already running", 3000)
+			return
+		self._batch_items = {item.job_id: item for item in items}
+		self._batch_done = 0
+		self.batch_thread = QThread(self)
+		self.batch_worker = BatchWorker(
+			items,
+			self.runner,
+			self.settings_panel.parallel_jobs.value(),
+			self.settings_panel.writers_per_disk.value(),
+			self.settings_panel.scratch_dir.text().strip(),
+			self.settings_panel.scratch_size.value(),
+			self._retry_policy(),
+			self.settings_panel.nvenc_sessions.value(),
+		)
+		self.batch_worker.moveToThread(self.batch_thread)
+		self.batch_thread.started.connect(self.batch_worker.run)
+		self.batch_worker.event.connect(self._on_batch_event)
+		self.batch_worker.finished.connect(self._on_batch_finished)
+		self.status.showMessage(f"Batch 0/{len(items)} - estimating...")
+		self._set_job_controls(True)
+		self.batch_thread.start()
+
+	def _retry_policy(self) -> RetryPolicy:
+		return RetryPolicy(
+			max_attempts=self.settings_panel.retries.value() + 1,
+			gpu_fallback=self.settings_panel.gpu_fallback.isChecked(),
+		)
 
-		self._start_worker(cmd)
+	def _set_job_controls(self, running: bool) -> None:
+		for btn in (self.settings_panel.pause_btn, self.settings_panel.resume_btn, self.settings_panel.cancel_btn):
+			btn.setEnabled(running)
+
+	def _control_jobs(self, action: str, paths: Optional[list] = None) -> None:
+		"""Cancel, pause or resume the jobs of `paths`, or everything running when None."""
+		batch_worker = getattr(self, "batch_worker", None)
+		batch = batch_worker.batch if batch_worker is not None and getattr(self, "batch_thread", None) is not None else None
+		if batch is not None:
+			job_ids = [None] if paths is None else [
+				job_id for job_id, item in self._batch_items.items() if item.source_path in paths
+			]
+			for job_id in job_ids:
+				getattr(batch, action)(job_id)
+		worker = getattr(self, "worker", None)
+		if worker is not None and getattr(self, "thread", None) is not None and self.thread.isRunning():
+			if paths is None or worker.item.source_path in paths:
+				if action == "cancel" and paths is None:
+					# Also drop the renditions still waiting in a multi-encode
+					self._encoding_jobs = None
+				getattr(worker, action)()
+		if paths is None and action in ("pause", "resume"):
+			self.status.showMessage("Paused" if action == "pause" else "Resumed", 3000)
+
+	def _on_batch_event(self, event) -> None:
+		item = self._batch_items.get(event.job_id)
+		if event.kind == "job_status" and item is not None:
+			self.queue_panel.set_item_status(item.source_path, event.data["status"])
+		elif event.kind == "job_progress" and item is not None:
+			self.queue_panel.set_item_status(item.source_path, f"Encoding {event.data['progress']:.0%}")
+		elif event.kind == "job_finished":
+			self._batch_done += 1
+			if item is not None and event.data["status"] == JobStatus.CANCELLED.name:
+				self.queue_panel.set_item_status(item.source_path, "Cancelled")
+		elif event.kind == "batch_eta":
+			self.status.showMessage(
+				f"Batch {self._batch_done}/{len(self._batch_items)} - ETA {_format_eta(event.data['seconds'])}"
+			)
+
+	def _on_batch_finished(self, items) -> None:
+		self.batch_thread.quit()
+		self.batch_thread.wait()
+		self.batch_thread = None
+		self._set_job_controls(getattr(self, "thread", None) is not None and self.thread.isRunning())
+		cancelled = sum(1 for item in items if item.status == JobStatus.CANCELLED)
+		failed = sum(1 for item in items if item.status == JobStatus.FAILED)
+		message = f"Batch finished: {len(items) - failed - cancelled} done, {failed} failed"
+		if cancelled:
+			message += f", {cancelled} cancelled"
+		self.status.showMessage(message, 10000)
 
 	def _on_multi_encode_clicked(self) -> None:
 		"""여러 설정으로 동시 인코딩합니다."""
@@ -214,98 +524,132 @@ class MainWindow(QMainWindow):
 			return
 
 		# Start multi-encoding
-		self._start_multi_encoding(checked_files, multi_settings, dialog)
+		self._start_multi_encoding(checked_files, self.settings_panel.get_multi_sweeps(), dialog)
 
-	def _start_multi_encoding(self, files, settings_list, output_dialog):
+	def _start_multi_encoding(self, files, entries, output_dialog):
 		"""여러 설정으로 순차적으로 인코딩을 시작합니다."""
-		from pathlib import Path
-		
-		# 모든 인코딩 작업을 큐에 추가
-		encoding_queue = []
-		
-		for i, settings_dict in enumerate(settings_list):
-			settings = VideoSettings(**settings_dict)
-			
-			# 각 설정에 대해 출력 경로 생성
-			for file_path in files:
-				# 원본 파일명에서 확장자 제거
-				file_stem = Path(file_path).stem
-				file_ext = Path(file_path).suffix
-				
-				# 설정에 따른 접미사 추가
-				codec_id = settings.video_codec
-				codec_name = self.settings_panel._get_user_friendly_codec_name(codec_id)
-				crf = settings.crf
-				bitrate = settings.bitrate
-				
-				# 파일명에 사용할 안전한 코덱 이름 생성 (특수문자 제거)
-				safe_codec_name = codec_name.replace(" ", "_").replace("(", "").replace(")", "").replace("-", "_")
-				
-				if bitrate:
-					suffix = f"_{safe_codec_name}_{bitrate}"
-				else:
-					suffix = f"_{safe_codec_name}_crf{crf}"
-				
-				# 출력 파일명 생성
-				output_filename = f"{file_stem}{suffix}.{settings.container}"
-				
-				# 출력 경로 생성
-				output_dir = Path(output_dialog.get_output_path(file_path)).parent
-				output_path = output_dir / output_filename
-				
-				# FFmpeg 명령어 생성
-				cmds = build_ffmpeg_commands(file_path, str(output_path), settings)
-				cmd = cmds[-1]  # Single pass or second pass
-				
-				# 큐에 추가
-				encoding_queue.append({
-					'cmd': cmd,
-					'file': file_path,
-					'output': str(output_path),
-					'settings': settings
-				})
-		
-		# 순차적으로 실행
-		self._encoding_queue = encoding_queue
+		from ..core.matrix import expand_settings, iter_jobs, validate_sweep
+		
+		try:
+			for _, sweep in entries:
+				validate_sweep(sweep)
+		except ValueError as e:
+			QMessageBox.warning(self, "Multi-Encode", str(e))
+			return
+		
+		# 스윕은 필요할 때 하나씩 펼치고, argv가 같은 작업은 한 번만 인코딩
+		renditions = (
+			rendition
+			for settings_dict, sweep in entries
+			for rendition in expand_settings(VideoSettings(**settings_dict), sweep)
+		)
+		self._skipped_jobs = []
+		self._encoding_jobs = iter_jobs(files, renditions, self._skipped_jobs)
+		self._output_dialog = output_dialog
+		self._output_planner = output_dialog.create_planner()
 		self._current_encoding_index = 0
 		self._start_next_encoding()
 
+	def _multi_output_path(self, file_path: str, rendition) -> Path:
+		"""설정에 따른 접미사를 붙인 출력 경로를 만듭니다."""
+		settings = rendition.settings
+		# 원본 파일명에서 확장자 제거
+		file_stem = Path(file_path).stem
+		
+		# 설정에 따른 접미사 추가
+		codec_id = settings.video_codec
+		codec_name = self.settings_panel._get_user_friendly_codec_name(codec_id)
+		crf = settings.crf
+		bitrate = settings.bitrate
+		
+		# 파일명에 사용할 안전한 코덱 이름 생성 (특수문자 제거)
+		safe_codec_name = codec_name.replace(" ", "_").replace("(", "").replace(")", "").replace("-", "_")
+		
+		if bitrate:
+			suffix = f"_{safe_codec_name}_{bitrate}"
+		else:
+			suffix = f"_{safe_codec_name}_crf{crf}"
+		
+		# 코덱/품질 외의 스윕 축 값도 파일명에 넣어 충돌을 막음
+		for axis, value in rendition.variant.items():
+			if axis not in ("video_codec", "crf", "bitrate"):
+				suffix += "_" + "".join(c if c.isalnum() else "_" for c in f"{axis}{value}")
+		
+		# 출력 파일명 생성
+		output_filename = f"{file_stem}{suffix}.{settings.container}"
+		
+		# 출력 경로 생성
+		output_dir = Path(self._output_dialog.get_output_path(file_path)).parent
+		return output_dir / output_filename
+
 	def _start_next_encoding(self) -> None:
 		"""다음 인코딩 작업을 시작합니다."""
-		if not hasattr(self, '_encoding_queue') or self._current_encoding_index >= len(self._encoding_queue):
+		jobs = getattr(self, "_encoding_jobs", None)
+		output_path = None
+		for file_path, rendition in jobs if jobs is not None else ():
+			output_path = self._output_planner.reserve(str(self._multi_output_path(file_path, rendition)))
+			if output_path is not None:
+				break
+			self.log_panel.append_line(f"Skipped {Path(file_path).name}: output already exists")
+		if output_path is None:
+			self._encoding_jobs = None
 			self.log_panel.append_line("모든 멀티 인코딩 작업이 완료되었습니다.")
+			if self._skipped_jobs:
+				self.log_panel.append_line(f"Skipped {len(self._skipped_jobs)} duplicate renditions with identical ffmpeg arguments")
 			return
 		
 		# 현재 인코딩 작업 정보
-		current_job = self._encoding_queue[self._current_encoding_index]
-		cmd = current_job['cmd']
-		file_name = Path(current_job['file']).name
-		settings = current_job['settings']
+		settings = rendition.settings
+		item = QueueItem(source_path=file_path, output_path=output_path, settings=settings)
+		self._current_encoding_index += 1
 		
 		# 로그 출력
-		self.log_panel.append_line(f"멀티 인코딩 {self._current_encoding_index + 1}/{len(self._encoding_queue)}: {file_name} - {settings.video_codec} CRF {settings.crf}")
+		self.log_panel.append_line(f"멀티 인코딩 {self._current_encoding_index}: {Path(file_path).name} - {settings.video_codec} CRF {settings.crf}")
 		
 		# 워커 시작
-		self._start_worker(cmd)
+		self._start_worker(item)
 
-	def _start_worker(self, cmd: list[str]) -> None:
+	def _start_worker(self, item: QueueItem) -> None:
 		self.thread = QThread(self)
-		self.worker = Worker(cmd)
+		self.worker = Worker(item, self.runner, self._retry_policy())
 		self.worker.moveToThread(self.thread)
 		self.thread.started.connect(self.worker.run)
 		self.worker.log.connect(self.log_panel.append_line)
+		self.worker.status.connect(self.queue_panel.set_item_status)
 		self.worker.finished.connect(self._on_worker_finished)
+		self._set_job_controls(True)
 		self.thread.start()
 
+	def _drain_runner_events(self) -> None:
+		lines = []
+		while len(lines) < 500:
+			try:
+				event = self.runner.events.get_nowait()
+			except queue.Empty:
+				break
+			if event.kind == "log":
+				lines.append(event.data)
+		if lines:
+			self.log_panel.append_line("\n".join(lines))
+
+	def closeEvent(self, event) -> None:
+		self._event_timer.stop()
+		self.runner.stop()
+		super().closeEvent(event)
+
 	def _on_worker_finished(self, code) -> None:
-		self.status.showMessage(f"FFmpeg finished with code {code}", 5000)
+		if self.worker.item.status == JobStatus.CANCELLED:
+			self.status.showMessage("Encoding cancelled", 5000)
+		else:
+			self.status.showMessage(f"FFmpeg finished with code {code}", 5000)
 		self.thread.quit()
 		self.thread.wait()
 		
 		# 멀티 인코딩 중인 경우 다음 작업 시작
-		if hasattr(self, '_encoding_queue') and hasattr(self, '_current_encoding_index'):
-			self._current_encoding_index += 1
+		if getattr(self, "_encoding_jobs", None) is not None:
 			self._start_next_encoding()
+		if not self.thread.isRunning() and getattr(self, "batch_thread", None) is None:
+			self._set_job_controls(False)
 
 	def _on_submit_flamenco(self) -> None:
 		# Submit directly using settings
@@ -351,6 +695,7 @@ class MainWindow(QMainWindow):
 		cmds = build_ffmpeg_commands(input_path, output_filename, settings)
 		command = cmds[-1]
 		
+		from ..integrations.flamenco_client import FlamencoClient, FlamencoConfig
 		client = FlamencoClient(FlamencoConfig(base_url=base_url, token=token))
 		try:
 			job = client.submit_ffmpeg_job("FFmpeg Encoding Job", command, checked_files, output_filename)
@@ -370,9 +715,7 @@ class MainWindow(QMainWindow):
 		if file_path:
 			try:
 				settings = self._collect_settings()
-				from ..core.presets import PresetStore
-				store = PresetStore()
-				store.export_preset(settings, file_path)
+				self.preset_catalog.store.export_preset(asdict(settings), file_path)
 				QMessageBox.information(self, "Export Success", f"Preset exported to {file_path}")
 			except Exception as e:
 				QMessageBox.critical(self, "Export Error", f"Failed to export preset: {str(e)}")
@@ -387,9 +730,7 @@ class MainWindow(QMainWindow):
 		
 		if file_path:
 			try:
-				from ..core.presets import PresetStore
-				store = PresetStore()
-				preset = store.import_preset(file_path)
+				preset = self.preset_catalog.store.import_preset(file_path)
 				self._apply_settings(preset)
 				QMessageBox.information(self, "Import Success", f"Preset imported from {file_path}")
 			except Exception as e:
@@ -401,52 +742,66 @@ class MainWindow(QMainWindow):
 		
 		name, ok = QInputDialog.getText(self, "Save Preset", "Preset name:")
 		if ok and name:
+			catalog = self.preset_catalog
+			existing = catalog.get(name) if name in catalog else None
+			tags_text, ok = QInputDialog.getText(
+				self, "Save Preset", "Tags (comma separated, optional):",
+				text=", ".join(existing.tags) if existing else "",
+			)
+			if not ok:
+				return
 			try:
 				settings = self._collect_settings()
-				from ..core.presets import PresetStore, Preset
-				store = PresetStore()
-				# Convert VideoSettings to dict for Preset creation
-				settings_dict = {
-					'container': settings.container,
-					'video_codec': settings.video_codec,
-					'crf': settings.crf,
-					'bitrate': settings.bitrate,
-					'two_pass': settings.two_pass,
-					'gpu_enable': settings.gpu_enable,
-					'low_latency': settings.low_latency,
-					'tune': settings.tune,
-					'audio_codec': settings.audio_codec,
-					'audio_bitrate': settings.audio_bitrate,
-					'max_filesize': settings.max_filesize,
-					'extra_params': settings.extra_params
-				}
-				preset = Preset(name=name, **settings_dict)
-				store.save(preset)
+				from ..core.presets import Preset
+				preset = Preset(
+					name=name,
+					tags=[tag.strip() for tag in tags_text.split(",") if tag.strip()],
+					description=existing.description if existing else None,
+					**asdict(settings),
+				)
+				catalog.save(preset)
 				QMessageBox.information(self, "Save Success", f"Preset '{name}' saved successfully")
 			except Exception as e:
 				QMessageBox.critical(self, "Save Error", f"Failed to save preset: {str(e)}")
 
 	def _on_load_preset(self) -> None:
 		"""Load a preset and apply settings."""
-		from PySide6.QtWidgets import QInputDialog
-		
-		from ..core.presets import PresetStore
-		store = PresetStore()
-		presets = store.list_presets()
+		from .preset_dialog import PresetDialog
 		
-		if not presets:
+		catalog = self.preset_catalog
+		if not len(catalog):
 			QMessageBox.information(self, "No Presets", "No presets found. Save a preset first.")
 			return
 		
-		name, ok = QInputDialog.getItem(self, "Load Preset", "Select preset:", presets, 0, False)
-		if ok and name:
+		dialog = PresetDialog(catalog, self)
+		name = dialog.selected_name if dialog.exec() == QDialog.Accepted else None
+		if name:
 			try:
-				preset = store.load(name)
+				preset = catalog.resolve(name)
 				self._apply_settings(preset)
 				QMessageBox.information(self, "Load Success", f"Preset '{name}' loaded successfully")
 			except Exception as e:
 				QMessageBox.critical(self, "Load Error", f"Failed to load preset: {str(e)}")
 
+	def _on_add_preset_sweep(self) -> None:
+		"""Add a preset, with its base chain and sweep axes, to the Multi-Encode list."""
+		from .preset_dialog import PresetDialog
+		
+		catalog = self.preset_catalog
+		if not len(catalog):
+			QMessageBox.information(self, "No Presets", "No presets found. Save a preset first.")
+			return
+		
+		dialog = PresetDialog(catalog, self)
+		if dialog.exec() != QDialog.Accepted or not dialog.selected_name:
+			return
+		try:
+			preset = catalog.resolve(dialog.selected_name)
+		except ValueError as e:
+			QMessageBox.critical(self, "Preset Error", str(e))
+			return
+		self.settings_panel.add_preset_sweep(preset)
+
 	def _on_about(self) -> None:
 		"""About 다이얼로그를 표시합니다."""
 		about_text = """
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from pathlib import Path
 from typing import List, Optional
 
@@ -20,6 +21,11 @@ from PySide6.QtWidgets import (
 	QSpinBox,
 )
 
+from ..core.output_plan import EXISTS_POLICIES, OutputPlanner
+
+
+logger = logging.getLogger(__name__)
+
 
 class OutputDialog(QDialog):
 	"""Output settings dialog for encoding jobs."""
@@ -94,7 +100,7 @@ class OutputDialog(QDialog):
 		
 		# File exists handling
 		self.overwrite_mode = QComboBox()
-		self.overwrite_mode.addItems(["Ask", "Overwrite", "Skip", "Rename"])
+		self.overwrite_mode.addItems(list(EXISTS_POLICIES))
 		output_layout.addRow("If file exists:", self.overwrite_mode)
 		
 		# Quality suffix
@@ -246,7 +252,7 @@ class OutputDialog(QDialog):
 			return str(output_file)
 			
 		except Exception as e:
-			print(f"Error generating output path: {e}")
+			logger.error("Error generating output path: %s", e)
 			return None
 
 	def get_output_paths(self) -> List[str]:
@@ -264,6 +270,30 @@ class OutputDialog(QDialog):
 		
 		return output_paths
 
+	def create_planner(self) -> OutputPlanner:
+		"""Planner applying the "If file exists" choice; "Ask" prompts once per existing file."""
+		remembered: List[str] = []
+
+		def ask(path: str) -> str:
+			if remembered:
+				return remembered[0]
+			box = QMessageBox(self.parentWidget() or self)
+			box.setWindowTitle("File Exists")
+			box.setText(f"{Path(path).name} already exists in\n{Path(path).parent}")
+			overwrite = box.addButton("Overwrite", QMessageBox.AcceptRole)
+			rename = box.addButton("Rename", QMessageBox.ActionRole)
+			box.addButton("Skip", QMessageBox.RejectRole)
+			apply_all = QCheckBox("Apply to all remaining files")
+			box.setCheckBox(apply_all)
+			box.exec()
+			clicked = box.clickedButton()
+			choice = "Overwrite" if clicked is overwrite else "Rename" if clicked is rename else "Skip"
+			if apply_all.isChecked():
+				remembered.append(choice)
+			return choice
+
+		return OutputPlanner(self.overwrite_mode.currentText(), ask=ask)
+
 	def get_output_path(self, input_file: str) -> Optional[str]:
 		"""Get output path for a specific input file."""
 		file_path = Path(input_file)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import (
+	QDialog,
+	QVBoxLayout,
+	QHBoxLayout,
+	QLineEdit,
+	QComboBox,
+	QListWidget,
+	QListWidgetItem,
+	QDialogButtonBox,
+	QLabel,
+)
+
+
+class PresetDialog(QDialog):
+	"""Pick a preset from the catalog with text search and a tag filter."""
+
+	def __init__(self, catalog, parent=None):
+		super().__init__(parent)
+		self.catalog = catalog
+		self.selected_name: Optional[str] = None
+
+		self.setWindowTitle("Load Preset")
+		self.setModal(True)
+		self.resize(420, 480)
+
+		self._setup_ui()
+		self._populate()
+
+	def _setup_ui(self):
+		layout = QVBoxLayout(self)
+
+		filter_layout = QHBoxLayout()
+		self.search = QLineEdit()
+		self.search.setPlaceholderText("Search name, description or tag...")
+		self.search.textChanged.connect(self._populate)
+		self.tag_filter = QComboBox()
+		self.tag_filter.addItem("All tags", None)
+		for tag in self.catalog.tags():
+			self.tag_filter.addItem(tag, tag)
+		self.tag_filter.currentIndexChanged.connect(self._populate)
+		filter_layout.addWidget(self.search)
+		filter_layout.addWidget(self.tag_filter)
+		layout.addLayout(filter_layout)
+
+		self.list = QListWidget()
+		self.list.itemDoubleClicked.connect(lambda item: self.accept())
+		layout.addWidget(self.list)
+
+		self.count_label = QLabel()
+		self.count_label.setStyleSheet("color: gray; font-size: 10px;")
+		layout.addWidget(self.count_label)
+
+		buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+		buttons.accepted.connect(self.accept)
+		buttons.rejected.connect(self.reject)
+		layout.addWidget(buttons)
+
+	def _populate(self):
+		tag = self.tag_filter.currentData()
+		presets = self.catalog.search(self.search.text(), [tag] if tag else [])
+		self.list.clear()
+		for preset in presets:
+			label = preset.name
+			if preset.tags:
+				label += f"  [{', '.join(preset.tags)}]"
+			item = QListWidgetItem(label)
+			item.setData(Qt.UserRole, preset.name)
+			if preset.description:
+				item.setToolTip(preset.description)
+			self.list.addItem(item)
+		if self.list.count():
+			self.list.setCurrentRow(0)
+		self.count_label.setText(f"{len(presets)} of {len(self.catalog)} presets")
+
+	def accept(self):
+		item = self.list.currentItem()
+		if item is None:
+			return
+		self.selected_name = item.data(Qt.UserRole)
+		super().accept()
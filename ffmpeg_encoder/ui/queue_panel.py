@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
 from PySide6.QtCore import Qt, Signal
@@ -19,8 +19,11 @@ from PySide6.QtWidgets import (
 	QCheckBox,
 	QMessageBox,
 	QHeaderView,
+	QMenu,
 )
 
+from ..core.scan import scan_folder
+
 
 @dataclass
 class QueueFileItem:
@@ -28,10 +31,13 @@ class QueueFileItem:
 	checked: bool = True
 	folder_path: str = ""
 	display_name: str = ""
+	preset: Optional[str] = None  # encode with this preset instead of the panel settings
+	priority: int = 0  # higher starts first
 
 class QueuePanel(QWidget):
 	# Signals
 	selection_changed = Signal(list)  # Emits list of checked file paths
+	job_action = Signal(str, list)  # "cancel", "pause" or "resume", selected file paths
 	
 	def __init__(self) -> None:
 		super().__init__()
@@ -58,6 +64,7 @@ class QueuePanel(QWidget):
 		self.tree_widget.setHeaderLabels(["File", "Path", "Status"])
 		self.tree_widget.setAlternatingRowColors(True)
 		self.tree_widget.setSelectionMode(QTreeWidget.ExtendedSelection)  # Allow CTRL/Shift selection
+		self.tree_widget.setContextMenuPolicy(Qt.CustomContextMenu)
 		
 		# Set column widths
 		self.tree_widget.setColumnWidth(0, 300)  # File name - wider
@@ -106,6 +113,16 @@ class QueuePanel(QWidget):
 		self.tree_widget.itemChanged.connect(self._on_item_changed)
 		self.tree_widget.itemPressed.connect(self._on_item_pressed)
 		self.tree_widget.itemClicked.connect(self._on_item_clicked)
+		self.tree_widget.customContextMenuRequested.connect(self._on_context_menu)
+
+	def _on_context_menu(self, pos) -> None:
+		paths = [item.data(0, Qt.UserRole) for item in self.tree_widget.selectedItems() if item.data(0, Qt.UserRole)]
+		if not paths:
+			return
+		menu = QMenu(self)
+		for label, action in (("Cancel", "cancel"), ("Pause", "pause"), ("Resume", "resume")):
+			menu.addAction(label).triggered.connect(lambda checked=False, action=action: self.job_action.emit(action, paths))
+		menu.exec(self.tree_widget.viewport().mapToGlobal(pos))
 
 	def _on_add_files(self) -> None:
 		files, _ = QFileDialog.getOpenFileNames(self, "Select Video Files")
@@ -142,12 +159,7 @@ class QueuePanel(QWidget):
 
 	def _add_folder_to_queue(self, folder_path: str) -> None:
 		folder = Path(folder_path)
-		video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v'}
-		
-		video_files = []
-		for ext in video_extensions:
-			video_files.extend(folder.glob(f"*{ext}"))
-			video_files.extend(folder.glob(f"*{ext.upper()}"))
+		video_files = [Path(p) for p in scan_folder(folder_path)]
 		
 		if video_files:
 			# Create folder group
@@ -377,6 +389,43 @@ class QueuePanel(QWidget):
 		"""Get list of all file paths."""
 		return list(self.file_items.keys())
 
+	def add_paths(self, paths: List[str], preset: Optional[str] = None, priority: int = 0) -> List[str]:
+		"""Queue files and folders with a preset and priority; files already queued only get the new options."""
+		before = set(self.file_items)
+		for path in paths:
+			if Path(path).is_dir():
+				if path not in self.folder_items:
+					self._add_folder_to_queue(path)
+			elif path not in self.file_items:
+				self._add_file_to_queue(path)
+		added = [p for p in self.file_items if p not in before]
+		for path in added + [p for p in paths if p in before]:
+			file_item = self.file_items[path]
+			file_item.preset = preset
+			file_item.priority = priority
+			self._set_item_tooltip(path, file_item)
+		return added
+
+	def _set_item_tooltip(self, file_path: str, file_item: QueueFileItem) -> None:
+		options = []
+		if file_item.preset:
+			options.append(f"Preset: {file_item.preset}")
+		if file_item.priority:
+			options.append(f"Priority: {file_item.priority}")
+		for i in range(self.tree_widget.topLevelItemCount()):
+			if self._set_item_tooltip_recursive(self.tree_widget.topLevelItem(i), file_path, "\n".join(options)):
+				break
+
+	def _set_item_tooltip_recursive(self, item: QTreeWidgetItem, target_path: str, text: str) -> bool:
+		if item.data(0, Qt.UserRole) == target_path:
+			for column in range(item.columnCount()):
+				item.setToolTip(column, text)
+			return True
+		for i in range(item.childCount()):
+			if self._set_item_tooltip_recursive(item.child(i), target_path, text):
+				return True
+		return False
+
 	def clear(self) -> None:
 		"""Clear all items."""
 		self.tree_widget.clear()
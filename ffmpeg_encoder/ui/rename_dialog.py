@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import (
+	QDialog,
+	QVBoxLayout,
+	QHBoxLayout,
+	QFormLayout,
+	QLineEdit,
+	QPushButton,
+	QFileDialog,
+	QLabel,
+	QComboBox,
+	QCheckBox,
+	QSpinBox,
+	QTableWidget,
+	QTableWidgetItem,
+	QHeaderView,
+	QDialogButtonBox,
+	QMessageBox,
+)
+
+from ..core.batch_rename import MAPPING_FILTER, RenameMapping, RenamePlan, apply_renames, load_mapping, pattern_name, plan_renames
+
+
+class RenameDialog(QDialog):
+	"""Rename files by pattern or by an Excel/CSV mapping sheet, with a checked preview."""
+
+	def __init__(self, files: List[str], parent=None):
+		super().__init__(parent)
+		self.files = list(files)
+		self.mapping: Optional[RenameMapping] = None
+		self.plan = RenamePlan()
+		self.rename_operations: List[Tuple[str, str]] = []
+
+		self.setWindowTitle("Batch Rename")
+		self.setModal(True)
+		self.resize(760, 520)
+
+		self._setup_ui()
+
+	def _setup_ui(self):
+		layout = QVBoxLayout(self)
+
+		form = QFormLayout()
+		self.mode = QComboBox()
+		self.mode.addItem("Pattern", "pattern")
+		self.mode.addItem("Excel / CSV mapping", "mapping")
+		form.addRow("Mode:", self.mode)
+
+		self.pattern = QLineEdit("{name}")
+		self.pattern.setToolTip("{name}: original name, {index}: running number (e.g. {index:03}), {ext}: extension")
+		self.pattern.textChanged.connect(self._update_preview)
+		self.start_index = QSpinBox()
+		self.start_index.setRange(0, 999999)
+		self.start_index.setValue(1)
+		self.start_index.valueChanged.connect(self._update_preview)
+		pattern_row = QHBoxLayout()
+		pattern_row.addWidget(self.pattern)
+		pattern_row.addWidget(QLabel("Start:"))
+		pattern_row.addWidget(self.start_index)
+		form.addRow("Pattern:", pattern_row)
+
+		self.mapping_path = QLineEdit()
+		self.mapping_path.setReadOnly(True)
+		self.mapping_path.setPlaceholderText("Column A: current name, column B: new name")
+		browse = QPushButton("Browse...")
+		browse.clicked.connect(self._on_browse)
+		self.mapping_header = QCheckBox("First row is a header")
+		self.mapping_header.setChecked(True)
+		self.mapping_header.toggled.connect(self._load_mapping)
+		mapping_row = QHBoxLayout()
+		mapping_row.addWidget(self.mapping_path)
+		mapping_row.addWidget(browse)
+		mapping_row.addWidget(self.mapping_header)
+		form.addRow("Mapping:", mapping_row)
+		layout.addLayout(form)
+
+		self.table = QTableWidget(0, 3)
+		self.table.setHorizontalHeaderLabels(["Current Name", "New Name", "Status"])
+		self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+		self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+		self.table.verticalHeader().setVisible(False)
+		self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+		layout.addWidget(self.table)
+
+		self.summary = QLabel()
+		self.summary.setWordWrap(True)
+		layout.addWidget(self.summary)
+
+		self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+		self.buttons.button(QDialogButtonBox.Ok).setText("Rename")
+		self.buttons.accepted.connect(self.accept)
+		self.buttons.rejected.connect(self.reject)
+		layout.addWidget(self.buttons)
+
+		self.mode.currentIndexChanged.connect(self._on_mode_changed)
+		self._on_mode_changed()
+
+	def _on_mode_changed(self):
+		pattern_mode = self.mode.currentData() == "pattern"
+		self.pattern.setEnabled(pattern_mode)
+		self.start_index.setEnabled(pattern_mode)
+		self.mapping_path.setEnabled(not pattern_mode)
+		self.mapping_header.setEnabled(not pattern_mode)
+		self._update_preview()
+
+	def _on_browse(self):
+		path, _ = QFileDialog.getOpenFileName(self, "Select Mapping File", "", MAPPING_FILTER)
+		if path:
+			self.mapping_path.setText(path)
+			self._load_mapping()
+
+	def _load_mapping(self):
+		path = self.mapping_path.text()
+		if not path:
+			return
+		try:
+			self.mapping = load_mapping(path, self.mapping_header.isChecked())
+		except Exception as e:
+			self.mapping = None
+			QMessageBox.warning(self, "Batch Rename", f"Could not read {Path(path).name}:\n{e}")
+		self._update_preview()
+
+	def _new_name(self):
+		if self.mode.currentData() == "mapping":
+			return self.mapping.new_name if self.mapping is not None else (lambda path: None)
+		pattern = self.pattern.text()
+		index = {path: self.start_index.value() + i for i, path in enumerate(self.files)}
+		return lambda path: pattern_name(path, pattern, index[path])
+
+	def _update_preview(self):
+		try:
+			self.plan = plan_renames(self.files, self._new_name())
+			error = None
+		except (KeyError, IndexError, ValueError) as e:
+			# Unknown or malformed placeholder while the pattern is being typed
+			self.plan = RenamePlan(problems=[f"Invalid pattern: {e}"])
+			error = str(e)
+
+		targets = dict(self.plan.operations)
+		unmatched = set(self.plan.unmatched)
+		self.table.setRowCount(len(self.files))
+		for row, path in enumerate(self.files):
+			new_path = targets.get(path)
+			if error:
+				status = "Invalid pattern"
+			elif path in unmatched:
+				status = "Not in mapping"
+			elif new_path is None:
+				status = "Unchanged"
+			else:
+				status = "Rename"
+			cells = [Path(path).name, Path(new_path).name if new_path else "", status]
+			for column, text in enumerate(cells):
+				item = QTableWidgetItem(text)
+				item.setToolTip(path if column == 0 else text)
+				if status != "Rename":
+					item.setForeground(QColor("gray"))
+				self.table.setItem(row, column, item)
+
+		parts = [f"{len(self.plan.operations)} of {len(self.files)} files will be renamed"]
+		if self.mode.currentData() == "mapping" and self.mapping is not None:
+			parts.append(f"{len(self.mapping)} names in the mapping")
+			if self.mapping.duplicates:
+				parts.append(f"{len(self.mapping.duplicates)} conflicting duplicate rows ignored")
+		text = ", ".join(parts)
+		if self.plan.problems:
+			text += "\n" + "\n".join(self.plan.problems[:10])
+			if len(self.plan.problems) > 10:
+				text += f"\n... and {len(self.plan.problems) - 10} more"
+		self.summary.setText(text)
+		self.summary.setStyleSheet("color: red;" if self.plan.problems else "")
+		self.buttons.button(QDialogButtonBox.Ok).setEnabled(self.plan.ok and bool(self.plan.operations))
+
+	def accept(self):
+		if not self.plan.ok or not self.plan.operations:
+			return
+		try:
+			self.rename_operations = apply_renames(self.plan)
+		except OSError as e:
+			QMessageBox.critical(self, "Batch Rename", f"Renaming failed and was rolled back:\n{e}")
+			self._update_preview()
+			return
+		super().accept()
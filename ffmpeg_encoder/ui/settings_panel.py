@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from dataclasses import asdict
+
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtWidgets import (
 	QWidget,
@@ -21,17 +23,28 @@ from PySide6.QtWidgets import (
 )
 import os
 import json
+import logging
+import threading
 from pathlib import Path
 
 
+logger = logging.getLogger(__name__)
+
+
 class SettingsPanel(QWidget):
 	save_preset_clicked = Signal()
 	load_preset_clicked = Signal()
+	add_preset_sweep_clicked = Signal()
+	capabilities_ready = Signal(object)  # ffmpeg info dict from a background probe
 
 	def __init__(self) -> None:
 		super().__init__()
 		layout = QVBoxLayout(self)
 		
+		# Filled in by start_capability_probe(); widgets start with fallback lists
+		self.capabilities = None
+		self.capabilities_ready.connect(self._apply_capabilities)
+		
 		# Flamenco 설정 파일 경로
 		self.flamenco_config_path = Path.home() / ".ffmpeg_encoder" / "flamenco_config.json"
 		self.flamenco_config_path.parent.mkdir(exist_ok=True)
@@ -58,6 +71,16 @@ class SettingsPanel(QWidget):
 		layout.addWidget(self.encode_btn)
 		layout.addWidget(self.multi_encode_btn)
 		layout.addWidget(self.submit_flamenco_btn)
+
+		# Whole-batch controls; single jobs are controlled from the queue's context menu
+		control_row = QHBoxLayout()
+		self.pause_btn = QPushButton("Pause")
+		self.resume_btn = QPushButton("Resume")
+		self.cancel_btn = QPushButton("Cancel")
+		for btn in (self.pause_btn, self.resume_btn, self.cancel_btn):
+			btn.setEnabled(False)
+			control_row.addWidget(btn)
+		layout.addLayout(control_row)
 		layout.addStretch(1)
 
 		self.save_preset_btn.clicked.connect(self.save_preset_clicked.emit)
@@ -111,8 +134,16 @@ class SettingsPanel(QWidget):
 		self.bitrate.setPlaceholderText("e.g. 8M or 2000k")
 		self.bitrate.setToolTip("Bitrate (e.g. 8M, 2000k)")
 		
+		self.content_aware = QCheckBox("Content-aware (per-file CRF/bitrate)")
+		self.content_aware.setToolTip("Analyze sampled segments of each file and adjust CRF or bitrate to its complexity")
+		
 		quality_layout.addRow("CRF (Quality):", self.crf)
 		quality_layout.addRow("Bitrate:", self.bitrate)
+		quality_layout.addRow("", self.content_aware)
+		
+		self.stream_copy = QCheckBox("Copy streams that already match (remux)")
+		self.stream_copy.setToolTip("Skip re-encoding when the source codec, profile, pixel format and bitrate already meet these settings")
+		quality_layout.addRow("", self.stream_copy)
 		layout.addWidget(quality_group)
 		
 		
@@ -137,12 +168,75 @@ class SettingsPanel(QWidget):
 		self.max_filesize.setPlaceholderText("e.g. 700M")
 		self.max_filesize.setToolTip("Maximum file size (e.g. 700M, 1G)")
 		
+		self.target_size = QLineEdit()
+		self.target_size.setPlaceholderText("e.g. 500M")
+		self.target_size.setToolTip("Target output size; bitrate is computed from the duration (replaces Max File Size)")
+		self.target_two_pass = QCheckBox("Two-pass for target size")
+		self.target_two_pass.setChecked(True)
+		
 		self.extra_params = QLineEdit()
 		self.extra_params.setPlaceholderText("Additional FFmpeg params, e.g. -preset slow -tune film")
 		self.extra_params.setToolTip("Additional FFmpeg parameters")
 		
+		self.quality_metrics = QCheckBox("Score quality after encode (SSIM/PSNR, VMAF if available)")
+		self.metric_samples = QSpinBox()
+		self.metric_samples.setRange(0, 20)
+		self.metric_samples.setValue(3)
+		self.metric_samples.setToolTip("Number of sampled segments to score (0 = whole file)")
+		
+		self.verify_output = QCheckBox("Verify output (duration and streams against the source)")
+		self.verify_samples = QSpinBox()
+		self.verify_samples.setRange(0, 20)
+		self.verify_samples.setValue(0)
+		self.verify_samples.setToolTip("Sampled segments to test-decode, plus the end of the file (0 = probe only)")
+		
+		self.parallel_jobs = QSpinBox()
+		self.parallel_jobs.setRange(1, 16)
+		self.parallel_jobs.setValue(1)
+		self.parallel_jobs.setToolTip("Files encoded at the same time; the longest predicted jobs start first")
+		
+		self.writers_per_disk = QSpinBox()
+		self.writers_per_disk.setRange(0, 16)
+		self.writers_per_disk.setValue(0)
+		self.writers_per_disk.setSpecialValueText("No limit")
+		self.writers_per_disk.setToolTip("Jobs writing to the same disk at once; jobs also wait until their output fits")
+		
+		self.nvenc_sessions = QSpinBox()
+		self.nvenc_sessions.setRange(0, 32)
+		self.nvenc_sessions.setValue(3)
+		self.nvenc_sessions.setSpecialValueText("Share parallel jobs")
+		self.nvenc_sessions.setToolTip("NVENC encodes per GPU, run beside the parallel CPU jobs; GeForce drivers allow only a few sessions")
+		
+		self.retries = QSpinBox()
+		self.retries.setRange(0, 10)
+		self.retries.setValue(2)
+		self.retries.setToolTip("Reruns after transient failures (network share errors, GPU session limits, out of memory)")
+		self.gpu_fallback = QCheckBox("Fall back to the CPU encoder when NVENC is busy or missing")
+		
+		self.scratch_dir = QLineEdit()
+		self.scratch_dir.setPlaceholderText("Off (read network files in place)")
+		self.scratch_dir.setToolTip("Local folder (SSD) that network inputs are copied to ahead of their jobs; outputs are written there and moved back")
+		self.scratch_size = QSpinBox()
+		self.scratch_size.setRange(1, 10000)
+		self.scratch_size.setValue(100)
+		self.scratch_size.setSuffix(" GB")
+		self.scratch_size.setToolTip("Scratch space to use; the least recently used copies are removed first")
+		
 		advanced_layout.addRow("Max File Size:", self.max_filesize)
+		advanced_layout.addRow("Target Size:", self.target_size)
+		advanced_layout.addRow("", self.target_two_pass)
 		advanced_layout.addRow("Extra Params:", self.extra_params)
+		advanced_layout.addRow("", self.quality_metrics)
+		advanced_layout.addRow("Metric Samples:", self.metric_samples)
+		advanced_layout.addRow("", self.verify_output)
+		advanced_layout.addRow("Verify Samples:", self.verify_samples)
+		advanced_layout.addRow("Parallel Jobs:", self.parallel_jobs)
+		advanced_layout.addRow("Writers per Disk:", self.writers_per_disk)
+		advanced_layout.addRow("NVENC Sessions per GPU:", self.nvenc_sessions)
+		advanced_layout.addRow("Retries:", self.retries)
+		advanced_layout.addRow("", self.gpu_fallback)
+		advanced_layout.addRow("Scratch Folder:", self.scratch_dir)
+		advanced_layout.addRow("Scratch Size:", self.scratch_size)
 		layout.addWidget(advanced_group)
 		
 		# Multi-encode settings
@@ -163,10 +257,13 @@ class SettingsPanel(QWidget):
 		# 버튼들
 		button_layout = QHBoxLayout()
 		self.add_setting_btn = QPushButton("Add Current Settings")
+		self.add_sweep_btn = QPushButton("Add Preset Sweep")
+		self.add_sweep_btn.setToolTip("Add a preset; its sweep axes expand into one encode per combination")
 		self.remove_setting_btn = QPushButton("Remove Selected")
 		self.clear_settings_btn = QPushButton("Clear All")
 		
 		button_layout.addWidget(self.add_setting_btn)
+		button_layout.addWidget(self.add_sweep_btn)
 		button_layout.addWidget(self.remove_setting_btn)
 		button_layout.addWidget(self.clear_settings_btn)
 		multi_layout.addLayout(button_layout)
@@ -175,6 +272,7 @@ class SettingsPanel(QWidget):
 		
 		# 연결
 		self.add_setting_btn.clicked.connect(self._add_current_settings)
+		self.add_sweep_btn.clicked.connect(self.add_preset_sweep_clicked.emit)
 		self.remove_setting_btn.clicked.connect(self._remove_selected_setting)
 		self.clear_settings_btn.clicked.connect(self._clear_all_settings)
 		
@@ -217,10 +315,12 @@ class SettingsPanel(QWidget):
 		self.video_codec.setCurrentIndex(0)
 		self._on_codec_changed()
 		
-		# Try to load additional codecs from FFmpeg (optional)
+		# Codecs reported by FFmpeg, once the background probe has finished
+		if self.capabilities is None:
+			return
 		try:
 			from ..utils.ffmpeg_check import get_user_friendly_codecs
-			codecs = get_user_friendly_codecs(container)
+			codecs = get_user_friendly_codecs(container, self.capabilities)
 			
 			# Only add if we get more codecs than fallback
 			video_codecs = codecs.get("video", [])
@@ -243,11 +343,39 @@ class SettingsPanel(QWidget):
 					self._on_codec_changed()
 				
 		except Exception as e:
-			import traceback
-			print(f"Error loading additional codecs: {e}")
-			print(f"Traceback: {traceback.format_exc()}")
+			logger.exception("Error loading additional codecs: %s", e)
 			# Keep fallback codecs that were already added
 
+	def start_capability_probe(self) -> None:
+		"""Probe FFmpeg encoders off the GUI thread; the codec lists update when done."""
+		def _probe() -> None:
+			from ..utils.ffmpeg_check import check_ffmpeg_installation
+			try:
+				info = check_ffmpeg_installation()
+			except Exception as e:
+				info = {"error": str(e)}
+			self.capabilities_ready.emit(info)
+
+		threading.Thread(target=_probe, name="ffmpeg-capabilities", daemon=True).start()
+
+	def _apply_capabilities(self, info: dict) -> None:
+		"""Refill codec lists from the probe result, keeping the current selection."""
+		if info.get("error") or not info.get("encoders"):
+			return
+		self.capabilities = info
+		video_codec = self.video_codec.currentData()
+		audio_codec = self.audio_codec.currentText()
+		
+		self._populate_user_friendly_codecs(self.container_format.currentText())
+		index = self.video_codec.findData(video_codec)
+		if index >= 0:
+			self.video_codec.setCurrentIndex(index)
+		
+		self.audio_codec.clear()
+		self._populate_audio_codecs()
+		if self.audio_codec.findText(audio_codec) >= 0:
+			self.audio_codec.setCurrentText(audio_codec)
+
 	def _on_codec_changed(self) -> None:
 		"""Handle codec selection change."""
 		current_data = self.video_codec.currentData()
@@ -320,9 +448,12 @@ class SettingsPanel(QWidget):
 
 	def _populate_audio_codecs(self) -> None:
 		"""Populate audio codec list with available encoders."""
+		if self.capabilities is None:
+			self.audio_codec.addItems(["aac", "libmp3lame", "libopus", "libvorbis", "ac3", "flac", "pcm_s16le"])
+			return
 		try:
 			from ..utils.ffmpeg_check import get_recommended_codecs
-			codecs = get_recommended_codecs()
+			codecs = get_recommended_codecs(self.capabilities)
 			
 			# Add audio codecs
 			audio_codecs = codecs.get("audio", [])
@@ -516,7 +647,7 @@ class SettingsPanel(QWidget):
 				json.dump(config, f, indent=2, ensure_ascii=False)
 				
 		except Exception as e:
-			print(f"Flamenco 설정 저장 오류: {e}")
+			logger.error("Flamenco 설정 저장 오류: %s", e)
 
 	def _load_flamenco_config(self) -> None:
 		"""Flamenco 설정을 자동으로 불러옵니다."""
@@ -542,7 +673,7 @@ class SettingsPanel(QWidget):
 					self.flamenco_status.setStyleSheet("color: gray;")
 					
 		except Exception as e:
-			print(f"Flamenco 설정 불러오기 오류: {e}")
+			logger.error("Flamenco 설정 불러오기 오류: %s", e)
 			self.flamenco_status.setText("Flamenco 경로를 선택하세요")
 			self.flamenco_status.setStyleSheet("color: gray;")
 
@@ -597,6 +728,18 @@ class SettingsPanel(QWidget):
 		item.setData(Qt.UserRole, settings)
 		self.multi_settings_list.addItem(item)
 
+	def add_preset_sweep(self, preset) -> None:
+		"""Add a resolved preset; its sweep is expanded when encoding starts."""
+		count = 1
+		for values in preset.sweep.values():
+			count *= len(values)
+		name = f"Preset {preset.name}" + (f" - sweep of {count}" if preset.sweep else "")
+		item = QListWidgetItem(name)
+		item.setData(Qt.UserRole, asdict(preset.to_video_settings()))
+		item.setData(Qt.UserRole + 1, preset.sweep)
+		item.setToolTip(", ".join(f"{axis}: {values}" for axis, values in preset.sweep.items()))
+		self.multi_settings_list.addItem(item)
+
 	def _remove_selected_setting(self) -> None:
 		"""선택된 설정을 제거합니다."""
 		current_row = self.multi_settings_list.currentRow()
@@ -616,11 +759,20 @@ class SettingsPanel(QWidget):
 			settings_list.append(settings)
 		return settings_list
 
+	def get_multi_sweeps(self) -> list:
+		"""(settings dict, sweep dict) per Multi-Encode entry; plain entries have an empty sweep."""
+		entries = []
+		for i in range(self.multi_settings_list.count()):
+			item = self.multi_settings_list.item(i)
+			entries.append((item.data(Qt.UserRole), item.data(Qt.UserRole + 1) or {}))
+		return entries
+
 	def get_settings(self) -> dict:
 		"""현재 설정을 딕셔너리로 반환합니다."""
 		# Get video codec ID from user-friendly selection
 		video_codec_data = self.video_codec.currentData()
 		video_codec = video_codec_data if video_codec_data else self.video_codec.currentText()
+		target_size = self.target_size.text().strip() or None
 		
 		# GPU enable is determined by codec selection
 		gpu_enable = "nvenc" in video_codec
@@ -633,12 +785,20 @@ class SettingsPanel(QWidget):
 			"video_codec": video_codec,
 			"crf": self.crf.value(),
 			"bitrate": self.bitrate.text().strip() or None,
+			"two_pass": bool(target_size) and self.target_two_pass.isChecked(),
 			"gpu_enable": gpu_enable,
 			"low_latency": low_latency,
 			"tune": "none",  # Not used anymore
 			"audio_codec": self.audio_codec.currentText(),
 			"audio_bitrate": self.audio_bitrate.text().strip() or None,
 			"max_filesize": getattr(self, 'max_filesize', QLineEdit()).text().strip() or None,
+			"target_size": target_size,
+			"content_aware": self.content_aware.isChecked(),
+			"stream_copy": self.stream_copy.isChecked(),
+			"quality_metrics": self.quality_metrics.isChecked(),
+			"metric_samples": self.metric_samples.value(),
+			"verify": self.verify_output.isChecked(),
+			"verify_samples": self.verify_samples.value(),
 		}
 
 	def set_settings(self, settings: dict) -> None:
@@ -664,4 +824,20 @@ class SettingsPanel(QWidget):
 			self.audio_bitrate.setText(settings["audio_bitrate"] or "")
 		if "max_filesize" in settings and hasattr(self, 'max_filesize'):
 			self.max_filesize.setText(settings["max_filesize"] or "")
+		if "target_size" in settings:
+			self.target_size.setText(settings["target_size"] or "")
+		if "two_pass" in settings:
+			self.target_two_pass.setChecked(bool(settings["two_pass"]))
+		if "content_aware" in settings:
+			self.content_aware.setChecked(bool(settings["content_aware"]))
+		if "stream_copy" in settings:
+			self.stream_copy.setChecked(bool(settings["stream_copy"]))
+		if "quality_metrics" in settings:
+			self.quality_metrics.setChecked(bool(settings["quality_metrics"]))
+		if "metric_samples" in settings:
+			self.metric_samples.setValue(int(settings["metric_samples"]))
+		if "verify" in settings:
+			self.verify_output.setChecked(bool(settings["verify"]))
+		if "verify_samples" in settings:
+			self.verify_samples.setValue(int(settings["verify_samples"]))
 
@@ -0,0 +1,135 @@
+"""Structured JSON-lines event log with trace spans.
+
+Every record of the "ffmpeg_encoder" logger tree is written as one JSON object
+per line to a rotating file. Spans record the timing of pipeline stages
+(scan, probe, keyframes, build, queue_wait, stage_in, encode, score, verify,
+stage_out, submit) with the job they belong to, so a batch can be analysed
+with jq or pandas.
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+EVENT_LOG_PATH = Path.home() / ".ffmpeg_encoder" / "logs" / "events.jsonl"
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+
+ROOT_LOGGER = "ffmpeg_encoder"
+_trace = logging.getLogger(f"{ROOT_LOGGER}.trace")
+
+_job_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("job_id", default=None)
+_span_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span_id", default=None)
+
+
+class JsonLinesFormatter(logging.Formatter):
+	def format(self, record: logging.LogRecord) -> str:
+		data: Dict[str, Any] = {
+			"ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+			"level": record.levelname,
+			"logger": record.name,
+			"event": record.getMessage(),
+		}
+		fields = getattr(record, "fields", None)
+		if fields:
+			data.update(fields)
+		elif _job_id.get() is not None:
+			data["job_id"] = _job_id.get()
+		if record.exc_info:
+			data["exc"] = self.formatException(record.exc_info)
+		return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def configure_event_log(path: Optional[Path] = None, max_bytes: int = MAX_BYTES, backup_count: int = BACKUP_COUNT) -> Path:
+	"""Attach the rotating JSON-lines handler to the package logger; repeated calls are no-ops."""
+	path = Path(path) if path else EVENT_LOG_PATH
+	logger = logging.getLogger(ROOT_LOGGER)
+	for handler in logger.handlers:
+		if isinstance(handler, RotatingFileHandler) and Path(handler.baseFilename) == path.resolve():
+			return path
+	path.parent.mkdir(parents=True, exist_ok=True)
+	handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+	handler.setFormatter(JsonLinesFormatter())
+	logger.addHandler(handler)
+	if logger.level == logging.NOTSET:
+		logger.setLevel(logging.INFO)
+	return path
+
+
+def event(name: str, level: int = logging.INFO, **fields: Any) -> None:
+	"""Write one structured event; the current job id is added when set."""
+	if not _trace.isEnabledFor(level):
+		return
+	job_id = _job_id.get()
+	if job_id is not None:
+		fields.setdefault("job_id", job_id)
+	_trace.log(level, name, extra={"fields": fields})
+
+
+@contextmanager
+def job_scope(job_id: str) -> Iterator[None]:
+	"""Tag events and spans in this thread (or task) with `job_id`."""
+	token = _job_id.set(job_id)
+	try:
+		yield
+	finally:
+		_job_id.reset(token)
+
+
+def record_span(name: str, start: float, end: float, status: str = "ok", **fields: Any) -> None:
+	"""Write a span whose start and end (epoch seconds) were measured elsewhere."""
+	event(
+		"span",
+		span=name,
+		span_id=uuid.uuid4().hex[:12],
+		parent_id=_span_id.get(),
+		start=round(start, 6),
+		duration_ms=round((end - start) * 1000, 3),
+		status=status,
+		**fields,
+	)
+
+
+@contextmanager
+def span(name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+	"""Time a block as a span; the yielded dict adds attributes to it.
+
+	Nested spans record their parent. An exception marks the span as failed
+	and propagates.
+	"""
+	if not _trace.isEnabledFor(logging.INFO):
+		yield fields
+		return
+	span_id = uuid.uuid4().hex[:12]
+	parent_id = _span_id.get()
+	token = _span_id.set(span_id)
+	start = time.time()
+	began = time.perf_counter()
+	status = "ok"
+	try:
+		yield fields
+	except BaseException as e:
+		status = "error"
+		fields["error"] = str(e) or type(e).__name__
+		raise
+	finally:
+		_span_id.reset(token)
+		event(
+			"span",
+			span=name,
+			span_id=span_id,
+			parent_id=parent_id,
+			start=round(start, 6),
+			duration_ms=round((time.perf_counter() - began) * 1000, 3),
+			status=status,
+			**fields,
+		)
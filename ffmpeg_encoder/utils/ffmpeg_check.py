@@ -2,12 +2,17 @@ from __future__ import annotations
 
 import subprocess
 import shutil
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 from .env import which_ffmpeg, which_ffprobe
 
 
+@lru_cache(maxsize=None)
 def check_ffmpeg_installation() -> Dict[str, Any]:
-	"""Check FFmpeg installation and return detailed info."""
+	"""Check FFmpeg installation and return detailed info.
+
+	The result is cached for the life of the process; treat it as read-only.
+	"""
 	result = {
 		"ffmpeg_available": False,
 		"ffprobe_available": False,
@@ -44,20 +49,6 @@ def check_ffmpeg_installation() -> Dict[str, Any]:
 	# Get codecs and formats
 	if ffmpeg_path:
 		try:
-			# Get encoders
-			proc = subprocess.run([ffmpeg_path, "-encoders"], capture_output=True, text=True, timeout=10)
-			if proc.returncode == 0:
-				encoders = []
-				for line in proc.stdout.split('\n'):
-					if 'V' in line or 'A' in line:  # Video or Audio
-						parts = line.split()
-						if len(parts) >= 2:
-							encoder_name = parts[1]
-							# Skip if it's a description line
-							if not encoder_name.startswith('libav') and not encoder_name.startswith('libsw'):
-								encoders.append(encoder_name)
-				result["encoders"] = encoders
-			
 			# Get formats
 			proc = subprocess.run([ffmpeg_path, "-formats"], capture_output=True, text=True, timeout=10)
 			if proc.returncode == 0:
@@ -94,6 +85,32 @@ def check_ffmpeg_installation() -> Dict[str, Any]:
 	return result
 
 
+@lru_cache(maxsize=None)
+def get_available_filters() -> frozenset[str]:
+	"""Return the names of the filters compiled into the ffmpeg binary."""
+	ffmpeg_path = which_ffmpeg()
+	if not ffmpeg_path:
+		return frozenset()
+	try:
+		proc = subprocess.run([ffmpeg_path, "-hide_banner", "-filters"], capture_output=True, text=True, timeout=10)
+	except Exception:
+		return frozenset()
+	if proc.returncode != 0:
+		return frozenset()
+	filters = set()
+	for line in proc.stdout.split('\n'):
+		parts = line.split()
+		# Filter lines look like " TSC ssim  VV->V  Calculate the SSIM ..."
+		if len(parts) >= 3 and "->" in parts[2]:
+			filters.add(parts[1])
+	return frozenset(filters)
+
+
+def has_filter(name: str) -> bool:
+	"""Check if ffmpeg was built with the given filter (e.g. libvmaf)."""
+	return name in get_available_filters()
+
+
 def get_gpu_encoders() -> List[str]:
 	"""Get list of available GPU encoders."""
 	info = check_ffmpeg_installation()
@@ -105,9 +122,9 @@ def is_gpu_available() -> bool:
 	return len(get_gpu_encoders()) > 0
 
 
-def get_user_friendly_codecs(container: str = None) -> Dict[str, List[Dict[str, str]]]:
+def get_user_friendly_codecs(container: str = None, info: Optional[Dict[str, Any]] = None) -> Dict[str, List[Dict[str, str]]]:
 	"""Get user-friendly codec names with descriptions."""
-	info = check_ffmpeg_installation()
+	info = info or check_ffmpeg_installation()
 	encoders = info.get("encoders", [])
 	
 	# Container compatibility mapping
@@ -184,9 +201,9 @@ def get_user_friendly_codecs(container: str = None) -> Dict[str, List[Dict[str,
 
 
 
-def get_recommended_codecs() -> Dict[str, List[str]]:
+def get_recommended_codecs(info: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
 	"""Get recommended codecs based on available encoders."""
-	info = check_ffmpeg_installation()
+	info = info or check_ffmpeg_installation()
 	encoders = info.get("encoders", [])
 	
 	recommended = {
@@ -0,0 +1,204 @@
+"""One desktop app per user, and the local channel other processes use to talk to it.
+
+The first GUI launch takes an exclusive lock on a file and listens on a
+Unix socket (a named pipe on Windows). Later launches find the lock taken,
+send their files to the running app and exit before Qt is even imported.
+The kernel drops the lock when the owner exits or crashes, so a stale
+socket is simply replaced.
+"""
+from __future__ import annotations
+
+import getpass
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+
+INSTANCE_DIR = Path.home() / ".ffmpeg_encoder"
+LOCK_PATH = INSTANCE_DIR / "instance.lock"
+KEY_PATH = INSTANCE_DIR / "instance.key"
+# How long a second launch keeps trying while the first one is still starting up
+CONNECT_TIMEOUT = 5.0
+# Bigger requests are dropped; a few thousand paths fit easily
+MAX_MESSAGE_BYTES = 4 * 1024 ** 2
+# A client that connects but does not send its request in time is dropped
+RECV_TIMEOUT = 2.0
+
+
+def _address() -> tuple:
+	"""(address, family) of the command channel."""
+	if os.name == "nt":
+		return rf"\\.\pipe\ffmpeg_encoder-{getpass.getuser()}", "AF_PIPE"
+	return str(INSTANCE_DIR / "instance.sock"), "AF_UNIX"
+
+
+def _authkey() -> bytes:
+	"""Per-user secret both ends prove they know; created private on first use."""
+	try:
+		return KEY_PATH.read_bytes()
+	except FileNotFoundError:
+		pass
+	INSTANCE_DIR.mkdir(parents=True, exist_ok=True)
+	# Written in full before it appears under its name, so a racing launch never reads a partial key
+	fd, tmp = tempfile.mkstemp(dir=INSTANCE_DIR, prefix="instance.key.")
+	try:
+		key = secrets.token_bytes(32)
+		with os.fdopen(fd, "wb") as f:
+			f.write(key)
+		try:
+			# Unlike a rename, a link never replaces a key another launch already put in place
+			os.link(tmp, KEY_PATH)
+		except FileExistsError:
+			return KEY_PATH.read_bytes()
+		return key
+	finally:
+		os.unlink(tmp)
+
+
+class InstanceLock:
+	"""Exclusive, non-blocking lock held for the lifetime of the running app."""
+
+	def __init__(self, path: Path = LOCK_PATH) -> None:
+		self.path = path
+		self._file = None
+
+	def acquire(self) -> bool:
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		f = open(self.path, "a+b")
+		try:
+			if os.name == "nt":
+				import msvcrt
+
+				msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+			else:
+				import fcntl
+
+				fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+		except OSError:
+			f.close()
+			return False
+		self._file = f
+		return True
+
+	@property
+	def held(self) -> bool:
+		return self._file is not None
+
+	def release(self) -> None:
+		if self._file is not None:
+			# Closing the file drops the lock on every platform
+			self._file.close()
+			self._file = None
+
+
+def send_command(message: Dict[str, Any], timeout: float = CONNECT_TIMEOUT) -> Optional[Dict[str, Any]]:
+	"""Send `message` to the running app and return its reply, or None when no app answers."""
+	from multiprocessing.connection import Client
+
+	address, family = _address()
+	authkey = _authkey()
+	deadline = time.monotonic() + timeout
+	while True:
+		try:
+			conn = Client(address, family, authkey=authkey)
+			break
+		except (OSError, EOFError):
+			# The owner may hold the lock but not listen yet
+			if time.monotonic() >= deadline:
+				return None
+			time.sleep(0.1)
+	with conn:
+		conn.send_bytes(json.dumps(message).encode("utf-8"))
+		return json.loads(conn.recv_bytes(MAX_MESSAGE_BYTES).decode("utf-8"))
+
+
+class CommandServer:
+	"""Accepts commands from other processes on a background thread.
+
+	`handler(message)` runs on a background thread (one per connection) and
+	returns the reply; GUI code should hand the message to the main thread
+	(e.g. with a signal) and return at once. Messages are JSON objects with
+	a "command" key.
+	"""
+
+	def __init__(self, handler: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+		self.handler = handler
+		self._authkey = b""
+		self._listener = None
+		self._thread: Optional[threading.Thread] = None
+		self._stopping = False
+
+	def start(self) -> None:
+		"""Listen on the channel; call only while holding the InstanceLock."""
+		from multiprocessing.connection import Listener
+
+		address, family = _address()
+		if family == "AF_UNIX":
+			# Left behind by an owner that crashed; the lock says it is not in use
+			try:
+				os.unlink(address)
+			except FileNotFoundError:
+				pass
+		self._authkey = _authkey()
+		# Authenticated per connection in _handle, so a client that never answers cannot block accept()
+		self._listener = Listener(address, family)
+		self._thread = threading.Thread(target=self._serve, name="instance-commands", daemon=True)
+		self._thread.start()
+
+	def _serve(self) -> None:
+		while not self._stopping:
+			try:
+				conn = self._listener.accept()
+			except (OSError, EOFError):
+				if self._stopping:
+					return
+				continue
+			if self._stopping:
+				conn.close()
+				return
+			threading.Thread(target=self._handle, args=(conn,), name="instance-command", daemon=True).start()
+
+	def _handle(self, conn) -> None:
+		from multiprocessing import AuthenticationError
+		from multiprocessing.connection import answer_challenge, deliver_challenge
+
+		with conn:
+			try:
+				deliver_challenge(conn, self._authkey)
+				answer_challenge(conn, self._authkey)
+				if not conn.poll(RECV_TIMEOUT):
+					return
+				message = json.loads(conn.recv_bytes(MAX_MESSAGE_BYTES).decode("utf-8"))
+				if not isinstance(message, dict):
+					raise ValueError("expected a JSON object")
+				reply = self.handler(message)
+			except (OSError, EOFError, AuthenticationError):
+				return
+			except Exception as e:
+				reply = {"ok": False, "error": str(e)}
+			try:
+				conn.send_bytes(json.dumps(reply).encode("utf-8"))
+			except OSError:
+				pass
+
+	def stop(self) -> None:
+		if self._listener is None:
+			return
+		self._stopping = True
+		# accept() does not return when the listener is closed from another thread; wake it with a connection
+		try:
+			from multiprocessing.connection import Client
+
+			address, family = _address()
+			Client(address, family, authkey=self._authkey).close()
+		except (OSError, EOFError):
+			pass
+		if self._thread is not None:
+			self._thread.join(timeout=2)
+		self._listener.close()
+		self._listener = None
@@ -0,0 +1,55 @@
+"""Import-time budget for GUI cold start.
+
+tests/test_startup.py fails when importing the main window (or the CLI) gets
+slower than the budget or pulls in a module that should only load on first use.
+"""
+from __future__ import annotations
+
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+STARTUP_MODULE = "ffmpeg_encoder.ui.main_window"
+# Cumulative import time allowed for STARTUP_MODULE, excluding PySide6 itself.
+STARTUP_BUDGET_SECONDS = 0.25
+# Loaded lazily: Flamenco submission, presets, Excel renames.
+DEFERRED_MODULES = ("requests", "yaml", "pydantic", "pandas", "openpyxl")
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(module: str = STARTUP_MODULE) -> Dict[str, Tuple[float, float]]:
+	"""Import `module` in a fresh interpreter and return {name: (self, cumulative)} seconds."""
+	proc = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", f"import {module}"],
+		capture_output=True,
+		text=True,
+		check=False,
+	)
+	if proc.returncode != 0:
+		raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} failed")
+	timings: Dict[str, Tuple[float, float]] = {}
+	for match in _IMPORT_LINE.finditer(proc.stderr):
+		self_us, cumulative_us, _, name = match.groups()
+		timings[name] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+	return timings
+
+
+def check_startup(module: str = STARTUP_MODULE, budget: float = STARTUP_BUDGET_SECONDS) -> List[str]:
+	"""Return budget violations; an empty list means startup is within budget."""
+	timings = measure_imports(module)
+	problems: List[str] = []
+
+	for name in DEFERRED_MODULES:
+		if name in timings:
+			problems.append(f"{name} is imported at startup ({timings[name][1] * 1000:.0f} ms)")
+
+	total = timings.get(module, (0.0, 0.0))[1]
+	qt = sum(cumulative for name, (_, cumulative) in timings.items() if name.startswith("PySide6.") and name.count(".") == 1)
+	own = total - qt
+	if own > budget:
+		problems.append(f"{module} takes {own * 1000:.0f} ms to import without Qt (budget {budget * 1000:.0f} ms)")
+	return problems
+
@@ -0,0 +1,40 @@
+"""Shared fixtures: a scripted stand-in for the ffmpeg runner."""
+from __future__ import annotations
+
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import pytest
+
+
+class ScriptedRunner:
+	"""Plays back (exit code, output lines) per ffmpeg run and writes the output of successful runs."""
+
+	def __init__(self, outcomes: Sequence[Tuple[int, Sequence[str]]] = (), on_log: Optional[Callable[[str], None]] = None) -> None:
+		self.outcomes = list(outcomes)
+		self.on_log = on_log or (lambda line: None)
+		self.commands: List[List[str]] = []
+		self.terminated = False
+
+	def run(self, cmd: List[str]) -> int:
+		self.commands.append(list(cmd))
+		code, lines = self.outcomes.pop(0) if self.outcomes else (0, ())
+		for line in lines:
+			self.on_log(line)
+		if code == 0 and cmd[-1] not in ("-", "/dev/null", "NUL"):
+			with open(cmd[-1], "wb") as f:
+				f.write(b"encoded")
+		return code
+
+	def terminate(self) -> None:
+		self.terminated = True
+
+	def pause(self) -> bool:
+		return False
+
+	def resume(self) -> bool:
+		return False
+
+
+@pytest.fixture
+def scripted_runner():
+	return ScriptedRunner
@@ -0,0 +1,240 @@
+"""Cancel, pause and resume of queued and running jobs, and the start order of the queue."""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from ffmpeg_encoder.core.async_runner import AsyncFFmpegRunner
+from ffmpeg_encoder.core.batch import BatchRunner
+from ffmpeg_encoder.core.ffmpeg_cmd import VideoSettings
+from ffmpeg_encoder.core.queue import JobStatus, QueueItem
+
+
+class _GatedRunner:
+	"""Blocks each run until the test opens its job's gate; records start order."""
+
+	def __init__(self, harness, item, on_log) -> None:
+		self.harness = harness
+		self.item = item
+		self.on_log = on_log
+		self.pausable = harness.pausable
+
+	def run(self, cmd) -> int:
+		self.harness.started.append(self.item.source_path)
+		self.harness.running.set()
+		gate = self.harness.gates.setdefault(self.item.job_id, threading.Event())
+		while not gate.wait(0.01):
+			if self.harness.terminated.get(self.item.job_id):
+				return 255
+		open(cmd[-1], "wb").close()
+		return 0
+
+	def terminate(self) -> None:
+		self.harness.terminated[self.item.job_id] = True
+
+	def pause(self) -> bool:
+		return self.pausable
+
+	def resume(self) -> bool:
+		return self.pausable
+
+
+class _Harness:
+	def __init__(self, pausable: bool = True) -> None:
+		self.pausable = pausable
+		self.started = []
+		self.gates = {}
+		self.terminated = {}
+		self.events = []
+		self.running = threading.Event()
+
+	def factory(self, item, on_log):
+		return _GatedRunner(self, item, on_log)
+
+	def open(self, item) -> None:
+		self.gates.setdefault(item.job_id, threading.Event()).set()
+
+	def open_all(self, items) -> None:
+		for item in items:
+			self.open(item)
+
+	def statuses(self, item):
+		return [e.data.get("status") for e in self.events if e.job_id == item.job_id and e.kind == "job_status"]
+
+
+def _items(tmp_path, count, priorities=None):
+	items = [
+		QueueItem(source_path=f"clip{i}.mov", output_path=str(tmp_path / f"clip{i}.mp4"), settings=VideoSettings(), duration=1.0)
+		for i in range(count)
+	]
+	for item, priority in zip(items, priorities or []):
+		item.priority = priority
+	return items
+
+
+def _start(batch, items, **kwargs):
+	thread = threading.Thread(target=batch.run, args=(items,), kwargs=kwargs, daemon=True)
+	thread.start()
+	return thread
+
+
+def _wait_for(condition, timeout=5.0):
+	deadline = time.monotonic() + timeout
+	while not condition():
+		assert time.monotonic() < deadline, "timed out"
+		time.sleep(0.01)
+
+
+def test_start_order_follows_priority_then_submission(tmp_path):
+	harness = _Harness()
+	items = _items(tmp_path, 5, [0, 2, 1, 2, 0])
+	harness.open_all(items)
+	BatchRunner(concurrency=1, runner_factory=harness.factory).run(items)
+	assert harness.started == ["clip1.mov", "clip3.mov", "clip2.mov", "clip0.mov", "clip4.mov"]
+
+
+def test_paused_queued_job_waits_for_resume_and_keeps_its_place(tmp_path):
+	harness = _Harness()
+	items = _items(tmp_path, 4)
+	batch = BatchRunner(concurrency=1, runner_factory=harness.factory, on_event=harness.events.append)
+	batch.pause(items[1].job_id)
+	thread = _start(batch, items)
+	harness.open(items[0])
+	harness.open(items[2])
+	_wait_for(lambda: len(harness.started) == 3)
+	assert harness.started == ["clip0.mov", "clip2.mov", "clip3.mov"]
+	batch.resume(items[1].job_id)
+	harness.open_all(items)
+	thread.join(5)
+	assert harness.started[-1] == "clip1.mov"
+	assert all(item.status == JobStatus.DONE for item in items)
+
+
+def test_resumed_job_goes_back_ahead_of_later_jobs(tmp_path):
+	harness = _Harness()
+	items = _items(tmp_path, 4)
+	batch = BatchRunner(concurrency=2, runner_factory=harness.factory)
+	batch.pause(items[1].job_id)
+	thread = _start(batch, items)
+	# The second worker looks past the held job, which leaves the heap until it is resumed
+	_wait_for(lambda: len(harness.started) == 2)
+	assert harness.started == ["clip0.mov", "clip2.mov"]
+	batch.resume(items[1].job_id)
+	harness.open(items[0])
+	_wait_for(lambda: len(harness.started) == 3)
+	harness.open_all(items)
+	thread.join(5)
+	assert harness.started == ["clip0.mov", "clip2.mov", "clip1.mov", "clip3.mov"]
+
+
+def test_cancel_queued_and_running_jobs(tmp_path):
+	harness = _Harness()
+	items = _items(tmp_path, 4)
+	batch = BatchRunner(concurrency=1, runner_factory=harness.factory)
+	thread = _start(batch, items)
+	_wait_for(lambda: harness.started == ["clip0.mov"])
+	batch.cancel(items[2].job_id)
+	harness.open(items[0])
+	_wait_for(lambda: len(harness.started) == 2)
+	batch.cancel()
+	thread.join(5)
+	assert not thread.is_alive()
+	assert harness.started == ["clip0.mov", "clip1.mov"]
+	assert [item.status for item in items] == [JobStatus.DONE, JobStatus.CANCELLED, JobStatus.CANCELLED, JobStatus.CANCELLED]
+	assert harness.terminated == {items[1].job_id: True}
+
+
+def test_cancel_a_paused_queued_job(tmp_path):
+	harness = _Harness()
+	items = _items(tmp_path, 2)
+	batch = BatchRunner(concurrency=1, runner_factory=harness.factory)
+	batch.pause(items[1].job_id)
+	thread = _start(batch, items)
+	harness.open(items[0])
+	_wait_for(lambda: items[0].status == JobStatus.DONE)
+	# Only the held job is left, so the batch waits for it until it is cancelled
+	assert thread.is_alive()
+	batch.cancel(items[1].job_id)
+	thread.join(5)
+	assert not thread.is_alive()
+	assert items[1].status == JobStatus.CANCELLED
+
+
+def test_pause_of_a_running_job_is_reported_only_when_the_runner_took_it(tmp_path):
+	for pausable in (True, False):
+		harness = _Harness(pausable)
+		items = _items(tmp_path, 1)
+		batch = BatchRunner(concurrency=1, runner_factory=harness.factory, on_event=harness.events.append)
+		thread = _start(batch, items)
+		_wait_for(harness.running.is_set)
+		batch.pause(items[0].job_id)
+		assert (items[0].job_id in batch._paused) == pausable
+		assert ("Paused" in harness.statuses(items[0])) == pausable
+		batch.resume(items[0].job_id)
+		harness.open_all(items)
+		thread.join(5)
+		assert items[0].status == JobStatus.DONE
+		assert items[0].job_id not in batch._paused
+
+
+def test_batch_pause_starts_nothing_until_resume(tmp_path):
+	harness = _Harness()
+	items = _items(tmp_path, 3)
+	harness.open_all(items)
+	batch = BatchRunner(concurrency=1, runner_factory=harness.factory)
+	batch.pause()
+	thread = _start(batch, items)
+	time.sleep(0.1)
+	assert harness.started == []
+	batch.resume()
+	thread.join(5)
+	assert len(harness.started) == 3
+
+
+def test_submit_while_open(tmp_path):
+	harness = _Harness()
+	first, late = _items(tmp_path, 2, [0, 5])
+	harness.open_all([first, late])
+	batch = BatchRunner(concurrency=1, runner_factory=harness.factory)
+	thread = _start(batch, [], keep_open=True)
+	batch.submit([first])
+	batch.submit([late])
+	_wait_for(lambda: len(harness.started) == 2)
+	batch.close()
+	thread.join(5)
+	assert not thread.is_alive()
+	assert {item.status for item in (first, late)} == {JobStatus.DONE}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads the process state from /proc")
+def test_loop_runner_holds_a_command_started_while_paused():
+	owner = AsyncFFmpegRunner(sample_interval=0)
+	owner.start()
+	try:
+		runner = owner.runner("job")
+		# Between two passes there is no process to stop; the pause must hold the next one
+		runner.pause()
+		result = {}
+		thread = threading.Thread(target=lambda: result.update(code=runner.run(["sh", "-c", "sleep 0.2"])))
+		thread.start()
+		_wait_for(lambda: "job" in owner._procs)
+		pid = owner._procs["job"].pid
+		_wait_for(lambda: _state(pid) == "T")
+		assert thread.is_alive()
+		runner.resume()
+		thread.join(5)
+		assert result == {"code": 0}
+	finally:
+		owner.stop()
+
+
+def _state(pid: int) -> str:
+	try:
+		with open(f"/proc/{pid}/stat") as f:
+			return f.read().rsplit(")", 1)[1].split()[0]
+	except OSError:
+		return ""
@@ -0,0 +1,92 @@
+"""NVENC jobs run on per-GPU session slots beside the CPU jobs."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+
+from ffmpeg_encoder.core.batch import BatchRunner
+from ffmpeg_encoder.core.ffmpeg_cmd import VideoSettings
+from ffmpeg_encoder.core.gpu import GpuSlots
+from ffmpeg_encoder.core.queue import JobStatus, QueueItem
+
+
+class _Tracker:
+	"""Counts the jobs encoding at once, per GPU and on the CPU."""
+
+	def __init__(self) -> None:
+		self.lock = threading.Lock()
+		self.running: Counter = Counter()
+		self.peak: Counter = Counter()
+		self.commands = {}
+
+	def runner(self, item, on_log):
+		return _SlowRunner(self, item, on_log)
+
+
+class _SlowRunner:
+	def __init__(self, tracker: _Tracker, item: QueueItem, on_log) -> None:
+		self.tracker = tracker
+		self.item = item
+		self.on_log = on_log
+
+	def run(self, cmd) -> int:
+		key = "cpu" if "nvenc" not in self.item.settings.video_codec else f"gpu{self.item.gpu}"
+		with self.tracker.lock:
+			self.tracker.commands[self.item.job_id] = list(cmd)
+			self.tracker.running[key] += 1
+			self.tracker.peak[key] = max(self.tracker.peak[key], self.tracker.running[key])
+			self.tracker.peak["total"] = max(self.tracker.peak["total"], sum(self.tracker.running.values()))
+		time.sleep(0.02)
+		with self.tracker.lock:
+			self.tracker.running[key] -= 1
+		open(cmd[-1], "wb").close()
+		return 0
+
+	def terminate(self) -> None:
+		pass
+
+
+def _items(tmp_path, codec: str, count: int):
+	return [
+		QueueItem(
+			source_path=str(tmp_path / f"{codec}_{i}.mov"),
+			output_path=str(tmp_path / f"{codec}_{i}.mp4"),
+			settings=VideoSettings(video_codec=codec),
+			duration=10.0,
+		)
+		for i in range(count)
+	]
+
+
+def test_nvenc_jobs_share_gpu_sessions_beside_cpu_jobs(tmp_path):
+	tracker = _Tracker()
+	runner = BatchRunner(concurrency=2, runner_factory=tracker.runner, gpu_slots=GpuSlots(sessions_per_device=3, devices=2))
+	cpu = _items(tmp_path, "libx264", 12)
+	gpu = _items(tmp_path, "h264_nvenc", 24)
+
+	items = runner.run(cpu + gpu)
+
+	assert all(item.status == JobStatus.DONE for item in items)
+	# CPU jobs are capped by concurrency, NVENC jobs by the sessions of each GPU
+	assert tracker.peak["cpu"] == 2
+	assert tracker.peak["gpu0"] == 3
+	assert tracker.peak["gpu1"] == 3
+	assert tracker.peak["total"] > 2
+	assert all(item.gpu is None for item in cpu)
+	assert {item.gpu for item in gpu} == {0, 1}
+	for item in gpu:
+		cmd = tracker.commands[item.job_id]
+		assert cmd[cmd.index("-gpu") + 1] == str(item.gpu)
+
+
+def test_single_gpu_leaves_the_device_to_ffmpeg(tmp_path):
+	tracker = _Tracker()
+	runner = BatchRunner(concurrency=1, runner_factory=tracker.runner, gpu_slots=GpuSlots(sessions_per_device=2, devices=1))
+	gpu = _items(tmp_path, "h264_nvenc", 6)
+
+	runner.run(gpu)
+
+	assert all(item.status == JobStatus.DONE for item in gpu)
+	assert tracker.peak["gpuNone"] == 2
+	assert all("-gpu" not in tracker.commands[item.job_id] for item in gpu)
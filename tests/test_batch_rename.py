@@ -0,0 +1,58 @@
+"""Rename planning against the mapping sheet bundled at the repository root."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from ffmpeg_encoder.core.batch_rename import apply_renames, load_mapping, plan_renames
+
+
+MAPPING = Path(__file__).resolve().parent.parent / "test_mapping.xlsx"
+SOURCE = "Final_230308.mov"
+TARGET = "L o o L o.mov"
+
+
+@pytest.fixture
+def mapping():
+	pytest.importorskip("openpyxl")
+	return load_mapping(str(MAPPING))
+
+
+def _touch(folder: Path, *names: str) -> list:
+	paths = []
+	for name in names:
+		(folder / name).write_bytes(b"")
+		paths.append(str(folder / name))
+	return paths
+
+
+def test_mapping_renames_matched_file(mapping, tmp_path):
+	files = _touch(tmp_path, SOURCE, "other.mov")
+	plan = plan_renames(files, mapping.new_name)
+	assert plan.ok
+	assert plan.unmatched == [str(tmp_path / "other.mov")]
+	apply_renames(plan)
+	assert sorted(p.name for p in tmp_path.iterdir()) == sorted([TARGET, "other.mov"])
+
+
+def test_unmatched_file_on_target_is_a_collision(mapping, tmp_path):
+	# The file already named like the target is not in the sheet, so it stays where it is
+	files = _touch(tmp_path, SOURCE, TARGET)
+	plan = plan_renames(files, mapping.new_name)
+	assert not plan.ok
+	assert plan.problems == [f"{SOURCE}: {TARGET} already exists"]
+	assert plan.unmatched == [str(tmp_path / TARGET)]
+	assert (tmp_path / SOURCE).exists()
+
+
+def test_target_freed_by_another_rename_is_not_a_collision(mapping, tmp_path):
+	files = _touch(tmp_path, SOURCE, TARGET)
+
+	def new_name(path):
+		return "moved.mov" if Path(path).name == TARGET else mapping.new_name(path)
+
+	plan = plan_renames(files, new_name)
+	assert plan.ok
+	apply_renames(plan)
+	assert sorted(p.name for p in tmp_path.iterdir()) == sorted([TARGET, "moved.mov"])
@@ -0,0 +1,131 @@
+"""Output size estimates and the per-volume space and writer budget."""
+from __future__ import annotations
+
+import os
+from collections import namedtuple
+
+import pytest
+
+from ffmpeg_encoder.core import disk
+from ffmpeg_encoder.core.disk import DiskBudget, estimate_output_bytes
+from ffmpeg_encoder.core.ffmpeg_cmd import VideoSettings
+from ffmpeg_encoder.core.queue import QueueItem
+
+
+Usage = namedtuple("Usage", "total used free")
+GB = 1024 ** 3
+PROBE_1080P = {"streams": [{"codec_type": "video", "width": 1920, "height": 1080, "avg_frame_rate": "25/1"}]}
+
+
+def test_estimate_needs_a_duration():
+	assert estimate_output_bytes(VideoSettings(), None) == 0
+
+
+def test_estimate_from_bitrate():
+	s = VideoSettings(crf=None, bitrate="8M", audio_bitrate="192k")
+	assert estimate_output_bytes(s, 100.0) == (8_000_000 + 192_000) * 100 // 8
+
+
+def test_estimate_target_size_and_size_cap():
+	assert estimate_output_bytes(VideoSettings(target_size="700M"), 60.0) == 700_000_000
+	capped = VideoSettings(crf=None, bitrate="50M", max_filesize="10M")
+	assert estimate_output_bytes(capped, 600.0) == 10_000_000
+
+
+def test_estimate_crf_halves_every_six_steps():
+	high = estimate_output_bytes(VideoSettings(crf=18, audio_codec="", audio_bitrate=None), 60.0, PROBE_1080P)
+	low = estimate_output_bytes(VideoSettings(crf=24, audio_codec="", audio_bitrate=None), 60.0, PROBE_1080P)
+	assert low == pytest.approx(high / 2, rel=0.01)
+	assert high == pytest.approx(1920 * 1080 * 25 * disk.BITS_PER_PIXEL["libx264"] * 60 / 8, rel=0.01)
+
+
+@pytest.fixture
+def volumes(monkeypatch):
+	"""Folders named vol_a, vol_b... are separate fake volumes."""
+
+	def device_of(path):
+		folder = os.path.dirname(os.path.abspath(path))
+		return hash(os.path.basename(folder)), folder
+
+	monkeypatch.setattr(disk, "device_of", device_of)
+	free = {}
+	return free, lambda folder: Usage(100 * GB, 0, free.get(os.path.basename(folder), 100 * GB))
+
+
+def _item(folder, name="clip", gb=1.0):
+	# An 8 Mbit/s encode of `gb` GB before the margin
+	seconds = gb * GB * 8 / 8_000_000
+	return QueueItem(
+		source_path=f"/src/{name}.mov",
+		output_path=f"/{folder}/{name}.mp4",
+		settings=VideoSettings(crf=None, bitrate="8M", audio_codec="", audio_bitrate=None),
+		duration=seconds,
+	)
+
+
+def test_pick_starts_in_queue_order_and_reserves(volumes):
+	free, usage = volumes
+	free["vol_a"] = int(3.5 * GB + disk.MIN_FREE_BYTES)
+	budget = DiskBudget(usage=usage)
+	items = [_item("vol_a", f"c{i}") for i in range(3)]
+	admission = budget.pick(items)
+	assert admission.index == 0 and admission.error is None
+	budget.acquire(items[0])
+	budget.acquire(items[1])
+	# 2 x 1.2 GB reserved, 3.5 GB free: the third no longer fits and waits for a running job
+	admission = budget.pick(items[2:])
+	assert admission.index is None
+	assert admission.waiting == [0]
+	budget.release(items[0])
+	assert budget.pick(items[2:]).index == 0
+
+
+def test_pick_fails_a_job_that_can_never_fit(volumes):
+	free, usage = volumes
+	free["vol_a"] = disk.MIN_FREE_BYTES + GB // 2
+	admission = DiskBudget(usage=usage).pick([_item("vol_a")])
+	assert admission.index == 0
+	assert "Not enough space" in admission.error
+
+
+def test_pick_skips_a_full_volume_for_another(volumes):
+	free, usage = volumes
+	budget = DiskBudget(writers_per_device=1, usage=usage)
+	busy, waiting, other = _item("vol_a", "busy"), _item("vol_a", "waiting"), _item("vol_b", "other")
+	budget.acquire(busy)
+	admission = budget.pick([waiting, other])
+	assert admission.index == 1
+	assert admission.waiting == [0]
+
+
+def test_pick_and_acquire_use_the_path_the_job_writes(volumes):
+	free, usage = volumes
+	budget = DiskBudget(writers_per_device=1, usage=usage)
+	budget.acquire(_item("vol_a", "busy"))
+	staged = _item("vol_a", "staged")
+	scratch = lambda item: f"/vol_scratch/{os.path.basename(item.output_path)}"
+	# vol_a has no free writer, but the staged job writes to scratch
+	assert budget.pick([staged], scratch).index == 0
+	budget.acquire(staged, scratch(staged))
+	assert budget.pick([_item("vol_scratch", "next")]).waiting == [0]
+
+
+def test_redirect_moves_the_reservation(volumes):
+	free, usage = volumes
+	budget = DiskBudget(writers_per_device=1, usage=usage)
+	item = _item("vol_a")
+	budget.acquire(item, "/vol_scratch/clip.mp4")
+	budget.redirect(item, item.output_path)
+	assert budget.pick([_item("vol_scratch", "next")]).index == 0
+	assert budget.pick([_item("vol_a", "next")]).waiting == [0]
+	budget.release(item)
+	assert budget.pick([_item("vol_a", "next")]).index == 0
+	assert all(v.writers == 0 and v.reserved == 0 for v in budget._volumes.values())
+
+
+def test_unknown_duration_reserves_nothing(volumes):
+	free, usage = volumes
+	free["vol_a"] = 0
+	item = _item("vol_a")
+	item.duration = None
+	assert DiskBudget(usage=usage).pick([item]).index == 0
@@ -0,0 +1,106 @@
+"""Which failed manager requests are sent again, and how long the client waits."""
+from __future__ import annotations
+
+import pytest
+import requests
+
+from ffmpeg_encoder.core.retry import RetryPolicy
+from ffmpeg_encoder.integrations import flamenco_client
+from ffmpeg_encoder.integrations.flamenco_client import (
+	FlamencoClient,
+	FlamencoConfig,
+	classify_request_error,
+	retry_after_seconds,
+)
+
+
+def _response(code: int, headers=None) -> requests.Response:
+	r = requests.Response()
+	r.status_code = code
+	r.headers.update(headers or {})
+	r._content = b"{}"
+	return r
+
+
+def _http_error(code: int, headers=None) -> requests.HTTPError:
+	return requests.HTTPError(f"{code}", response=_response(code, headers))
+
+
+@pytest.mark.parametrize("code", [500, 502, 504, 408])
+def test_post_is_not_resent_after_a_5xx_that_may_have_created_the_job(code):
+	assert classify_request_error(_http_error(code), idempotent=True).retryable
+	assert not classify_request_error(_http_error(code), idempotent=False).retryable
+
+
+@pytest.mark.parametrize("code", [429, 503])
+def test_unprocessed_answers_are_resent_for_any_method(code):
+	assert classify_request_error(_http_error(code), idempotent=False).retryable
+
+
+def test_client_errors_are_final():
+	failure = classify_request_error(_http_error(400))
+	assert not failure.retryable
+	assert "400" in failure.reason
+
+
+def test_connection_failures_are_resent_but_read_timeouts_only_when_idempotent():
+	assert classify_request_error(requests.ConnectionError("refused"), idempotent=False).retryable
+	assert classify_request_error(requests.ConnectTimeout("slow"), idempotent=False).retryable
+	assert not classify_request_error(requests.ReadTimeout("sent"), idempotent=False).retryable
+	assert classify_request_error(requests.ReadTimeout("sent"), idempotent=True).retryable
+
+
+def test_retry_after_header():
+	assert retry_after_seconds(_response(429, {"Retry-After": "7"})) == 7.0
+	assert retry_after_seconds(_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+	assert retry_after_seconds(_response(429)) is None
+	assert retry_after_seconds(_response(429, {"Retry-After": "soon"})) is None
+
+
+class _Session:
+	def __init__(self, answers) -> None:
+		self.answers = list(answers)
+		self.calls = []
+		self.headers = {}
+
+	def request(self, method, url, **kwargs):
+		self.calls.append(method)
+		answer = self.answers.pop(0)
+		if isinstance(answer, Exception):
+			raise answer
+		return answer
+
+
+def _client(monkeypatch, answers):
+	sleeps = []
+	monkeypatch.setattr(flamenco_client.time, "sleep", sleeps.append)
+	client = FlamencoClient(FlamencoConfig("http://manager", "token"), RetryPolicy(max_attempts=4, base_delay=1))
+	client.session = _Session(answers)
+	return client, sleeps
+
+
+def test_post_with_502_is_sent_once(monkeypatch):
+	client, sleeps = _client(monkeypatch, [_response(502), _response(200)])
+	with pytest.raises(requests.HTTPError):
+		client._request("POST", "/api/v3/jobs")
+	assert client.session.calls == ["POST"]
+	assert sleeps == []
+
+
+def test_get_with_502_is_retried(monkeypatch):
+	client, sleeps = _client(monkeypatch, [_response(502), _response(200)])
+	assert client._request("GET", "/api/v3/jobs/1").status_code == 200
+	assert len(sleeps) == 1
+
+
+def test_post_honours_retry_after_on_429(monkeypatch):
+	client, sleeps = _client(monkeypatch, [_response(429, {"Retry-After": "12"}), _response(200)])
+	assert client._request("POST", "/api/v3/jobs").status_code == 200
+	assert client.session.calls == ["POST", "POST"]
+	assert sleeps == [12.0]
+
+
+def test_post_after_connection_failure_is_resent(monkeypatch):
+	client, sleeps = _client(monkeypatch, [requests.ConnectionError("refused"), _response(200)])
+	assert client._request("POST", "/api/v3/jobs").status_code == 200
+	assert client.session.calls == ["POST", "POST"]
@@ -0,0 +1,86 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from ffmpeg_encoder.utils import instance
+from ffmpeg_encoder.utils.instance import CommandServer, InstanceLock, send_command
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="uses a Unix socket under the instance folder")
+
+
+@pytest.fixture
+def instance_dir(tmp_path, monkeypatch):
+	monkeypatch.setattr(instance, "INSTANCE_DIR", tmp_path)
+	monkeypatch.setattr(instance, "KEY_PATH", tmp_path / "instance.key")
+	return tmp_path
+
+
+@pytest.fixture
+def server(instance_dir):
+	received = []
+
+	def handler(message):
+		received.append(message)
+		return {"ok": True, "queued": len(message.get("paths", []))}
+
+	srv = CommandServer(handler)
+	srv.start()
+	srv.received = received
+	yield srv
+	srv.stop()
+
+
+def test_second_lock_fails_until_the_first_is_released(instance_dir):
+	path = instance_dir / "instance.lock"
+	first, second = InstanceLock(path), InstanceLock(path)
+	assert first.acquire()
+	assert not second.acquire()
+	first.release()
+	assert second.acquire()
+	second.release()
+
+
+def test_authkey_is_created_once_and_never_empty(instance_dir):
+	keys = []
+	threads = [threading.Thread(target=lambda: keys.append(instance._authkey())) for _ in range(8)]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	assert len(set(keys)) == 1
+	assert len(keys[0]) == 32
+	assert sorted(p.name for p in instance_dir.iterdir()) == ["instance.key"]
+
+
+def test_enqueue_round_trip(server):
+	reply = send_command({"command": "enqueue", "paths": ["/a.mp4", "/b.mp4"], "priority": 1})
+	assert reply == {"ok": True, "queued": 2}
+	assert server.received == [{"command": "enqueue", "paths": ["/a.mp4", "/b.mp4"], "priority": 1}]
+
+
+def test_handler_error_is_returned(instance_dir):
+	def handler(message):
+		raise ValueError("unknown command")
+
+	srv = CommandServer(handler)
+	srv.start()
+	try:
+		assert send_command({"command": "nope"}) == {"ok": False, "error": "unknown command"}
+	finally:
+		srv.stop()
+
+
+def test_silent_client_does_not_block_later_launches(server):
+	address, _family = instance._address()
+	silent = socket.socket(socket.AF_UNIX)
+	silent.connect(address)
+	try:
+		assert send_command({"command": "enqueue", "paths": []}, timeout=1.0) == {"ok": True, "queued": 0}
+	finally:
+		silent.close()
+
+
+def test_no_running_app(instance_dir):
+	assert send_command({"command": "enqueue"}, timeout=0.2) is None
@@ -0,0 +1,96 @@
+import os
+from array import array
+
+import pytest
+
+from ffmpeg_encoder.core import keyframes
+from ffmpeg_encoder.core.keyframes import KeyframeIndex, index_path, load_index, read_index, save_index
+
+
+def _index(keyframe_times, scenes=(), scene_threshold=None):
+	return KeyframeIndex(array("d", keyframe_times), array("d", scenes), scene_threshold=scene_threshold)
+
+
+def test_splits_on_latest_keyframe_before_each_target():
+	index = _index(range(0, 60, 3))
+	assert index.chunk_boundaries(10, 60) == [9, 18, 27, 36, 45]
+
+
+def test_skips_targets_without_a_usable_keyframe():
+	assert _index([0, 30]).chunk_boundaries(10, 60) == [30]
+	assert _index([0]).chunk_boundaries(10, 60) == []
+
+
+def test_prefers_a_scene_cut_on_a_keyframe():
+	index = _index(range(0, 60, 2), scenes=[8.01], scene_threshold=0.4)
+	assert index.chunk_boundaries(10, 60)[:2] == [8, 18]
+
+
+def test_ignores_a_scene_cut_off_keyframe():
+	index = _index(range(0, 60, 2), scenes=[9.0], scene_threshold=0.4)
+	assert index.chunk_boundaries(10, 60)[:2] == [10, 20]
+
+
+@pytest.mark.parametrize("duration, min_seconds, expected", [
+	(53, None, [10, 20, 30, 40]),
+	(56, None, [10, 20, 30, 40, 50]),
+	(56, 8, [10, 20, 30, 40]),
+])
+def test_last_chunk_is_never_too_short(duration, min_seconds, expected):
+	boundaries = _index(range(0, 60)).chunk_boundaries(10, duration, min_seconds)
+	assert boundaries == expected
+	assert duration - boundaries[-1] >= (5 if min_seconds is None else min_seconds)
+
+
+def test_rejects_non_positive_chunk():
+	with pytest.raises(ValueError):
+		_index([0]).chunk_boundaries(0, 60)
+
+
+@pytest.fixture
+def source(tmp_path):
+	path = tmp_path / "clip.mp4"
+	path.write_bytes(b"video")
+	return str(path)
+
+
+def test_saved_index_reads_back(source, tmp_path):
+	index = _index([0, 2.5, 5], scenes=[2.5], scene_threshold=0.4)
+	save_index(source, index, index_dir=tmp_path / "idx")
+	loaded = read_index(source, index_dir=tmp_path / "idx")
+	assert loaded == index
+	# A request without scenes can use an index that has them
+	assert read_index(source, scene_threshold=0.4, index_dir=tmp_path / "idx") == index
+
+
+def test_stale_or_mismatched_index_is_ignored(source, tmp_path):
+	save_index(source, _index([0, 2], scene_threshold=0.4), index_dir=tmp_path / "idx")
+	assert read_index(source, method="frames", index_dir=tmp_path / "idx") is None
+	assert read_index(source, scene_threshold=0.3, index_dir=tmp_path / "idx") is None
+	with open(source, "ab") as f:
+		f.write(b"more")
+	assert read_index(source, index_dir=tmp_path / "idx") is None
+
+
+def test_corrupt_index_is_ignored(source, tmp_path):
+	target = save_index(source, _index([0, 2, 4]), index_dir=tmp_path / "idx")
+	data = target.read_bytes()
+	target.write_bytes(data[:-4])
+	assert read_index(source, index_dir=tmp_path / "idx") is None
+	target.write_bytes(b"nope\n" + data)
+	assert read_index(source, index_dir=tmp_path / "idx") is None
+
+
+def test_load_index_scans_once(source, tmp_path, monkeypatch):
+	scans = []
+
+	def build(path, scene_threshold=None, method="packets"):
+		scans.append(path)
+		return _index([0, 4, 8], scene_threshold=scene_threshold)
+
+	monkeypatch.setattr(keyframes, "build_index", build)
+	first = load_index(source, index_dir=tmp_path / "idx")
+	second = load_index(source, index_dir=tmp_path / "idx")
+	assert first == second
+	assert scans == [source]
+	assert os.path.exists(index_path(source, tmp_path / "idx"))
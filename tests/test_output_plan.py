@@ -0,0 +1,143 @@
+"""Output path planning and atomic writes of finished encodes."""
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from ffmpeg_encoder.core.ffmpeg_cmd import VideoSettings
+from ffmpeg_encoder.core.output_plan import PARTIAL_MARKER, OutputPlanner, temp_output_path, writes_atomically
+from ffmpeg_encoder.core.pipeline import CANCELLED, encode_item
+from ffmpeg_encoder.core.queue import JobStatus, QueueItem
+
+
+def test_two_jobs_asking_for_one_path_get_different_names(tmp_path):
+	planner = OutputPlanner("Overwrite")
+	target = str(tmp_path / "clip.mp4")
+	first = planner.reserve(target)
+	second = planner.reserve(target)
+	third = planner.reserve(os.path.join(str(tmp_path), ".", "clip.mp4"))
+	assert first == target
+	assert second == str(tmp_path / "clip_1.mp4")
+	assert third == str(tmp_path / "clip_2.mp4")
+	assert second in planner
+
+
+def test_batch_suffix_skips_names_taken_on_disk(tmp_path):
+	(tmp_path / "clip_1.mp4").write_bytes(b"old")
+	planner = OutputPlanner("Overwrite")
+	planner.reserve(str(tmp_path / "clip.mp4"))
+	assert planner.reserve(str(tmp_path / "clip.mp4")) == str(tmp_path / "clip_2.mp4")
+
+
+@pytest.mark.parametrize("policy, expected", [
+	("Overwrite", "clip.mp4"),
+	("Skip", None),
+	("Rename", "clip_1.mp4"),
+])
+def test_policy_for_an_existing_file(tmp_path, policy, expected):
+	(tmp_path / "clip.mp4").write_bytes(b"old")
+	path = OutputPlanner(policy).reserve(str(tmp_path / "clip.mp4"))
+	assert path == (None if expected is None else str(tmp_path / expected))
+
+
+def test_ask_policy_uses_the_answer_and_defaults_to_skip(tmp_path):
+	(tmp_path / "clip.mp4").write_bytes(b"old")
+	asked = []
+	planner = OutputPlanner("Ask", ask=lambda path: asked.append(path) or "Rename")
+	assert planner.reserve(str(tmp_path / "clip.mp4")) == str(tmp_path / "clip_1.mp4")
+	assert asked == [str(tmp_path / "clip.mp4")]
+	assert OutputPlanner("Ask").reserve(str(tmp_path / "clip.mp4")) is None
+	assert OutputPlanner("Ask", ask=lambda path: "nonsense").reserve(str(tmp_path / "clip.mp4")) is None
+
+
+def test_policy_leaves_new_paths_alone(tmp_path):
+	for policy in ("Ask", "Overwrite", "Skip", "Rename"):
+		assert OutputPlanner(policy, ask=lambda path: "Skip").reserve(str(tmp_path / "new.mp4")) == str(tmp_path / "new.mp4")
+
+
+def test_unknown_policy():
+	with pytest.raises(ValueError):
+		OutputPlanner("Sometimes")
+
+
+def test_release_frees_the_name(tmp_path):
+	planner = OutputPlanner()
+	path = planner.reserve(str(tmp_path / "clip.mp4"))
+	planner.release(path)
+	assert planner.reserve(str(tmp_path / "clip.mp4")) == path
+
+
+def _item(tmp_path, name="out.mp4"):
+	return QueueItem(
+		source_path=str(tmp_path / "in.mov"),
+		output_path=str(tmp_path / name),
+		settings=VideoSettings(),
+		duration=10.0,
+	)
+
+
+def _leftovers(tmp_path):
+	return [p.name for p in tmp_path.iterdir() if PARTIAL_MARKER in p.name]
+
+
+def test_successful_encode_is_renamed_into_place(tmp_path, scripted_runner):
+	item = _item(tmp_path)
+	runner = scripted_runner()
+	assert encode_item(item, runner) == 0
+	assert runner.commands[0][-1] == temp_output_path(item.output_path, item.job_id)
+	assert (tmp_path / "out.mp4").read_bytes() == b"encoded"
+	assert item.output_path == str(tmp_path / "out.mp4")
+	assert _leftovers(tmp_path) == []
+
+
+class _FailingRunner:
+	"""Writes part of the output, then fails, as an ffmpeg that died mid-encode would."""
+
+	def __init__(self, code: int = 1) -> None:
+		self.code = code
+		self.on_log = lambda line: None
+
+	def run(self, cmd):
+		with open(cmd[-1], "wb") as f:
+			f.write(b"half")
+		return self.code
+
+	def terminate(self) -> None:
+		pass
+
+
+def test_failed_encode_leaves_no_file(tmp_path):
+	item = _item(tmp_path)
+	assert encode_item(item, _FailingRunner()) == 1
+	assert item.status == JobStatus.FAILED
+	assert not (tmp_path / "out.mp4").exists()
+	assert _leftovers(tmp_path) == []
+
+
+def test_failed_encode_keeps_an_existing_output(tmp_path):
+	(tmp_path / "out.mp4").write_bytes(b"old")
+	encode_item(_item(tmp_path), _FailingRunner())
+	assert (tmp_path / "out.mp4").read_bytes() == b"old"
+	assert _leftovers(tmp_path) == []
+
+
+def test_cancelled_encode_leaves_no_file(tmp_path):
+	item = _item(tmp_path)
+	runner = _FailingRunner(code=255)
+	ran = []
+	original = runner.run
+	runner.run = lambda cmd: ran.append(cmd) or original(cmd)
+	assert encode_item(item, runner, cancelled=lambda: bool(ran)) == CANCELLED
+	assert item.status == JobStatus.CANCELLED
+	assert not (tmp_path / "out.mp4").exists()
+	assert _leftovers(tmp_path) == []
+
+
+def test_pattern_outputs_are_written_directly(tmp_path, scripted_runner):
+	item = _item(tmp_path, "frame_%03d.png")
+	assert not writes_atomically(item.output_path)
+	runner = scripted_runner()
+	assert encode_item(item, runner) == 0
+	assert runner.commands[0][-1] == str(tmp_path / "frame_%03d.png")
+	assert item.output_path == str(tmp_path / "frame_%03d.png")
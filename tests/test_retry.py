@@ -0,0 +1,140 @@
+"""Failure classification and the attempt accounting of encode_with_retry."""
+from __future__ import annotations
+
+import pytest
+
+from ffmpeg_encoder.core import pipeline
+from ffmpeg_encoder.core.ffmpeg_cmd import VideoSettings
+from ffmpeg_encoder.core.queue import JobStatus, QueueItem
+from ffmpeg_encoder.core.retry import (
+	GPU_BUSY,
+	GPU_UNAVAILABLE,
+	INPUT,
+	IO_ERROR,
+	OUT_OF_MEMORY,
+	SETTINGS,
+	UNKNOWN,
+	VERIFY,
+	RetryPolicy,
+	classify_failure,
+	cpu_fallback,
+)
+
+
+@pytest.mark.parametrize("lines, kind, retryable", [
+	# ffmpeg follows the real error with generic ones; the specific cause must win
+	(["[h264_nvenc @ 0x1] OpenEncodeSessionEx failed: out of memory (10)",
+	  "Error initializing output stream 0:0 -- Error while opening encoder",
+	  "Conversion failed!"], GPU_BUSY, True),
+	(["[h264_nvenc @ 0x1] Cannot load libnvidia-encode.so.1",
+	  "Error initializing output stream 0:0"], GPU_UNAVAILABLE, False),
+	(["av_interleaved_write_frame(): Input/output error",
+	  "Error writing trailer: Invalid argument"], IO_ERROR, True),
+	(["clip.mov: No such file or directory"], INPUT, False),
+	(["Unrecognized option 'bogus'.", "Error splitting the argument list: Option not found"], SETTINGS, False),
+	(["x264 [error]: malloc of size 1 failed", "Cannot allocate memory"], OUT_OF_MEMORY, True),
+])
+def test_classify_failure_ranks_specific_causes_first(lines, kind, retryable):
+	failure = classify_failure(1, lines)
+	assert failure.kind == kind
+	assert failure.retryable == retryable
+
+
+def test_classify_failure_from_exit_code():
+	assert classify_failure(137).kind == OUT_OF_MEMORY
+	assert classify_failure(-9).retryable
+	assert classify_failure(pipeline.VERIFY_FAILED).kind == VERIFY
+	assert classify_failure(1, ["something odd"]).kind == UNKNOWN
+	assert not classify_failure(1).retryable
+
+
+def test_cpu_fallback_only_for_nvenc():
+	assert cpu_fallback(VideoSettings(video_codec="hevc_nvenc")).video_codec == "libx265"
+	assert cpu_fallback(VideoSettings(video_codec="libx264")) is None
+
+
+IO_LINES = ["av_interleaved_write_frame(): Input/output error"]
+NO_GPU_LINES = ["No NVENC capable devices found"]
+BAD_LINES = ["Unrecognized option 'bogus'."]
+
+
+def _item(tmp_path, codec="libx264"):
+	return QueueItem(
+		source_path=str(tmp_path / "in.mov"),
+		output_path=str(tmp_path / "out.mp4"),
+		settings=VideoSettings(video_codec=codec),
+		duration=10.0,
+	)
+
+
+def _run(item, runner, policy):
+	return pipeline.encode_with_retry(item, runner, policy, sleep=lambda seconds: None)
+
+
+def test_transient_failure_is_retried_until_the_budget_is_spent(tmp_path, scripted_runner):
+	item = _item(tmp_path)
+	runner = scripted_runner([(1, IO_LINES)] * 5)
+	code = _run(item, runner, RetryPolicy(max_attempts=3, base_delay=0))
+	assert code == 1
+	assert item.attempts == 3
+	assert len(runner.commands) == 3
+	assert item.status == JobStatus.FAILED
+	assert "after 3 attempts" in item.message
+
+
+def test_transient_failure_then_success(tmp_path, scripted_runner):
+	item = _item(tmp_path)
+	code = _run(item, scripted_runner([(1, IO_LINES), (0, ())]), RetryPolicy(max_attempts=3, base_delay=0))
+	assert code == 0
+	assert item.attempts == 2
+	assert item.status == JobStatus.DONE
+
+
+def test_permanent_failure_is_not_retried(tmp_path, scripted_runner):
+	item = _item(tmp_path)
+	runner = scripted_runner([(1, BAD_LINES)] * 3)
+	assert _run(item, runner, RetryPolicy(max_attempts=3, base_delay=0)) == 1
+	assert item.attempts == 1
+	assert item.message.startswith("Invalid encoder settings")
+
+
+def test_cpu_fallback_runs_without_retries(tmp_path, scripted_runner):
+	item = _item(tmp_path, "h264_nvenc")
+	runner = scripted_runner([(1, NO_GPU_LINES), (0, ())])
+	code = _run(item, runner, RetryPolicy(max_attempts=1, gpu_fallback=True))
+	assert code == 0
+	assert item.attempts == 2
+	assert runner.commands[0][runner.commands[0].index("-c:v") + 1] == "h264_nvenc"
+	assert runner.commands[1][runner.commands[1].index("-c:v") + 1] == "libx264"
+
+
+def test_cpu_fallback_does_not_use_up_the_retry_budget(tmp_path, scripted_runner):
+	item = _item(tmp_path, "h264_nvenc")
+	# GPU missing, then two transient CPU failures: the fallback plus max_attempts=3 runs
+	runner = scripted_runner([(1, NO_GPU_LINES), (1, IO_LINES), (1, IO_LINES), (0, ())])
+	code = _run(item, runner, RetryPolicy(max_attempts=3, base_delay=0, gpu_fallback=True))
+	assert code == 0
+	assert item.attempts == 4
+
+
+def test_gpu_failure_without_fallback_fails(tmp_path, scripted_runner):
+	item = _item(tmp_path, "h264_nvenc")
+	code = _run(item, scripted_runner([(1, NO_GPU_LINES)]), RetryPolicy(max_attempts=3, base_delay=0))
+	assert code == 1
+	assert item.attempts == 1
+
+
+def test_cancel_during_backoff(tmp_path, scripted_runner):
+	item = _item(tmp_path)
+	calls = []
+
+	def cancelled():
+		calls.append(True)
+		return len(calls) > 3
+
+	code = pipeline.encode_with_retry(
+		item, scripted_runner([(1, IO_LINES)] * 3), RetryPolicy(max_attempts=3, base_delay=5),
+		cancelled=cancelled, sleep=lambda seconds: None,
+	)
+	assert code == pipeline.CANCELLED
+	assert item.status == JobStatus.CANCELLED
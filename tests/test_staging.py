@@ -0,0 +1,21 @@
+import os
+
+from ffmpeg_encoder.core.staging import Stager
+
+
+def test_finished_moves_are_not_kept(tmp_path):
+	stager = Stager(str(tmp_path / "scratch"), stage_all=True)
+	os.makedirs(stager.root, exist_ok=True)
+	errors = []
+	try:
+		for i in range(20):
+			local = os.path.join(stager.root, f"clip{i}.mkv")
+			with open(local, "wb") as f:
+				f.write(b"x" * 10)
+			stager.move_back(local, str(tmp_path / f"clip{i}.mkv"), f"job{i}", errors.append)
+		stager.drain()
+		assert errors == [None] * 20
+		assert not stager._moves
+		assert sorted(os.listdir(tmp_path)) == sorted(["scratch"] + [f"clip{i}.mkv" for i in range(20)])
+	finally:
+		stager.close()
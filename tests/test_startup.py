@@ -0,0 +1,10 @@
+import pytest
+
+from ffmpeg_encoder.utils.startup import STARTUP_MODULE, check_startup
+
+
+@pytest.mark.parametrize("module", ["ffmpeg_encoder.cli", STARTUP_MODULE])
+def test_imports_within_budget(module):
+	if module.startswith("ffmpeg_encoder.ui"):
+		pytest.importorskip("PySide6")
+	assert check_startup(module) == []
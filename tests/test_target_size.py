@@ -0,0 +1,94 @@
+"""Bitrate budgeting and the one-shot size correction of target-size mode."""
+from __future__ import annotations
+
+import pytest
+
+from ffmpeg_encoder.core.ffmpeg_cmd import VideoSettings, build_ffmpeg_commands, parse_bitrate
+from ffmpeg_encoder.core.target_size import (
+	CONTAINER_OVERHEAD,
+	MIN_VIDEO_BITRATE,
+	TARGET_SIZE_TOLERANCE,
+	apply_target_size,
+	parse_size,
+	size_correction,
+	target_video_bitrate,
+)
+
+
+def test_parse_size_units():
+	assert parse_size("700M") == 700_000_000
+	assert parse_size("650MiB") == 650 * 1024 ** 2
+	assert parse_size("1.5G") == 1_500_000_000
+	assert parse_size("lots") is None
+
+
+def test_target_video_bitrate_leaves_room_for_audio_and_container():
+	bitrate = target_video_bitrate(100_000_000, 100.0, "192k")
+	assert bitrate == int(100_000_000 * 8 * (1 - CONTAINER_OVERHEAD) / 100.0) - 192_000
+
+
+def test_target_video_bitrate_rejects_impossible_targets():
+	with pytest.raises(ValueError):
+		target_video_bitrate(1_000, 100.0, "192k")
+	with pytest.raises(ValueError):
+		target_video_bitrate(100_000_000, 0.0, None)
+
+
+def test_apply_target_size_switches_to_two_pass_bitrate():
+	s = VideoSettings(crf=20, target_size="100M", audio_bitrate="192k", max_filesize="200M")
+	applied = apply_target_size("clip.mov", s, duration=100.0)
+	assert applied.crf is None
+	assert applied.two_pass
+	assert applied.max_filesize is None
+	assert parse_bitrate(applied.bitrate) == pytest.approx(target_video_bitrate(100_000_000, 100.0, "192k"), abs=1_000)
+
+
+def test_apply_target_size_nvenc_uses_multipass():
+	s = VideoSettings(video_codec="h264_nvenc", target_size="100M")
+	cmds = build_ffmpeg_commands("in.mov", "out.mp4", apply_target_size("in.mov", s, duration=100.0))
+	assert len(cmds) == 1
+	assert "-multipass" in cmds[0]
+
+
+def test_apply_target_size_needs_duration_and_valid_size():
+	with pytest.raises(ValueError):
+		apply_target_size("clip.mov", VideoSettings(target_size="huge"), duration=10.0)
+	with pytest.raises(ValueError):
+		apply_target_size("clip.mov", VideoSettings(target_size="100M"), duration=0.0)
+
+
+def _output(tmp_path, size: int) -> str:
+	path = tmp_path / "out.mp4"
+	path.write_bytes(b"\0" * size)
+	return str(path)
+
+
+def test_size_correction_accepts_the_tolerance_band(tmp_path):
+	s = VideoSettings(target_size="100k", bitrate="800k")
+	assert size_correction(s, _output(tmp_path, 100_000), 1.0) is None
+	assert size_correction(s, _output(tmp_path, int(100_000 * (1 - TARGET_SIZE_TOLERANCE))), 1.0) is None
+
+
+def test_size_correction_lowers_bitrate_on_overshoot(tmp_path):
+	s = VideoSettings(target_size="100k", bitrate="800k")
+	corrected = size_correction(s, _output(tmp_path, 100_001), 1.0)
+	assert corrected is not None
+	assert parse_bitrate(corrected.bitrate) < 800_000
+
+
+def test_size_correction_raises_bitrate_on_undershoot(tmp_path):
+	s = VideoSettings(target_size="100k", bitrate="800k")
+	corrected = size_correction(s, _output(tmp_path, 50_000), 1.0)
+	assert corrected is not None
+	assert parse_bitrate(corrected.bitrate) > 800_000
+
+
+def test_size_correction_never_goes_below_minimum(tmp_path):
+	s = VideoSettings(target_size="1k", bitrate="60k")
+	corrected = size_correction(s, _output(tmp_path, 1_000_000), 1.0)
+	assert parse_bitrate(corrected.bitrate) >= MIN_VIDEO_BITRATE
+
+
+def test_size_correction_without_target_or_output(tmp_path):
+	assert size_correction(VideoSettings(bitrate="800k"), _output(tmp_path, 10), 1.0) is None
+	assert size_correction(VideoSettings(target_size="100k", bitrate="800k"), str(tmp_path / "missing.mp4"), 1.0) is None
@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from ffmpeg_encoder.core.watch import FolderWatcher, WatchFolder
+
+
+def _wait_for(predicate, timeout=5.0):
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		if predicate():
+			return True
+		time.sleep(0.02)
+	return predicate()
+
+
+@pytest.fixture
+def reported():
+	paths = []
+	lock = threading.Lock()
+
+	def on_ready(path, folder):
+		with lock:
+			paths.append(path)
+
+	on_ready.paths = paths
+	return on_ready
+
+
+def test_file_is_reported_once_it_stops_growing(tmp_path, reported):
+	clip = tmp_path / "clip.mp4"
+	clip.write_bytes(b"x")
+	watcher = FolderWatcher([WatchFolder(str(tmp_path))], reported, settle=0.3, poll_interval=0.05, use_inotify=False)
+	watcher.start()
+	try:
+		# Still being copied: every write restarts the settle time
+		for _ in range(6):
+			time.sleep(0.1)
+			with open(clip, "ab") as f:
+				f.write(b"x")
+		assert reported.paths == []
+		assert _wait_for(lambda: reported.paths == [str(clip)])
+		time.sleep(0.3)
+		assert reported.paths == [str(clip)]
+	finally:
+		watcher.stop()
+
+
+def test_skips_empty_dot_and_non_video_files(tmp_path, reported):
+	(tmp_path / "empty.mp4").write_bytes(b"")
+	(tmp_path / ".clip.mp4.partial").write_bytes(b"x")
+	(tmp_path / "notes.txt").write_bytes(b"x")
+	(tmp_path / "clip.mkv").write_bytes(b"x")
+	watcher = FolderWatcher([WatchFolder(str(tmp_path))], reported, settle=0.1, poll_interval=0.05, use_inotify=False)
+	watcher.start()
+	try:
+		assert _wait_for(lambda: reported.paths == [str(tmp_path / "clip.mkv")])
+		time.sleep(0.3)
+		assert reported.paths == [str(tmp_path / "clip.mkv")]
+	finally:
+		watcher.stop()
+
+
+def test_deleted_files_are_forgotten(tmp_path, reported):
+	watcher = FolderWatcher([WatchFolder(str(tmp_path))], reported, settle=0.1, poll_interval=0.05, use_inotify=False)
+	watcher.start()
+	try:
+		for i in range(3):
+			(tmp_path / f"clip{i}.mp4").write_bytes(b"x")
+		assert _wait_for(lambda: len(reported.paths) == 3)
+		for i in range(3):
+			(tmp_path / f"clip{i}.mp4").unlink()
+		assert _wait_for(lambda: not watcher._taken)
+	finally:
+		watcher.stop()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_stop_right_after_start_does_not_hang(tmp_path, reported):
+	for _ in range(20):
+		watcher = FolderWatcher([WatchFolder(str(tmp_path))], reported, use_inotify=True)
+		watcher.start()
+		stopper = threading.Thread(target=watcher.stop)
+		stopper.start()
+		stopper.join(timeout=5)
+		assert not stopper.is_alive()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_reports_and_forgets(tmp_path, reported):
+	watcher = FolderWatcher([WatchFolder(str(tmp_path))], reported, settle=0.1, use_inotify=True)
+	watcher.start()
+	try:
+		clip = tmp_path / "clip.mp4"
+		clip.write_bytes(b"x")
+		assert _wait_for(lambda: reported.paths == [str(clip)])
+		clip.rename(tmp_path.parent / f"{tmp_path.name}-moved.mp4")
+		assert _wait_for(lambda: not watcher._taken)
+	finally:
+		watcher.stop()